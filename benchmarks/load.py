@@ -0,0 +1,245 @@
+"""Load benchmark of mixed shorten and redirect traffic
+
+Seeds the database configured in .env with --links rows (once; later runs
+reuse them), then drives POST /shorten and GET /{slug} at --concurrency,
+picking redirect slugs from a Zipf distribution so a few links get most of
+the traffic. Throughput and p50/p95/p99 latency per operation are written to
+a JSON file, for comparing runs.
+
+By default the FastAPI app from main.py runs in-process (lifespan included)
+behind an ASGI transport. Pass --url to load an already running server
+instead, e.g. uvicorn with several workers. With STORAGE_BACKEND=memory the
+links are seeded into the in-process store, so no database is needed, and
+--url cannot be used.
+
+    uv run python -m benchmarks.load --links 1000000 --requests 100000
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import subprocess
+import sys
+import time
+from contextlib import AsyncExitStack
+from datetime import datetime, timedelta, timezone
+
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import delete, func, select, text
+
+from config.config import settings
+from database.database import async_session, get_engine
+from database.migrations import migrate_database
+from main import app
+from models.models import Link
+from storage.memory import MemoryLinkStore
+from storage.storage import link_store
+
+# Not base62, so seeded slugs can never clash with real ones
+PREFIX: str = "~load-"
+SEED_CHUNK: int = 100_000
+
+
+async def seed_links(links: int) -> None:
+    """Inserts links PREFIX0 .. PREFIX{links - 1} server-side, in chunks."""
+    async with async_session() as db:
+        if await db.scalar(
+            select(Link.link_id).where(
+                Link.slug == f"{PREFIX}{links - 1}",
+                Link.expires_at > func.now() + timedelta(days=1),
+            )
+        ):
+            return
+    # Missing, or about to expire part-way through a run
+    await remove_links()
+    async with async_session() as db:
+        for start in range(0, links, SEED_CHUNK):
+            stop: int = min(start + SEED_CHUNK, links) - 1
+            await db.execute(
+                text(
+                    "INSERT INTO links (slug, long_url, expires_at) "
+                    "SELECT :prefix || i, 'https://example.com/seeded/' || i, "
+                    "now() + make_interval(days => :days) "
+                    "FROM generate_series(CAST(:start AS int), CAST(:stop AS int)) AS i "
+                    "ON CONFLICT DO NOTHING"
+                ),
+                {
+                    "prefix": PREFIX,
+                    "days": settings.max_url_age,
+                    "start": start,
+                    "stop": stop,
+                },
+            )
+            await db.commit()
+            sys.stdout.write(f"seeded {stop + 1}/{links} links\n")
+
+
+async def remove_links() -> None:
+    """Deletes the seeded links, and links shortened by earlier runs."""
+    async with async_session() as db:
+        await db.execute(delete(Link).where(Link.slug.startswith(PREFIX)))
+        await db.execute(
+            delete(Link).where(Link.long_url.startswith("https://example.com/load/"))
+        )
+        await db.commit()
+
+
+def zipf_ranks(
+    links: int, exponent: float, count: int, rng: random.Random
+) -> list[int]:
+    """Draws count link indexes, index i having weight 1 / (i + 1) ** exponent."""
+    cumulative: list[float] = list(
+        itertools.accumulate(1 / (rank**exponent) for rank in range(1, links + 1))
+    )
+    return rng.choices(range(links), cum_weights=cumulative, k=count)
+
+
+def percentile(sorted_values: list[float], share: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(share * len(sorted_values)))]
+
+
+def summarize(latencies: list[float], errors: int, elapsed: float) -> dict:
+    ordered: list[float] = sorted(latencies)
+    return {
+        "requests": len(ordered) + errors,
+        "errors": errors,
+        "throughput_rps": (len(ordered) + errors) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(ordered, 0.50) * 1000,
+        "p95_ms": percentile(ordered, 0.95) * 1000,
+        "p99_ms": percentile(ordered, 0.99) * 1000,
+        "max_ms": (ordered[-1] if ordered else 0.0) * 1000,
+    }
+
+
+async def run_workload(
+    client: AsyncClient, operations: list[tuple[str, int]], concurrency: int
+) -> tuple[dict[str, list[float]], dict[str, int], float]:
+    latencies: dict[str, list[float]] = {"shorten": [], "redirect": []}
+    errors: dict[str, int] = {"shorten": 0, "redirect": 0}
+    expected: dict[str, int] = {"shorten": 200, "redirect": settings.redirect_status}
+    queue = iter(operations)
+
+    async def worker() -> None:
+        for operation, index in queue:
+            start: float = time.perf_counter()
+            try:
+                if operation == "shorten":
+                    response = await client.post(
+                        "/shorten",
+                        json={"long_url": f"https://example.com/load/{index}"},
+                    )
+                else:
+                    response = await client.get(f"/{PREFIX}{index}")
+            except Exception:
+                errors[operation] += 1
+                continue
+            if response.status_code == expected[operation]:
+                latencies[operation].append(time.perf_counter() - start)
+            else:
+                errors[operation] += 1
+
+    start: float = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - start
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def main(args: argparse.Namespace) -> None:
+    if isinstance(link_store, MemoryLinkStore):
+        for index in range(args.links):
+            link_store.add_link(
+                f"https://example.com/seeded/{index}", slug=f"{PREFIX}{index}"
+            )
+    else:
+        await migrate_database(get_engine())
+        await seed_links(args.links)
+
+    rng = random.Random(args.seed)
+    redirects: int = round(args.requests * (1 - args.shorten_share))
+    redirect_ranks = iter(zipf_ranks(args.links, args.zipf, redirects, rng))
+    operations: list[tuple[str, int]] = [
+        ("redirect", next(redirect_ranks)) for _ in range(redirects)
+    ] + [("shorten", rng.getrandbits(63)) for _ in range(args.requests - redirects)]
+    rng.shuffle(operations)
+
+    async with AsyncExitStack() as stack:
+        if args.url:
+            client = AsyncClient(base_url=args.url, timeout=args.timeout)
+        else:
+            await stack.enter_async_context(app.router.lifespan_context(app))
+            client = AsyncClient(
+                transport=ASGITransport(app=app),
+                base_url=str(settings.base_url),
+                timeout=args.timeout,
+            )
+        await stack.enter_async_context(client)
+        latencies, errors, elapsed = await run_workload(
+            client, operations, args.concurrency
+        )
+
+    report: dict = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "revision": git_revision(),
+        "target": args.url or "in-process",
+        "config": {
+            "links": args.links,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "shorten_share": args.shorten_share,
+            "zipf": args.zipf,
+            "seed": args.seed,
+        },
+        "elapsed_s": elapsed,
+        "overall": summarize(
+            latencies["shorten"] + latencies["redirect"],
+            errors["shorten"] + errors["redirect"],
+            elapsed,
+        ),
+        "shorten": summarize(latencies["shorten"], errors["shorten"], elapsed),
+        "redirect": summarize(latencies["redirect"], errors["redirect"], elapsed),
+    }
+    with open(args.output, "w") as output:
+        json.dump(report, output, indent=2)
+    sys.stdout.write(json.dumps(report["overall"], indent=2) + "\n")
+
+    if not isinstance(link_store, MemoryLinkStore):
+        if args.cleanup:
+            await remove_links()
+        await get_engine().dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--links", type=int, default=1_000_000)
+    parser.add_argument("--requests", type=int, default=100_000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--shorten-share", type=float, default=0.05)
+    parser.add_argument("--zipf", type=float, default=1.1, help="Zipf exponent")
+    parser.add_argument("--seed", type=int, default=42, help="random seed")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--url", help="base URL of a running server")
+    parser.add_argument("--output", default="benchmark-results.json")
+    parser.add_argument(
+        "--cleanup", action="store_true", help="remove seeded links afterwards"
+    )
+    arguments: argparse.Namespace = parser.parse_args()
+    if arguments.url and settings.storage_backend == "memory":
+        parser.error(
+            "--url needs STORAGE_BACKEND=postgres, memory links are per process"
+        )
+    asyncio.run(main(arguments))
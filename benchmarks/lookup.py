@@ -0,0 +1,96 @@
+"""Microbenchmark of the slug lookup behind GET /{slug}
+
+Compares the previous ORM path (AsyncSession, select(Link), identity map)
+with the Core fast path used by UrlService.get_link. The redirect cache
+is bypassed, so every lookup reaches the database.
+
+Needs the database configured in .env. Seeds its own rows and removes them.
+
+    uv run python -m benchmarks.lookup --rows 1000 --lookups 5000
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from collections.abc import Awaitable, Callable
+from datetime import timedelta
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert
+
+from config.config import settings
+from database.database import async_session, get_engine, get_primary_engine
+from database.migrations import migrate_database
+from models.models import Link
+from services.url import UrlService
+
+# Not base62, so it can never clash with a real slug
+PREFIX: str = "~bench-"
+
+
+async def orm_lookup(slug: str) -> object:
+    async with async_session() as db:
+        link: Link | None = await db.scalar(select(Link).where(Link.slug == slug))
+        return link.long_url if link else None
+
+
+async def core_lookup(slug: str) -> object:
+    return await UrlService._fetch_link(get_primary_engine(), slug)
+
+
+async def measure(
+    name: str, lookup: Callable[[str], Awaitable[object]], slugs: list[str]
+) -> None:
+    for slug in slugs[:100]:
+        await lookup(slug)
+    wall: float = time.perf_counter()
+    cpu: float = time.process_time()
+    for slug in slugs:
+        await lookup(slug)
+    wall = (time.perf_counter() - wall) / len(slugs)
+    cpu = (time.process_time() - cpu) / len(slugs)
+    sys.stdout.write(
+        f"{name:<5} {wall * 1e6:9.1f} us/lookup wall {cpu * 1e6:9.1f} us/lookup CPU\n"
+    )
+
+
+async def main(rows: int, lookups: int) -> None:
+    await migrate_database(get_engine())
+    slugs: list[str] = [f"{PREFIX}{i}" for i in range(rows)]
+    async with async_session() as db:
+        await db.execute(
+            insert(Link)
+            .values(
+                [
+                    {
+                        "slug": slug,
+                        "long_url": f"https://example.com/{slug}",
+                        "expires_at": func.now() + timedelta(days=1),
+                    }
+                    for slug in slugs
+                ]
+            )
+            .on_conflict_do_nothing()
+        )
+        await db.commit()
+    try:
+        workload: list[str] = [slugs[i % rows] for i in range(lookups)]
+        sys.stdout.write(
+            f"{lookups} lookups over {rows} links, {settings.postgres_host}\n"
+        )
+        await measure("orm", orm_lookup, workload)
+        await measure("core", core_lookup, workload)
+    finally:
+        async with async_session() as db:
+            await db.execute(delete(Link).where(Link.slug.startswith(PREFIX)))
+            await db.commit()
+        await get_engine().dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--lookups", type=int, default=5000)
+    args = parser.parse_args()
+    asyncio.run(main(rows=args.rows, lookups=args.lookups))
@@ -0,0 +1,109 @@
+"""Microbenchmark of request/response serialization on POST /shorten
+
+Sends POST /shorten and POST /shorten/batch through the app in-process, with
+FAST_SERIALIZATION off (responses validated into the response models and
+encoded with json.dumps) and on (plain dicts encoded by pydantic-core), and
+reports the CPU time per request. Links go to an in-memory store, so no
+database is needed and the figures are the app's own overhead.
+
+Each variant is measured --repeats times, alternating which one goes first
+in each round so that warm-up and drift hit both alike, and the median, min
+and max of the rounds are reported.
+
+    uv run python -m benchmarks.serialization --requests 5000 --repeats 9
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from unittest.mock import patch
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from httpx import ASGITransport, AsyncClient
+
+from config.config import settings
+from routes.routes import FastJSONResponse
+from routes.routes import router as shorten_router
+from storage.memory import MemoryLinkStore
+from storage.storage import get_link_store
+
+
+def build_app(fast: bool) -> FastAPI:
+    app = FastAPI(default_response_class=FastJSONResponse if fast else JSONResponse)
+    app.include_router(shorten_router)
+    store = MemoryLinkStore()
+    app.dependency_overrides[get_link_store] = lambda: store
+    return app
+
+
+async def measure(
+    fast: bool, app: FastAPI, path: str, payload: dict, requests: int
+) -> tuple[float, float]:
+    """Returns CPU and wall microseconds per request."""
+    mode = settings.model_copy(update={"fast_serialization": fast})
+    with patch("routes.routes.settings", mode):
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url=str(settings.base_url)
+        ) as client:
+            for _ in range(min(requests, 200)):
+                await client.post(path, json=payload)
+            wall: float = time.perf_counter()
+            cpu: float = time.process_time()
+            for _ in range(requests):
+                response = await client.post(path, json=payload)
+            cpu = time.process_time() - cpu
+            wall = time.perf_counter() - wall
+    response.raise_for_status()
+    return cpu / requests * 1e6, wall / requests * 1e6
+
+
+async def main(args: argparse.Namespace) -> None:
+    cases: dict[str, tuple[str, dict, int]] = {
+        "shorten": (
+            "/shorten",
+            {"long_url": "https://example.com/some/page?with=query"},
+            args.requests,
+        ),
+        f"batch/{args.batch_size}": (
+            "/shorten/batch",
+            {
+                "long_urls": [
+                    f"https://example.com/some/page/{index}"
+                    for index in range(args.batch_size)
+                ]
+            },
+            max(1, args.requests // args.batch_size),
+        ),
+    }
+    apps: dict[bool, FastAPI] = {fast: build_app(fast) for fast in (False, True)}
+    for name, (path, payload, requests) in cases.items():
+        rounds: dict[bool, list[tuple[float, float]]] = {False: [], True: []}
+        for repeat in range(args.repeats):
+            # Alternate the order, so neither variant always runs warmer
+            for fast in (False, True) if repeat % 2 == 0 else (True, False):
+                rounds[fast].append(
+                    await measure(fast, apps[fast], path, payload, requests)
+                )
+        medians: dict[bool, float] = {}
+        for fast, results in rounds.items():
+            cpu: list[float] = [result[0] for result in results]
+            medians[fast] = statistics.median(cpu)
+            wall: float = statistics.median(result[1] for result in results)
+            sys.stdout.write(
+                f"{name:<10} fast={fast!s:<5} {medians[fast]:9.1f} us/request CPU "
+                f"(min {min(cpu):.1f}, max {max(cpu):.1f}) "
+                f"{wall:9.1f} us/request wall, median of {args.repeats}\n"
+            )
+        saved: float = 1 - medians[True] / medians[False]
+        sys.stdout.write(f"{name:<10} {saved:.0%} less median CPU per request\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--repeats", type=int, default=9)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,402 @@
+"""Bulk import and export of links, streamed through Postgres COPY
+
+Rows are read and written one chunk at a time, so files of any size can be
+moved without holding them in memory. Files are CSV (with a header row) or
+JSON Lines, picked from the file extension unless --format is given.
+
+    uv run python -m cli.cli export links.csv
+    uv run python -m cli.cli import links.jsonl --rejects rejects.jsonl
+
+Each row holds slug, long_url, created_ts and expires_at. On import only
+long_url is required: rows without a slug get a new one from the configured
+slug strategy, and rows without expires_at expire settings.max_url_age days
+from now. Given slugs must pass the same checks as the API's, and rows whose
+slug is already taken, or given earlier in the file, are skipped. Timestamps
+without a UTC offset are read as UTC. With settings.links_partitioned,
+created_ts is set to the time of the import. Imported slugs are published to
+running processes like ones created through the API, with settings.cache_notify.
+
+The migrate command brings the database schema up to date. Run it once per
+deploy, before starting the new release:
+
+    uv run python -m cli.cli migrate
+
+The snapshot command writes the unexpired links to a slug snapshot file for
+read-only edge nodes (see edge.py):
+
+    uv run python -m cli.cli snapshot links.snapshot
+"""
+
+import argparse
+import asyncio
+import csv
+import itertools
+import json
+import sys
+import time
+from collections.abc import Iterable, Iterator
+from contextlib import ExitStack
+from datetime import datetime, timezone
+from typing import Literal, TextIO
+
+import psycopg
+from pydantic import ValidationError
+
+from config.config import settings
+from database.database import get_engine
+from database.migrations import migrate_database
+from exceptions.exceptions import InvalidImportRecordError
+from schemas.schemas import LongUrlAccept, SlugAccept
+from services.hashing import hash_url
+from services.notify import encode_events
+from services.slug import generate_slug, slug_allocator
+from services.snapshot import write_snapshot
+
+Format = Literal["csv", "jsonl"]
+COLUMNS: tuple[str, ...] = ("slug", "long_url", "created_ts", "expires_at")
+
+# One row to stage: slug (None to generate one), long_url, url_hash, created_ts, expires_at
+ImportRow = tuple[str | None, str, bytes, datetime | None, datetime | None]
+
+CREATE_STAGING_TABLE: str = """
+CREATE TEMP TABLE link_import (
+    slug text NOT NULL,
+    long_url text NOT NULL,
+    url_hash bytea,
+    created_ts timestamptz,
+    expires_at timestamptz
+) ON COMMIT DELETE ROWS
+"""
+COPY_TO_STAGING_TABLE: str = """
+COPY link_import (slug, long_url, url_hash, created_ts, expires_at) FROM STDIN
+"""
+INSERT_FROM_STAGING_TABLE: str = """
+INSERT INTO links (slug, long_url, url_hash, created_ts, expires_at)
+-- Partitioned links have no unique index on slug alone to conflict on, so
+-- duplicates are dropped here, both within the chunk and against the table
+SELECT DISTINCT ON (slug) slug, long_url, url_hash, coalesce(created_ts, now()),
+       coalesce(expires_at, now() + make_interval(days => %s))
+FROM link_import
+WHERE NOT EXISTS (SELECT 1 FROM links WHERE links.slug = link_import.slug)
+ORDER BY slug
+ON CONFLICT DO NOTHING
+RETURNING slug
+"""
+
+
+def guess_format(path: str) -> Format | None:
+    """Returns the format matching the file extension, if any."""
+    if path.endswith(".csv"):
+        return "csv"
+    if path.endswith((".jsonl", ".ndjson")):
+        return "jsonl"
+    return None
+
+
+def read_records(file: TextIO, fmt: Format) -> Iterator[tuple[int, dict | str]]:
+    """
+    Streams records from a CSV or JSON Lines file.
+
+    Args:
+        file: The open file.
+        fmt: The file format.
+
+    Yields:
+        (line number, record) pairs. Lines that are not JSON objects are passed
+        through as the raw string, to be rejected.
+    """
+    if fmt == "csv":
+        reader = csv.DictReader(file)
+        for record in reader:
+            yield reader.line_num, record
+        return
+    for line_num, line in enumerate(file, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            yield line_num, line.rstrip("\n")
+            continue
+        yield line_num, record if isinstance(record, dict) else line.rstrip("\n")
+
+
+def parse_record(record: dict | str) -> ImportRow:
+    """
+    Validates one record with the same rules as POST /shorten.
+
+    Args:
+        record: A record from read_records.
+
+    Returns:
+        The row to stage.
+
+    Raises:
+        InvalidImportRecordError: If the record is invalid.
+    """
+    if not isinstance(record, dict):
+        raise InvalidImportRecordError("record", repr(record))
+    slug: str | None = str(record["slug"]) if record.get("slug") else None
+    if slug is not None:
+        if settings.links_partitioned:
+            # Nothing stops the sequence from handing out the same slug later
+            raise InvalidImportRecordError(
+                "slug", "slugs cannot be given when links are partitioned"
+            )
+        try:
+            SlugAccept(slug=slug)
+        except ValidationError as e:
+            raise InvalidImportRecordError("slug", e.errors()[0]["msg"]) from None
+    if not isinstance(record.get("long_url"), str):
+        raise InvalidImportRecordError("long_url", repr(record.get("long_url")))
+    try:
+        long_url: str = str(LongUrlAccept(long_url=record["long_url"]).long_url)
+    except ValidationError as e:
+        raise InvalidImportRecordError("long_url", e.errors()[0]["msg"]) from None
+    timestamps: dict[str, datetime | None] = {}
+    for column in ("created_ts", "expires_at"):
+        try:
+            timestamp: datetime | None = (
+                datetime.fromisoformat(str(record[column]))
+                if record.get(column)
+                else None
+            )
+        except ValueError as e:
+            raise InvalidImportRecordError(column, str(e)) from None
+        if timestamp is not None and timestamp.tzinfo is None:
+            timestamp = timestamp.replace(tzinfo=timezone.utc)
+        timestamps[column] = timestamp
+    return (
+        slug,
+        long_url,
+        hash_url(long_url),
+        # Partitions only exist around today, so partitioned links start now
+        None if settings.links_partitioned else timestamps["created_ts"],
+        timestamps["expires_at"],
+    )
+
+
+def new_slugs(cursor: psycopg.Cursor, count: int) -> list[str]:
+    """Generates slugs for rows without one, using the configured strategy."""
+    if settings.slug_strategy == "sequence":
+        cursor.execute(
+            "SELECT nextval('link_slug_seq') FROM generate_series(1, %s)", (count,)
+        )
+        return [slug_allocator.permutation.encode(value) for (value,) in cursor]
+    return [generate_slug(settings.slug_length) for _ in range(count)]
+
+
+def import_chunk(cursor: psycopg.Cursor, rows: list[ImportRow]) -> tuple[int, int]:
+    """
+    Inserts one chunk of rows through the staging table, in one transaction.
+
+    Generated slugs that turn out to be taken are replaced and retried. Given
+    slugs repeated within the chunk are skipped after their first row. The
+    inserted slugs are published with settings.cache_notify, in the same
+    transaction.
+
+    Args:
+        cursor: A cursor on a connection where the staging table exists.
+        rows: The rows to insert.
+
+    Returns:
+        The number of rows inserted, and skipped because their slug was taken.
+    """
+    inserted_slugs: list[str] = []
+    given: set[str] = set()
+    pending: list[ImportRow] = []
+    for row in rows:
+        if row[0] is None or row[0] not in given:
+            pending.append(row)
+        if row[0] is not None:
+            given.add(row[0])
+    skipped: int = len(rows) - len(pending)
+    with cursor.connection.transaction():
+        while pending:
+            slugs: Iterator[str] = iter(
+                new_slugs(cursor, sum(row[0] is None for row in pending))
+            )
+            staged: list[tuple[bool, ImportRow]] = [
+                (
+                    slug is None,
+                    (slug or next(slugs), long_url, url_hash, created, expires),
+                )
+                for slug, long_url, url_hash, created, expires in pending
+            ]
+            with cursor.copy(COPY_TO_STAGING_TABLE) as copy:
+                for _, row in staged:
+                    copy.write_row(row)
+            cursor.execute(INSERT_FROM_STAGING_TABLE, (settings.max_url_age,))
+            added: set[str] = {slug for (slug,) in cursor}
+            cursor.execute("TRUNCATE link_import")
+            retry: list[ImportRow] = [
+                (None, long_url, url_hash, created, expires)
+                for generated, (slug, long_url, url_hash, created, expires) in staged
+                if generated and slug not in added
+            ]
+            inserted_slugs.extend(added)
+            skipped += len(staged) - len(added) - len(retry)
+            pending = retry
+        if settings.cache_notify:
+            # Evicts negative cache entries and fills Bloom filters elsewhere
+            for payload in encode_events("created", inserted_slugs):
+                cursor.execute(
+                    "SELECT pg_notify(%s, %s)",
+                    (settings.cache_notify_channel, payload),
+                )
+    return len(inserted_slugs), skipped
+
+
+def import_links(args: argparse.Namespace) -> None:
+    counts: dict[str, int] = {"inserted": 0, "skipped": 0, "rejected": 0}
+    start: float = time.perf_counter()
+    with ExitStack() as stack:
+        file: TextIO = stack.enter_context(
+            open(args.path, newline="", encoding="utf-8")
+        )
+        rejects: TextIO | None = (
+            stack.enter_context(open(args.rejects, "w", encoding="utf-8"))
+            if args.rejects
+            else None
+        )
+        # Autocommit, so each chunk's transaction() is a real transaction
+        conn = stack.enter_context(
+            psycopg.connect(settings.postgres_dsn, autocommit=True)
+        )
+        conn.execute(CREATE_STAGING_TABLE)
+        cursor = conn.cursor()
+        for chunk in itertools.batched(
+            read_records(file, args.format), args.chunk_size, strict=False
+        ):
+            rows: list[ImportRow] = []
+            for line_num, record in chunk:
+                try:
+                    rows.append(parse_record(record))
+                except InvalidImportRecordError as e:
+                    counts["rejected"] += 1
+                    if rejects:
+                        rejects.write(
+                            json.dumps(
+                                {"line": line_num, "record": record, "error": str(e)}
+                            )
+                            + "\n"
+                        )
+            inserted, skipped = import_chunk(cursor, rows)
+            counts["inserted"] += inserted
+            counts["skipped"] += skipped
+            report(counts, start)
+    report(counts, start)
+
+
+def export_links(args: argparse.Namespace) -> None:
+    where: str = "" if args.include_expired else " WHERE expires_at > now()"
+    query: str = f"SELECT {', '.join(COLUMNS)} FROM links{where}"
+    start: float = time.perf_counter()
+    with psycopg.connect(settings.postgres_dsn, autocommit=True) as conn:
+        conn.execute("SET TIME ZONE 'UTC'")
+        cursor = conn.cursor()
+        if args.format == "csv":
+            # Postgres writes the CSV itself, passed through as it arrives
+            with (
+                open(args.path, "wb") as file,
+                cursor.copy(f"COPY ({query}) TO STDOUT (FORMAT csv, HEADER)") as copy,
+            ):
+                for data in copy:
+                    file.write(data)
+            report({"exported": cursor.rowcount}, start)
+            return
+        exported: int = 0
+        with (
+            open(args.path, "w", encoding="utf-8") as file,
+            cursor.copy(f"COPY ({query}) TO STDOUT") as copy,
+        ):
+            copy.set_types(["text", "text", "timestamptz", "timestamptz"])
+            for slug, long_url, created_ts, expires_at in copy.rows():
+                record: dict[str, str] = {
+                    "slug": slug,
+                    "long_url": long_url,
+                    "created_ts": created_ts.isoformat(),
+                    "expires_at": expires_at.isoformat(),
+                }
+                file.write(json.dumps(record) + "\n")
+                exported += 1
+        report({"exported": exported}, start)
+
+
+def snapshot_links(args: argparse.Namespace) -> None:
+    start: float = time.perf_counter()
+    with psycopg.connect(settings.postgres_dsn, autocommit=True) as conn:
+        # One consistent view for the count and the rows
+        conn.isolation_level = psycopg.IsolationLevel.REPEATABLE_READ
+        cursor = conn.cursor()
+        with conn.transaction():
+            cursor.execute(
+                "SELECT count(*), coalesce(max(octet_length(slug)), 0) "
+                "FROM links WHERE expires_at > now()"
+            )
+            count, width = cursor.fetchone()
+            with cursor.copy(
+                "COPY (SELECT slug, long_url, extract(epoch FROM expires_at)::bigint "
+                'FROM links WHERE expires_at > now() ORDER BY slug COLLATE "C") '
+                "TO STDOUT"
+            ) as copy:
+                copy.set_types(["text", "text", "int8"])
+                written: int = write_snapshot(args.path, copy.rows(), count, width)
+    report({"snapshotted": written}, start)
+
+
+def migrate_schema(_: argparse.Namespace) -> None:
+    async def run() -> tuple[int, int]:
+        try:
+            return await migrate_database(get_engine())
+        finally:
+            await get_engine().dispose()
+
+    start: float = time.perf_counter()
+    found, version = asyncio.run(run())
+    report({"from version": found, "to version": version}, start)
+
+
+def report(counts: dict[str, int], start: float) -> None:
+    figures: Iterable[str] = (f"{name} {count}" for name, count in counts.items())
+    sys.stderr.write(f"{', '.join(figures)} in {time.perf_counter() - start:.1f}s\n")
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(required=True)
+
+    importer = commands.add_parser("import", help="add links from a file")
+    importer.add_argument("path")
+    importer.add_argument("--format", choices=["csv", "jsonl"])
+    importer.add_argument("--chunk-size", type=int, default=10000)
+    importer.add_argument("--rejects", help="write invalid rows here, as JSON Lines")
+    importer.set_defaults(command=import_links)
+
+    exporter = commands.add_parser("export", help="write links to a file")
+    exporter.add_argument("path")
+    exporter.add_argument("--format", choices=["csv", "jsonl"])
+    exporter.add_argument("--include-expired", action="store_true")
+    exporter.set_defaults(command=export_links)
+
+    migrator = commands.add_parser(
+        "migrate", help="bring the database schema up to date"
+    )
+    migrator.set_defaults(command=migrate_schema)
+
+    snapshotter = commands.add_parser(
+        "snapshot", help="write unexpired links to a snapshot for edge nodes"
+    )
+    snapshotter.add_argument("path")
+    snapshotter.set_defaults(command=snapshot_links)
+
+    args = parser.parse_args(argv)
+    if "format" in args:
+        args.format = args.format or guess_format(args.path)
+        if args.format is None:
+            parser.error(f"cannot tell the format of {args.path}, use --format")
+    args.command(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,18 @@
 """Application configuration"""
 
-from pydantic import HttpUrl, SecretStr
+from functools import cached_property
+from typing import Literal
+
+from pydantic import HttpUrl, SecretStr, model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+from exceptions.exceptions import (
+    BloomFilterWithoutNotifyError,
+    MissingPostgresSettingsError,
+    MissingSlugKeyError,
+    UnpartitionableSlugStrategyError,
+)
+
 
 class Settings(BaseSettings):
     """Uses pydantic-settings to import .env variables
@@ -12,22 +22,155 @@ class Settings(BaseSettings):
     model_config: SettingsConfigDict = SettingsConfigDict(env_file=".env", frozen=True)
 
     app_name: str = "Jake's URL Shortener"
+    storage_backend: Literal["postgres", "memory"] = "postgres"
     base_url: HttpUrl = "https://jkwlsn.dev/"  # type: ignore
     slug_length: int = 7
+    slug_strategy: Literal["random", "sequence"] = "random"
+    slug_key: SecretStr = SecretStr("")
+    slug_block_size: int = 100
     max_url_length: int = 2048
     min_url_length: int = 15
     max_url_age: int = 30
+    dedupe_urls: bool = False
+
+    redirect_status: Literal[301, 302, 307, 308] = 307
+    redirect_cache_max_age: int = 0
+
+    fast_serialization: bool = False
+
+    max_batch_size: int = 10000
+    batch_chunk_size: int = 1000
+
+    coalesce_writes: bool = False
+    coalesce_window: float = 0.002
+    coalesce_max_batch: int = 100
+
+    shorten_concurrency: int = 0
+    shorten_queue_size: int = 100
+    redirect_concurrency: int = 0
+    redirect_queue_size: int = 200
+    admission_max_wait: float = 0.5
+
+    purge_interval: int = 300
+    purge_batch_size: int = 500
+    purge_batch_delay: float = 0.1
+    purge_after_days: int = 7
+
+    migrate_on_startup: bool = False
+
+    links_partitioned: bool = False
+    partition_days_ahead: int = 7
+
+    click_tracking: bool = True
+    click_queue_size: int = 10000
+    click_batch_size: int = 500
+    click_flush_interval: float = 5.0
+
+    metrics_enabled: bool = True
+
+    profile_sample_rate: float = 0.0
+    profile_slow_threshold: float = 0.0
+    profile_interval: float = 0.005
+    profile_buffer_size: int = 50
+
+    snapshot_path: str = "links.snapshot"
+    snapshot_reload_interval: float = 5.0
 
-    postgres_host: str
-    postgres_port: int
-    postgres_user: str
-    postgres_password: SecretStr
-    postgres_db: str
+    cache_size: int = 10000
+    cache_ttl: int = 300
+    cache_negative_ttl: int = 30
+    cache_notify: bool = False
+    cache_notify_channel: str = "slug_changes"
+    cache_notify_interval: float = 0.1
+    cache_notify_queue_size: int = 100000
+
+    hot_slugs_top_k: int = 100
+    hot_slugs_sketch_width: int = 4096
+    hot_slugs_sketch_depth: int = 4
+    hot_slugs_snapshot_interval: int = 60
+
+    bloom_filter: bool = False
+    bloom_capacity: int = 1000000
+    bloom_error_rate: float = 0.01
+    bloom_rebuild_interval: int = 3600
+
+    # Only needed with storage_backend="postgres" and by the CLI: edge nodes and
+    # the memory backend never build an engine. Checked when the engine is
+    # first built, i.e. at startup of the Postgres backend.
+    postgres_host: str | None = None
+    postgres_port: int = 5432
+    postgres_user: str | None = None
+    postgres_password: SecretStr | None = None
+    postgres_db: str | None = None
+    postgres_replica_hosts: list[str] = []
+
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30.0
+    db_pool_recycle: int = -1
+    db_pool_pre_ping: bool = False
+    db_pool_warm_up: bool = True
+    db_query_cache_size: int = 500
+    db_prepare_threshold: int | None = 5
+
+    @model_validator(mode="after")
+    def check_partitioned_slug_strategy(self) -> "Settings":
+        """Partitioned links have no unique index on slug to catch collisions"""
+        if self.links_partitioned and self.slug_strategy != "sequence":
+            raise UnpartitionableSlugStrategyError(self.slug_strategy)
+        return self
+
+    @model_validator(mode="after")
+    def check_slug_key(self) -> "Settings":
+        """Without a secret key, anyone can run the permutation and walk the sequence"""
+        if self.slug_strategy == "sequence" and not self.slug_key.get_secret_value():
+            raise MissingSlugKeyError
+        return self
+
+    @model_validator(mode="after")
+    def check_bloom_filter_notify(self) -> "Settings":
+        """Only notifications add other processes' new slugs to the filter"""
+        if self.bloom_filter and not self.cache_notify:
+            raise BloomFilterWithoutNotifyError
+        return self
+
+    @cached_property
+    def short_url_prefix(self) -> str:
+        """base_url as a string, converted once rather than on every request"""
+        return str(self.base_url)
 
     @property
     def database_url(self) -> str:
         """Build database connection string and store as a property"""
-        return f"postgresql+psycopg_async://{settings.postgres_user}:{settings.postgres_password.get_secret_value()}@{settings.postgres_host}:{settings.postgres_port}/{settings.postgres_db}"
+        return f"postgresql+psycopg_async://{self._postgres_credentials}@{self.postgres_host}:{self.postgres_port}/{self.postgres_db}"
+
+    @property
+    def postgres_dsn(self) -> str:
+        """Connection string for psycopg itself, e.g. for COPY in the CLI"""
+        return f"postgresql://{self._postgres_credentials}@{self.postgres_host}:{self.postgres_port}/{self.postgres_db}"
+
+    @property
+    def replica_database_urls(self) -> list[str]:
+        """Build connection strings for read replicas, given as host or host:port"""
+        urls: list[str] = []
+        for replica in self.postgres_replica_hosts:
+            host, _, port = replica.partition(":")
+            urls.append(
+                f"postgresql+psycopg_async://{self._postgres_credentials}@{host}:{port or self.postgres_port}/{self.postgres_db}"
+            )
+        return urls
+
+    @property
+    def _postgres_credentials(self) -> str:
+        """user:password, once every setting needed to connect is checked"""
+        missing: list[str] = [
+            f"POSTGRES_{name.upper()}"
+            for name in ("host", "user", "password", "db")
+            if getattr(self, f"postgres_{name}") is None
+        ]
+        if missing:
+            raise MissingPostgresSettingsError(missing)
+        return f"{self.postgres_user}:{self.postgres_password.get_secret_value()}"  # type: ignore[union-attr]
 
 
 settings: Settings = Settings()
@@ -1,31 +1,153 @@
 """Database connection"""
 
-from typing import AsyncGenerator
+import asyncio
+import itertools
+import time
+from functools import cache
+from typing import AsyncGenerator, Callable
 
+from sqlalchemy import exc, text
 from sqlalchemy.ext.asyncio import (
     AsyncEngine,
     AsyncSession,
     async_sessionmaker,
     create_async_engine,
 )
+from sqlalchemy.pool import AsyncAdaptedQueuePool, PoolProxiedConnection
 
 from config.config import settings
-from models.models import Base
 
-async_engine: AsyncEngine = create_async_engine(url=settings.database_url)
 
-async_session: async_sessionmaker[AsyncSession] = async_sessionmaker(
-    bind=async_engine,
-    class_=AsyncSession,
-    expire_on_commit=False,
-)
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Queue pool that also records how long checkouts take"""
+
+    waiting: int = 0
+    checkouts: int = 0
+    timeouts: int = 0
+    checkout_time: float = 0.0
+    max_checkout_time: float = 0.0
+
+    def connect(self) -> PoolProxiedConnection:
+        start: float = time.perf_counter()
+        self.waiting += 1
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            elapsed: float = time.perf_counter() - start
+            self.waiting -= 1
+            self.checkouts += 1
+            self.checkout_time += elapsed
+            self.max_checkout_time = max(self.max_checkout_time, elapsed)
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size(),
+            "checked_out": self.checkedout(),
+            "idle": self.checkedin(),
+            "overflow": max(self.overflow(), 0),
+            "max_overflow": self._max_overflow,
+            "waiting": self.waiting,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "avg_checkout_ms": 1000 * self.checkout_time / self.checkouts
+            if self.checkouts
+            else 0.0,
+            "max_checkout_ms": 1000 * self.max_checkout_time,
+        }
+
+
+# Run on every engine as it is built, e.g. to add metrics listeners
+engine_hooks: list[Callable[[AsyncEngine], None]] = []
+
+
+def build_engine(url: str) -> AsyncEngine:
+    engine: AsyncEngine = create_async_engine(
+        url=url,
+        poolclass=InstrumentedPool,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        pool_pre_ping=settings.db_pool_pre_ping,
+        query_cache_size=settings.db_query_cache_size,
+        connect_args={"prepare_threshold": settings.db_prepare_threshold},
+    )
+    for hook in engine_hooks:
+        hook(engine)
+    return engine
+
+
+""" Build engines on first use, so that only the Postgres backend needs settings """
+
+
+@cache
+def get_engine() -> AsyncEngine:
+    """The primary engine, for writes and transactions"""
+    return build_engine(settings.database_url)
+
+
+@cache
+def get_replica_engines() -> list[AsyncEngine]:
+    return [
+        build_engine(url).execution_options(isolation_level="AUTOCOMMIT")
+        for url in settings.replica_database_urls
+    ]
 
-""" Create table"""
 
+@cache
+def get_primary_engine() -> AsyncEngine:
+    """Same pool as get_engine, but reads run without BEGIN/ROLLBACK round trips"""
+    return get_engine().execution_options(isolation_level="AUTOCOMMIT")
 
-async def create_tables() -> None:
-    async with async_engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+
+@cache
+def _get_sessionmaker() -> async_sessionmaker[AsyncSession]:
+    return async_sessionmaker(
+        bind=get_engine(),
+        class_=AsyncSession,
+        expire_on_commit=False,
+    )
+
+
+def async_session() -> AsyncSession:
+    return _get_sessionmaker()()
+
+
+_replica_counter: itertools.count = itertools.count()
+
+""" Warm up and inspect the connection pool """
+
+
+async def warm_up_pool() -> None:
+    async def ping(engine: AsyncEngine) -> None:
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    # Hold settings.db_pool_size connections at once, so that many get opened
+    await asyncio.gather(
+        *(
+            ping(engine)
+            for engine in (get_engine(), *get_replica_engines())
+            for _ in range(settings.db_pool_size)
+        )
+    )
+
+
+def pool_stats() -> dict:
+    def engine_stats(engine: AsyncEngine) -> dict:
+        pool = engine.pool
+        return pool.stats() if isinstance(pool, InstrumentedPool) else {}
+
+    # The memory backend has no pool, and must not build one to report on
+    if settings.storage_backend != "postgres":
+        return {}
+    return {
+        **engine_stats(get_engine()),
+        "replicas": [engine_stats(engine) for engine in get_replica_engines()],
+    }
 
 
 """ Yield sessions """
@@ -40,3 +162,14 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
             raise
         finally:
             await session.close()
+
+
+""" Return engines for reads """
+
+
+def get_read_engine() -> AsyncEngine:
+    """Round-robins reads over the replicas, or uses the primary if there are none"""
+    replicas: list[AsyncEngine] = get_replica_engines()
+    if not replicas:
+        return get_primary_engine()
+    return replicas[next(_replica_counter) % len(replicas)]
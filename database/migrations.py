@@ -0,0 +1,243 @@
+"""Versioned schema migrations
+
+Migrations run once per deploy, with `python -m cli.cli migrate`, instead of
+in every process on every start. Processes only check, with one query, that
+the database is at least at the version their code needs."""
+
+from collections.abc import Awaitable, Callable
+
+from sqlalchemy import text
+from sqlalchemy.exc import ProgrammingError
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from config.config import settings
+from database.partitions import create_link_partitions
+from exceptions.exceptions import SchemaOutdatedError
+from services.hashing import hash_url
+
+# Serializes migrations between concurrent `migrate` runs
+SCHEMA_LOCK_ID: int = 0x736368656D61
+# Rows read and updated at a time by backfills
+BACKFILL_BATCH_SIZE: int = 5000
+
+Migration = Callable[[AsyncConnection], Awaitable[None]]
+
+# Migrations spell out their DDL rather than reading models.models, so that
+# each one does the same thing whenever it runs. Every statement is idempotent
+# (IF NOT EXISTS, backfills of NULLs only), since databases created before
+# versioning may already have had some of these changes from create_all.
+
+
+async def create_links(conn: AsyncConnection) -> None:
+    """1: The links table as first released.
+
+    With settings.links_partitioned it is created range-partitioned by day of
+    created_ts. Postgres cannot partition an existing table, so this only has
+    an effect on new databases."""
+    if settings.links_partitioned:
+        await conn.execute(
+            text(
+                "CREATE TABLE IF NOT EXISTS links ("
+                "link_id integer GENERATED ALWAYS AS IDENTITY, "
+                "slug varchar NOT NULL, "
+                f"long_url varchar({settings.max_url_length}) NOT NULL, "
+                "created_ts timestamptz NOT NULL DEFAULT now(), "
+                "PRIMARY KEY (link_id, created_ts)"
+                ") PARTITION BY RANGE (created_ts)"
+            )
+        )
+        # Uniqueness is only enforced within a partition, so not at all here
+        await conn.execute(
+            text("CREATE INDEX IF NOT EXISTS ix_links_slug ON links (slug)")
+        )
+        return
+    await conn.execute(
+        text(
+            "CREATE TABLE IF NOT EXISTS links ("
+            "link_id integer GENERATED ALWAYS AS IDENTITY PRIMARY KEY, "
+            "slug varchar NOT NULL, "
+            f"long_url varchar({settings.max_url_length}) NOT NULL, "
+            "created_ts timestamptz DEFAULT now()"
+            ")"
+        )
+    )
+    await conn.execute(
+        text("CREATE UNIQUE INDEX IF NOT EXISTS ix_links_slug ON links (slug)")
+    )
+
+
+async def create_link_slug_seq(conn: AsyncConnection) -> None:
+    """2: The sequence slugs are derived from, with SLUG_STRATEGY=sequence."""
+    await conn.execute(text("CREATE SEQUENCE IF NOT EXISTS link_slug_seq"))
+
+
+async def create_link_clicks(conn: AsyncConnection) -> None:
+    """3: Click counts per slug."""
+    await conn.execute(
+        text(
+            "CREATE TABLE IF NOT EXISTS link_clicks ("
+            "slug varchar PRIMARY KEY, "
+            "clicks bigint NOT NULL, "
+            "last_access_ts timestamptz NOT NULL"
+            ")"
+        )
+    )
+
+
+async def create_hot_slugs(conn: AsyncConnection) -> None:
+    """4: The hottest slugs of each process, to warm new processes' caches."""
+    await conn.execute(
+        text(
+            "CREATE TABLE IF NOT EXISTS hot_slugs ("
+            "slug varchar PRIMARY KEY, "
+            "hits bigint NOT NULL, "
+            "updated_ts timestamptz NOT NULL DEFAULT now()"
+            ")"
+        )
+    )
+
+
+async def add_url_hash(conn: AsyncConnection) -> None:
+    """5: links.url_hash, to find live links to a long URL with DEDUPE_URLS.
+
+    Existing links get the hash new links get for their long URL, a batch at a
+    time. The index is not unique: without DEDUPE_URLS a long URL may have any
+    number of links, so duplicates are expected and left alone."""
+    await conn.execute(
+        text("ALTER TABLE links ADD COLUMN IF NOT EXISTS url_hash bytea")
+    )
+    after: int = 0
+    while True:
+        rows = (
+            await conn.execute(
+                text(
+                    "SELECT link_id, long_url FROM links "
+                    "WHERE url_hash IS NULL AND link_id > :after "
+                    "ORDER BY link_id LIMIT :limit"
+                ),
+                {"after": after, "limit": BACKFILL_BATCH_SIZE},
+            )
+        ).all()
+        if not rows:
+            break
+        await conn.execute(
+            text("UPDATE links SET url_hash = :url_hash WHERE link_id = :link_id"),
+            [
+                {"link_id": link_id, "url_hash": hash_url(long_url)}
+                for link_id, long_url in rows
+            ],
+        )
+        after = rows[-1][0]
+    await conn.execute(
+        text("CREATE INDEX IF NOT EXISTS ix_links_url_hash ON links (url_hash)")
+    )
+
+
+async def add_expires_at(conn: AsyncConnection) -> None:
+    """6: links.expires_at, for expiry checks in SQL and purging.
+
+    Existing links expire settings.max_url_age days after they were created,
+    as they did when expiry was worked out from created_ts. The previous
+    release inserts links without expires_at, so the column defaults to the
+    same expiry. The default is set after adding the column, since a volatile
+    default in ADD COLUMN would rewrite the table."""
+    await conn.execute(
+        text("ALTER TABLE links ADD COLUMN IF NOT EXISTS expires_at timestamptz")
+    )
+    await conn.execute(
+        text(
+            "ALTER TABLE links ALTER COLUMN expires_at SET DEFAULT now() "
+            f"+ make_interval(days => {int(settings.max_url_age)})"
+        )
+    )
+    await conn.execute(
+        text(
+            "UPDATE links SET expires_at = coalesce(created_ts, now()) "
+            "+ make_interval(days => :max_url_age) WHERE expires_at IS NULL"
+        ),
+        {"max_url_age": settings.max_url_age},
+    )
+    await conn.execute(text("ALTER TABLE links ALTER COLUMN expires_at SET NOT NULL"))
+    await conn.execute(
+        text("CREATE INDEX IF NOT EXISTS ix_links_expires_at ON links (expires_at)")
+    )
+
+
+# Migration n brings the schema from version n - 1 to n. Only ever append, and
+# keep each one compatible with the code of the previous release, which keeps
+# serving while the new release rolls out.
+MIGRATIONS: list[Migration] = [
+    create_links,
+    create_link_slug_seq,
+    create_link_clicks,
+    create_hot_slugs,
+    add_url_hash,
+    add_expires_at,
+]
+SCHEMA_VERSION: int = len(MIGRATIONS)
+
+
+async def migrate(conn: AsyncConnection) -> tuple[int, int]:
+    """
+    Runs the migrations the database has not had yet, in the connection's
+    transaction, so that a failed migration leaves the schema as it was.
+
+    Args:
+        conn: A connection in a transaction.
+
+    Returns:
+        The schema version before and after.
+    """
+    await conn.execute(
+        text("SELECT pg_advisory_xact_lock(:lock_id)"), {"lock_id": SCHEMA_LOCK_ID}
+    )
+    await conn.execute(
+        text("CREATE TABLE IF NOT EXISTS schema_version (version integer NOT NULL)")
+    )
+    found: int = await conn.scalar(text("SELECT max(version) FROM schema_version")) or 0
+    for migration in MIGRATIONS[found:]:
+        await migration(conn)
+    if settings.links_partitioned:
+        await create_link_partitions(conn, settings.partition_days_ahead)
+    if found >= SCHEMA_VERSION:
+        return found, found
+    await conn.execute(text("DELETE FROM schema_version"))
+    await conn.execute(
+        text("INSERT INTO schema_version (version) VALUES (:version)"),
+        {"version": SCHEMA_VERSION},
+    )
+    return found, SCHEMA_VERSION
+
+
+async def migrate_database(engine: AsyncEngine) -> tuple[int, int]:
+    async with engine.begin() as conn:
+        return await migrate(conn)
+
+
+async def check_schema_version(engine: AsyncEngine) -> int:
+    """
+    Checks that the database schema is recent enough for this code.
+
+    Newer schemas are accepted, since migrations keep the previous release
+    working.
+
+    Args:
+        engine: The engine of the primary.
+
+    Returns:
+        The schema version of the database.
+
+    Raises:
+        SchemaOutdatedError: If the database needs migrating first.
+    """
+    async with engine.connect() as conn:
+        try:
+            found: int = (
+                await conn.scalar(text("SELECT max(version) FROM schema_version")) or 0
+            )
+        except ProgrammingError:
+            # No schema_version table: never migrated
+            found = 0
+    if found < SCHEMA_VERSION:
+        raise SchemaOutdatedError(found, SCHEMA_VERSION)
+    return found
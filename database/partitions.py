@@ -0,0 +1,179 @@
+"""Daily partitions of the links table, with settings.links_partitioned"""
+
+from datetime import date, datetime, time, timedelta, timezone
+
+import psycopg
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from config.config import settings
+
+PARTITION_PREFIX: str = "links_p"
+# Serializes partition DDL between application processes
+PARTITION_LOCK_ID: int = 0x6C696E6B73
+
+
+def partition_name(day: date) -> str:
+    return f"{PARTITION_PREFIX}{day:%Y%m%d}"
+
+
+def partition_day(name: str) -> date | None:
+    """Returns the day a partition holds, or None if it is not a daily partition."""
+    try:
+        return date.fromisoformat(name.removeprefix(PARTITION_PREFIX))
+    except ValueError:
+        return None
+
+
+def day_start(day: date) -> datetime:
+    return datetime.combine(day, time.min, tzinfo=timezone.utc)
+
+
+async def create_link_partitions(conn: AsyncConnection, days_ahead: int) -> list[str]:
+    """
+    Creates the partitions for today and the next days_ahead days, if missing.
+
+    Args:
+        conn: A connection in a transaction, committed by the caller.
+        days_ahead: How many days after today to create partitions for.
+
+    Returns:
+        The names of the partitions that were created.
+    """
+    await conn.execute(
+        text("SELECT pg_advisory_xact_lock(:lock)"), {"lock": PARTITION_LOCK_ID}
+    )
+    existing: set[str] = set(await link_partitions(conn))
+    today: date = datetime.now(timezone.utc).date()
+    created: list[str] = []
+    for offset in range(days_ahead + 1):
+        day: date = today + timedelta(days=offset)
+        name: str = partition_name(day)
+        if name in existing:
+            continue
+        await conn.execute(
+            text(
+                f"CREATE TABLE {name} PARTITION OF links "
+                f"FOR VALUES FROM ('{day_start(day).isoformat()}') "
+                f"TO ('{day_start(day + timedelta(days=1)).isoformat()}')"
+            )
+        )
+        created.append(name)
+    return created
+
+
+async def drop_expired_link_partitions(engine: AsyncEngine) -> list[str]:
+    """
+    Drops partitions whose links all expired over settings.purge_after_days ago,
+    along with the click stats of those links.
+
+    Dropping a whole partition replaces deleting its rows one by one, so the
+    slug indexes of the remaining partitions are never churned. Each partition
+    is first detached with DETACH PARTITION CONCURRENTLY, which unlike DROP
+    TABLE does not lock queries on links out, and every statement commits on
+    its own. A partition left detached, or half detached, by an interrupted run
+    is finished off by the next one.
+
+    Args:
+        engine: The engine of the primary.
+
+    Returns:
+        The names of the partitions that were dropped.
+    """
+    dropped: list[str] = []
+    async with engine.connect() as conn:
+        # DETACH ... CONCURRENTLY cannot run in a transaction
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        locked: bool = await conn.scalar(
+            text("SELECT pg_try_advisory_lock(:lock)"), {"lock": PARTITION_LOCK_ID}
+        )
+        if not locked:
+            # Another process is already at it
+            return dropped
+        try:
+            cutoff: datetime = datetime.now(timezone.utc) - timedelta(
+                days=settings.purge_after_days
+            )
+            attached: list[str] = await link_partitions(conn)
+            pending: set[str] = set(await link_partitions(conn, detach_pending=True))
+            for name in sorted([*attached, *await detached_link_partitions(conn)]):
+                day: date | None = partition_day(name)
+                # Links never expire before they are created, so skip recent
+                # partitions without looking inside them
+                if day is None or day_start(day + timedelta(days=1)) > cutoff:
+                    continue
+                # expires_at is set by the application, so check rather than assume
+                live: bool = bool(
+                    await conn.scalar(
+                        text(
+                            f"SELECT EXISTS (SELECT 1 FROM {name} "
+                            "WHERE expires_at >= :cutoff)"
+                        ),
+                        {"cutoff": cutoff},
+                    )
+                )
+                if live:
+                    continue
+                if name in attached:
+                    mode: str = "FINALIZE" if name in pending else "CONCURRENTLY"
+                    await conn.execute(
+                        text(f"ALTER TABLE links DETACH PARTITION {name} {mode}")
+                    )
+                await conn.execute(
+                    text(
+                        "DELETE FROM link_clicks "
+                        f"WHERE slug IN (SELECT slug FROM {name})"
+                    )
+                )
+                await conn.execute(text(f"DROP TABLE {name}"))
+                dropped.append(name)
+        finally:
+            await conn.execute(
+                text("SELECT pg_advisory_unlock(:lock)"), {"lock": PARTITION_LOCK_ID}
+            )
+    return dropped
+
+
+async def link_partitions(
+    conn: AsyncConnection, detach_pending: bool = False
+) -> list[str]:
+    """
+    Returns the names of the partitions of the links table, oldest first.
+
+    Args:
+        conn: The connection to query on.
+        detach_pending: Only return partitions whose DETACH ... CONCURRENTLY
+            was interrupted.
+    """
+    pending: str = " AND i.inhdetachpending" if detach_pending else ""
+    result = await conn.scalars(
+        text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            f"WHERE i.inhparent = 'links'::regclass{pending} ORDER BY c.relname"
+        )
+    )
+    return list(result.all())
+
+
+async def detached_link_partitions(conn: AsyncConnection) -> list[str]:
+    """Returns the names of daily partitions detached but not dropped yet."""
+    result = await conn.scalars(
+        text(
+            "SELECT c.relname FROM pg_class c "
+            "WHERE c.relnamespace = "
+            "(SELECT relnamespace FROM pg_class WHERE oid = 'links'::regclass) "
+            "AND c.relkind = 'r' AND NOT c.relispartition "
+            "AND c.relname LIKE :pattern ORDER BY c.relname"
+        ),
+        {"pattern": f"{PARTITION_PREFIX}%"},
+    )
+    return list(result.all())
+
+
+def is_missing_partition(error: DBAPIError) -> bool:
+    """Whether a statement failed because no partition holds its row's day."""
+    return isinstance(error.orig, psycopg.errors.CheckViolation) and str(
+        error.orig
+    ).startswith("no partition of relation")
@@ -0,0 +1,50 @@
+"""Read-only redirect node, serving GET /{slug} from a slug snapshot file
+
+Needs no database: build the snapshot with `python -m cli.cli snapshot`, ship
+it to settings.snapshot_path, and replace it to publish new links."""
+
+# Imported first, so that the other imports are timed
+from metrics.startup import startup_timer
+
+# isort: split
+
+import asyncio
+from contextlib import asynccontextmanager, suppress
+from typing import AsyncGenerator
+
+from fastapi import FastAPI
+
+from config.config import settings
+from metrics.metrics import MetricsMiddleware, gauge_sources
+from routes.edge import router as edge_router
+from routes.metrics import router as metrics_router
+from services.snapshot import slug_snapshot
+from tasks.snapshot import reload_snapshot
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI) -> AsyncGenerator:
+    slug_snapshot.reload()
+    startup_timer.mark("snapshot")
+    task: asyncio.Task | None = None
+    if settings.snapshot_reload_interval > 0:
+        task = asyncio.create_task(reload_snapshot())
+    startup_timer.ready()
+    yield
+    if task:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+
+
+app: FastAPI = FastAPI(title=settings.app_name, lifespan=lifespan)
+
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
+    gauge_sources.update(snapshot=slug_snapshot.stats, startup=startup_timer.stats)
+    # Before the edge router, so /{slug} does not swallow /metrics
+    app.include_router(metrics_router)
+
+app.include_router(edge_router)
+
+startup_timer.mark("imports")
@@ -16,6 +16,21 @@ class SelfReferencingURLError(ValueError):
         super().__init__(f"Cannot shorten URLs pointing to the service itself: {url}")
 
 
+class SlugLengthError(ValueError):
+    def __init__(self, slug: str, limit: int) -> None:
+        super().__init__(f"Slug must be 1 to {limit} characters long: {slug}")
+
+
+class SlugCharactersError(ValueError):
+    def __init__(self, slug: str) -> None:
+        super().__init__(f"Slug may only hold ASCII letters and digits: {slug}")
+
+
+class ReservedSlugError(ValueError):
+    def __init__(self, slug: str) -> None:
+        super().__init__(f"Slug is reserved for a route of the service: {slug}")
+
+
 class NoMatchingSlugError(Exception):
     def __init__(self, slug: str) -> None:
         super().__init__(f"{slug} does not exist")
@@ -24,3 +39,64 @@ class NoMatchingSlugError(Exception):
 class LinkExpiredError(Exception):
     def __init__(self, slug: str, max_url_age: int) -> None:
         super().__init__(f"{slug} has expired: older than {max_url_age} days old.")
+
+
+class SlugSpaceExhaustedError(ValueError):
+    def __init__(self, value: int, length: int) -> None:
+        super().__init__(
+            f"Sequence value {value} does not fit in a {length} character slug"
+        )
+
+
+class InvalidImportRecordError(ValueError):
+    def __init__(self, field: str, reason: str) -> None:
+        super().__init__(f"Invalid {field}: {reason}")
+
+
+class MissingSlugKeyError(ValueError):
+    def __init__(self) -> None:
+        super().__init__(
+            "SLUG_STRATEGY=sequence requires a SLUG_KEY, or slugs can be enumerated"
+        )
+
+
+class MissingPostgresSettingsError(ValueError):
+    def __init__(self, missing: list[str]) -> None:
+        super().__init__(
+            f"Connecting to Postgres requires {', '.join(missing)}; only edge "
+            "nodes and STORAGE_BACKEND=memory run without them"
+        )
+
+
+class UnpartitionableSlugStrategyError(ValueError):
+    def __init__(self, strategy: str) -> None:
+        super().__init__(
+            f"LINKS_PARTITIONED requires SLUG_STRATEGY=sequence, not {strategy}"
+        )
+
+
+class BloomFilterWithoutNotifyError(ValueError):
+    def __init__(self) -> None:
+        super().__init__(
+            "BLOOM_FILTER requires CACHE_NOTIFY, or links created by other "
+            "processes answer 404 until the next rebuild"
+        )
+
+
+class InvalidSnapshotError(ValueError):
+    def __init__(self, path: str, reason: str) -> None:
+        super().__init__(f"Invalid slug snapshot {path}: {reason}")
+
+
+class SchemaOutdatedError(Exception):
+    def __init__(self, found: int, expected: int) -> None:
+        super().__init__(
+            f"Database schema is at version {found}, this code needs {expected}: "
+            "run `python -m cli.cli migrate`"
+        )
+
+
+class OverloadedError(Exception):
+    def __init__(self, route_class: str, retry_after: int) -> None:
+        super().__init__(f"Too many {route_class} requests, retry in {retry_after}s")
+        self.retry_after: int = retry_after
@@ -1,19 +1,121 @@
-from contextlib import asynccontextmanager
+# Imported first, so that the other imports are timed
+from metrics.startup import startup_timer
+
+# isort: split
+
+import asyncio
+from contextlib import asynccontextmanager, suppress
 from typing import AsyncGenerator
 
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 
 from config.config import settings
-from database.database import create_tables
+from database.database import engine_hooks, get_engine, pool_stats
+from metrics.metrics import MetricsMiddleware, gauge_sources, instrument_engine
+from metrics.profiler import ProfilerMiddleware, profile_engine, request_profiler
+from routes.admin import router as admin_router
+from routes.metrics import router as metrics_router
+from routes.routes import FastJSONResponse
 from routes.routes import router as shorten_router
+from services.admission import redirect_admission, shorten_admission
+from services.analytics import click_recorder
+from services.bloom import slug_filter
+from services.cache import slug_cache
+from services.hot import hot_slugs, warm_slug_cache
+from services.notify import slug_change_listener, slug_publisher
+from services.url import shorten_coalescer
+from storage.storage import link_store
+from tasks.bloom import rebuild_slug_filter
+from tasks.hot import snapshot_hot_slugs
+from tasks.purge import purge_expired_links
 
 
 @asynccontextmanager
 async def lifespan(_: FastAPI) -> AsyncGenerator:
-    await create_tables()
+    await link_store.setup()
+    startup_timer.mark("storage")
+    click_recorder.write = link_store.record_clicks
+    # The cache, Bloom filter and hot slug snapshots sit in front of Postgres
+    postgres: bool = settings.storage_backend == "postgres"
+    hot: bool = postgres and settings.hot_slugs_top_k > 0
+    if hot and settings.cache_size > 0:
+        # Resolve the slugs other processes see most, before taking traffic
+        await warm_slug_cache(get_engine(), settings.hot_slugs_top_k)
+        startup_timer.mark("cache_warm_up")
+    tasks: list[asyncio.Task] = []
+    if settings.purge_interval > 0:
+        tasks.append(asyncio.create_task(purge_expired_links()))
+    if hot and settings.hot_slugs_snapshot_interval > 0:
+        tasks.append(asyncio.create_task(snapshot_hot_slugs()))
+    if postgres and settings.cache_notify:
+        tasks.append(
+            asyncio.create_task(
+                slug_change_listener.run(settings.postgres_dsn, get_engine())
+            )
+        )
+    if postgres and settings.bloom_filter:
+        await slug_filter.rebuild(get_engine())
+        startup_timer.mark("bloom_filter")
+        if settings.bloom_rebuild_interval > 0:
+            tasks.append(asyncio.create_task(rebuild_slug_filter()))
+    clicks_task: asyncio.Task | None = None
+    if settings.click_tracking:
+        clicks_task = asyncio.create_task(click_recorder.run())
+    publish_task: asyncio.Task | None = None
+    if postgres and settings.cache_notify:
+        publish_task = asyncio.create_task(slug_publisher.run(get_engine()))
+    startup_timer.mark("tasks")
+    startup_timer.ready()
     yield
+    if settings.coalesce_writes:
+        await shorten_coalescer.drain()
+    if clicks_task:
+        click_recorder.stop()
+        await clicks_task
+    if publish_task:
+        slug_publisher.stop()
+        await publish_task
+    for task in tasks:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+
 
+app: FastAPI = FastAPI(
+    title=settings.app_name,
+    lifespan=lifespan,
+    default_response_class=(
+        FastJSONResponse if settings.fast_serialization else JSONResponse
+    ),
+)
 
-app: FastAPI = FastAPI(title=settings.app_name, lifespan=lifespan)
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
+    engine_hooks.append(instrument_engine)
+    gauge_sources.update(
+        cache=slug_cache.stats,
+        db_pool=pool_stats,
+        clicks=click_recorder.stats,
+        bloom=slug_filter.stats,
+        coalescer=shorten_coalescer.stats,
+        notify=slug_change_listener.stats,
+        notify_publisher=slug_publisher.stats,
+        hot_slugs=hot_slugs.stats,
+        shorten_admission=shorten_admission.stats,
+        redirect_admission=redirect_admission.stats,
+        startup=startup_timer.stats,
+    )
+    # Before the shorten router, so /{slug} does not swallow /metrics
+    app.include_router(metrics_router)
 
+if request_profiler.enabled:
+    app.add_middleware(ProfilerMiddleware)
+    engine_hooks.append(profile_engine)
+    if settings.metrics_enabled:
+        gauge_sources.update(profiler=request_profiler.stats)
+
+app.include_router(admin_router)
 app.include_router(shorten_router)
+
+startup_timer.mark("imports")
@@ -0,0 +1,197 @@
+"""Request and database instrumentation, exposed in Prometheus text format"""
+
+import time
+from bisect import bisect_left
+from collections.abc import Callable
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Connection, ExceptionContext
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+LATENCY_BUCKETS: tuple[float, ...] = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+STATEMENT_BUCKETS: tuple[float, ...] = (0, 1, 2, 3, 5, 10, 25)
+
+
+class Histogram:
+    """Cumulative-bucket histogram, keyed by a tuple of label values"""
+
+    def __init__(
+        self, name: str, help_text: str, labels: tuple[str, ...], buckets: tuple
+    ) -> None:
+        self.name: str = name
+        self.help_text: str = help_text
+        self.labels: tuple[str, ...] = labels
+        self.buckets: tuple = buckets
+        # Per label set: [count per bucket (+Inf last), sum]
+        self._series: dict[tuple[str, ...], tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, labels: tuple[str, ...]) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = ([0] * (len(self.buckets) + 1), [0.0])
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1][0] += value
+
+    def clear(self) -> None:
+        self._series.clear()
+
+    def render(self) -> list[str]:
+        lines: list[str] = [
+            f"# HELP {self.name} {self.help_text}",
+            f"# TYPE {self.name} histogram",
+        ]
+        for labels, (counts, total) in sorted(self._series.items()):
+            label_text: str = ",".join(
+                f'{name}="{value}"'
+                for name, value in zip(self.labels, labels, strict=True)
+            )
+            prefix: str = f"{label_text}," if label_text else ""
+            cumulative: int = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts, strict=True):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+            suffix: str = f"{{{label_text}}}" if label_text else ""
+            lines.append(f"{self.name}_sum{suffix} {total[0]}")
+            lines.append(f"{self.name}_count{suffix} {cumulative}")
+        return lines
+
+
+class RequestStats:
+    """Database work done while serving one request"""
+
+    __slots__ = ("db_time", "statements")
+
+    def __init__(self) -> None:
+        self.statements: int = 0
+        self.db_time: float = 0.0
+
+
+request_stats: ContextVar[RequestStats | None] = ContextVar(
+    "request_stats", default=None
+)
+
+request_latency = Histogram(
+    "http_request_duration_seconds",
+    "Time spent serving HTTP requests",
+    ("method", "route", "status"),
+    LATENCY_BUCKETS,
+)
+request_statements = Histogram(
+    "http_request_db_statements",
+    "Database statements run per HTTP request",
+    ("route",),
+    STATEMENT_BUCKETS,
+)
+request_db_time = Histogram(
+    "http_request_db_duration_seconds",
+    "Time spent in database statements per HTTP request",
+    ("route",),
+    LATENCY_BUCKETS,
+)
+statement_latency = Histogram(
+    "db_statement_duration_seconds",
+    "Time spent in each database statement, including background tasks",
+    (),
+    LATENCY_BUCKETS,
+)
+
+# Callables returning {name: value} for gauges, read at scrape time
+gauge_sources: dict[str, Callable[[], dict]] = {}
+
+
+class MetricsMiddleware:
+    """Times every HTTP request and records the database work it caused"""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app: ASGIApp = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = RequestStats()
+        token = request_stats.set(stats)
+        status: int = 500
+        start: float = time.perf_counter()
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed: float = time.perf_counter() - start
+            request_stats.reset(token)
+            route = scope.get("route")
+            path: str = route.path if route else "unmatched"
+            request_latency.observe(elapsed, (scope["method"], path, str(status)))
+            request_statements.observe(stats.statements, (path,))
+            request_db_time.observe(stats.db_time, (path,))
+
+
+def _before_cursor_execute(conn: Connection, **_: object) -> None:
+    conn.info.setdefault("statement_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn: Connection, **_: object) -> None:
+    elapsed: float = time.perf_counter() - conn.info["statement_start"].pop()
+    statement_latency.observe(elapsed, ())
+    stats: RequestStats | None = request_stats.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.db_time += elapsed
+
+
+def _handle_error(exception_context: ExceptionContext) -> None:
+    conn: Connection | None = exception_context.connection
+    if conn is not None and conn.info.get("statement_start"):
+        conn.info["statement_start"].pop()
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """Counts and times every statement run through the engine"""
+    event.listen(
+        engine.sync_engine, "before_cursor_execute", _before_cursor_execute, named=True
+    )
+    event.listen(
+        engine.sync_engine, "after_cursor_execute", _after_cursor_execute, named=True
+    )
+    event.listen(engine.sync_engine, "handle_error", _handle_error)
+
+
+def render_metrics() -> str:
+    lines: list[str] = []
+    for histogram in (
+        request_latency,
+        request_statements,
+        request_db_time,
+        statement_latency,
+    ):
+        lines.extend(histogram.render())
+    for source, collect in gauge_sources.items():
+        for name, value in collect().items():
+            if isinstance(value, bool) or not isinstance(value, int | float):
+                continue
+            metric: str = f"{source}_{name}"
+            lines.append(f"# TYPE {metric} gauge")
+            lines.append(f"{metric} {value}")
+    return "\n".join(lines) + "\n"
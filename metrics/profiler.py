@@ -0,0 +1,277 @@
+"""Opt-in sampling profiler for HTTP requests
+
+A sampler thread periodically reads the event loop thread's stack and, when
+a profiled request is running, counts the stack against it. Waiting (on the
+database, or other requests) leaves no samples, so the SQL statements each
+request ran are recorded with their durations alongside. Finished profiles go
+into a ring buffer, exported as collapsed stacks for flamegraph tools."""
+
+import itertools
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+from types import FrameType
+
+from sqlalchemy import event
+from sqlalchemy.engine import Connection, ExceptionContext
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from config.config import settings
+
+
+class Profile:
+    """Stack samples and SQL statements of one request"""
+
+    def __init__(self, profile_id: int, method: str, path: str, thread: int) -> None:
+        self.profile_id: int = profile_id
+        self.method: str = method
+        self.path: str = path
+        self.thread: int = thread
+        self.started_at: float = time.time()
+        self.duration: float = 0.0
+        self.status: int = 500
+        # Picked at random, rather than only kept if slow
+        self.sampled: bool = False
+        # Collapsed stack, root first -> number of samples
+        self.samples: Counter[str] = Counter()
+        # (statement, seconds)
+        self.statements: list[tuple[str, float]] = []
+
+    def summary(self) -> dict:
+        return {
+            "id": self.profile_id,
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "started_at": self.started_at,
+            "duration_ms": self.duration * 1000,
+            "samples": self.samples.total(),
+            "statements": [
+                {"sql": statement, "duration_ms": elapsed * 1000}
+                for statement, elapsed in self.statements
+            ],
+        }
+
+
+current_profile: ContextVar[Profile | None] = ContextVar(
+    "current_profile", default=None
+)
+
+
+class RequestProfiler:
+    """Profiles a random sample_rate share of requests, plus (when
+    slow_threshold is set) every request taking slow_threshold seconds or
+    more, and keeps the last capacity profiles.
+
+    With a slow_threshold every request is sampled while it runs, since
+    slowness is only known at the end; profiles of fast requests are then
+    dropped."""
+
+    def __init__(
+        self,
+        sample_rate: float,
+        slow_threshold: float,
+        interval: float,
+        capacity: int,
+    ) -> None:
+        self.sample_rate: float = sample_rate
+        self.slow_threshold: float = slow_threshold
+        self.interval: float = interval
+        self.profiles: deque[Profile] = deque(maxlen=capacity)
+        # id() of each profiled request's middleware frame -> its profile
+        self._active: dict[int, Profile] = {}
+        self._busy: threading.Event = threading.Event()
+        self._sampler: threading.Thread | None = None
+        self._ids: itertools.count = itertools.count(1)
+        self.sampled: int = 0
+        self.kept: int = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.sample_rate > 0 or self.slow_threshold > 0
+
+    def start(self, frame: FrameType, method: str, path: str) -> Profile | None:
+        """
+        Starts profiling a request, if it is picked.
+
+        Args:
+            frame: The frame of the coroutine serving the request; samples with
+                it on the stack are counted against the request.
+            method: The HTTP method.
+            path: The request path.
+
+        Returns:
+            The profile, or None if the request is not profiled.
+        """
+        sampled: bool = random.random() < self.sample_rate
+        if not (sampled or self.slow_threshold > 0):
+            return None
+        profile = Profile(next(self._ids), method, path, threading.get_ident())
+        profile.sampled = sampled
+        self._active[id(frame)] = profile
+        if self._sampler is None:
+            self._sampler = threading.Thread(
+                target=self._run, name="request-profiler", daemon=True
+            )
+            self._sampler.start()
+        self._busy.set()
+        return profile
+
+    def finish(self, frame: FrameType, profile: Profile) -> None:
+        """Stops profiling a request, keeping the profile if it was picked at
+        random or ran slow."""
+        self._active.pop(id(frame), None)
+        self.sampled += 1
+        if profile.sampled or (
+            self.slow_threshold > 0 and profile.duration >= self.slow_threshold
+        ):
+            self.profiles.append(profile)
+            self.kept += 1
+
+    def collapsed(self, profile_id: int | None = None) -> str:
+        """
+        Renders profiles as collapsed stacks ("frame;frame;frame count" lines),
+        as read by flamegraph.pl, speedscope and similar tools.
+
+        Each stack is rooted at the request's method and route. SQL statements
+        are added as [sql] frames weighted by their duration, so time spent
+        waiting on the database shows up next to time spent on the CPU.
+
+        Args:
+            profile_id: Render only this profile, rather than every one kept.
+        """
+        lines: Counter[str] = Counter()
+        for profile in list(self.profiles):
+            if profile_id is not None and profile.profile_id != profile_id:
+                continue
+            root: str = f"{profile.method} {profile.path}"
+            for stack, count in profile.samples.items():
+                lines[f"{root};{stack}" if stack else root] += count
+            for statement, elapsed in profile.statements:
+                weight: int = round(elapsed / self.interval)
+                if weight:
+                    sql: str = " ".join(statement.split())[:120].replace(";", ",")
+                    lines[f"{root};[sql] {sql}"] += weight
+        return "".join(f"{stack} {count}\n" for stack, count in lines.items())
+
+    def stats(self) -> dict:
+        return {
+            "active": len(self._active),
+            "sampled": self.sampled,
+            "kept": self.kept,
+            "buffered": len(self.profiles),
+        }
+
+    def clear(self) -> None:
+        self.profiles.clear()
+        self.sampled = self.kept = 0
+
+    def _run(self) -> None:
+        while True:
+            self._busy.wait()
+            time.sleep(self.interval)
+            active: dict[int, Profile] = self._active.copy()
+            if not active:
+                self._busy.clear()
+                # A request may have started between the copy and the clear
+                if self._active:
+                    self._busy.set()
+                continue
+            self._sample(active)
+
+    @staticmethod
+    def _sample(active: dict[int, Profile]) -> None:
+        frames: dict[int, FrameType] = sys._current_frames()
+        for thread in {profile.thread for profile in active.values()}:
+            frame: FrameType | None = frames.get(thread)
+            stack: list[str] = []
+            while frame is not None:
+                profile: Profile | None = active.get(id(frame))
+                if profile is not None:
+                    profile.samples[";".join(reversed(stack))] += 1
+                    break
+                stack.append(frame_label(frame))
+                frame = frame.f_back
+
+
+def frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    filename: str = code.co_filename.rpartition("site-packages/")[2]
+    return f"{code.co_qualname} ({filename}:{code.co_firstlineno})"
+
+
+class ProfilerMiddleware:
+    """Profiles requests picked by request_profiler"""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app: ASGIApp = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        frame: FrameType = sys._getframe()
+        profile: Profile | None = request_profiler.start(
+            frame, scope["method"], scope["path"]
+        )
+        if profile is None:
+            await self.app(scope, receive, send)
+            return
+        token = current_profile.set(profile)
+        start: float = time.perf_counter()
+
+        async def send_with_status(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                profile.status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            profile.duration = time.perf_counter() - start
+            current_profile.reset(token)
+            route = scope.get("route")
+            if route is not None:
+                profile.path = route.path
+            request_profiler.finish(frame, profile)
+
+
+def _before_cursor_execute(conn: Connection, **_: object) -> None:
+    if current_profile.get() is not None:
+        conn.info.setdefault("profile_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn: Connection, statement: str, **_: object) -> None:
+    profile: Profile | None = current_profile.get()
+    if profile is not None and conn.info.get("profile_start"):
+        elapsed: float = time.perf_counter() - conn.info["profile_start"].pop()
+        profile.statements.append((statement, elapsed))
+
+
+def _handle_error(exception_context: ExceptionContext) -> None:
+    conn: Connection | None = exception_context.connection
+    if conn is not None and conn.info.get("profile_start"):
+        conn.info["profile_start"].pop()
+
+
+def profile_engine(engine: AsyncEngine) -> None:
+    """Records the statements profiled requests run through the engine"""
+    event.listen(
+        engine.sync_engine, "before_cursor_execute", _before_cursor_execute, named=True
+    )
+    event.listen(
+        engine.sync_engine, "after_cursor_execute", _after_cursor_execute, named=True
+    )
+    event.listen(engine.sync_engine, "handle_error", _handle_error)
+
+
+request_profiler: RequestProfiler = RequestProfiler(
+    sample_rate=settings.profile_sample_rate,
+    slow_threshold=settings.profile_slow_threshold,
+    interval=settings.profile_interval,
+    capacity=settings.profile_buffer_size,
+)
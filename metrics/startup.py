@@ -0,0 +1,67 @@
+"""Startup timing, from when this module is first imported
+
+Import it before anything else, so that the time spent importing the rest of
+the application is counted."""
+
+import logging
+import os
+import time
+from pathlib import Path
+
+# Shown alongside uvicorn's own startup messages
+logger: logging.Logger = logging.getLogger("uvicorn.error")
+
+
+def process_age() -> float | None:
+    """Returns the seconds since this process started, or None off Linux."""
+    try:
+        stat: str = Path("/proc/self/stat").read_text()
+        uptime: str = Path("/proc/uptime").read_text()
+    except OSError:
+        return None
+    # Fields after the command name, which may hold spaces; starttime is the 22nd
+    started: int = int(stat.rpartition(")")[2].split()[19])
+    return float(uptime.split()[0]) - started / os.sysconf("SC_CLK_TCK")
+
+
+class StartupTimer:
+    """Times each step of starting a process"""
+
+    def __init__(self) -> None:
+        self.started: float = time.perf_counter()
+        self._last: float = self.started
+        # Step -> seconds it took, in order
+        self.steps: dict[str, float] = {}
+        # Seconds from process start (interpreter included) to ready
+        self.process_age: float | None = None
+
+    def mark(self, step: str) -> None:
+        """Records that step has finished, taking the time since the last one."""
+        now: float = time.perf_counter()
+        self.steps[step] = now - self._last
+        self._last = now
+
+    def ready(self) -> None:
+        """Logs how long startup took and each step's share of it."""
+        self.process_age = process_age()
+        steps: str = ", ".join(
+            f"{step} {seconds:.3f}s" for step, seconds in self.steps.items()
+        )
+        since_start: str = (
+            f", {self.process_age:.2f}s after process start"
+            if self.process_age is not None
+            else ""
+        )
+        logger.info(
+            "Ready in %.3fs%s (%s)", self._last - self.started, since_start, steps
+        )
+
+    def stats(self) -> dict:
+        return {
+            **{f"{step}_seconds": seconds for step, seconds in self.steps.items()},
+            "total_seconds": self._last - self.started,
+            "process_age_seconds": self.process_age,
+        }
+
+
+startup_timer: StartupTimer = StartupTimer()
@@ -2,7 +2,15 @@
 
 from datetime import datetime
 
-from sqlalchemy import DateTime, Identity, Integer, String
+from sqlalchemy import (
+    BigInteger,
+    DateTime,
+    Identity,
+    Integer,
+    LargeBinary,
+    Sequence,
+    String,
+)
 from sqlalchemy.dialects.postgresql import TEXT
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 from sqlalchemy.sql import func
@@ -14,23 +22,73 @@ class Base(DeclarativeBase):
     pass
 
 
+link_slug_seq: Sequence = Sequence("link_slug_seq", metadata=Base.metadata)
+
+
 class Link(Base):
+    """With settings.links_partitioned, links are range-partitioned by day of
+    created_ts. Postgres only enforces uniqueness within a partition, so the
+    slug index is not unique there and slugs must come from the sequence."""
+
     __tablename__ = "links"
+    __table_args__ = (
+        {"postgresql_partition_by": "RANGE (created_ts)"}
+        if settings.links_partitioned
+        else {}
+    )
 
     link_id: Mapped[int] = mapped_column(
         Integer, Identity(always=True), primary_key=True
     )
     slug: Mapped[TEXT] = mapped_column(
-        String(), unique=True, index=True, nullable=False
+        String(), unique=not settings.links_partitioned, index=True, nullable=False
     )
     long_url: Mapped[TEXT] = mapped_column(
         String(length=settings.max_url_length), nullable=False
     )
+    url_hash: Mapped[bytes | None] = mapped_column(
+        LargeBinary(length=16), index=True, nullable=True
+    )
     created_ts: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True), server_default=func.now()
+        DateTime(timezone=True),
+        server_default=func.now(),
+        # The partition key has to be part of the primary key
+        primary_key=settings.links_partitioned,
+    )
+    expires_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), index=True, nullable=False
     )
 
     def __repr__(self) -> str:
         return (
             f"Link(link_id={self.link_id}, slug={self.slug}, long_url={self.long_url})"
         )
+
+
+class LinkClicks(Base):
+    __tablename__ = "link_clicks"
+
+    slug: Mapped[TEXT] = mapped_column(String(), primary_key=True)
+    clicks: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    last_access_ts: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False
+    )
+
+    def __repr__(self) -> str:
+        return f"LinkClicks(slug={self.slug}, clicks={self.clicks})"
+
+
+class HotSlug(Base):
+    """The most requested slugs, snapshotted by each process so that new
+    processes can warm their redirect cache before taking traffic"""
+
+    __tablename__ = "hot_slugs"
+
+    slug: Mapped[TEXT] = mapped_column(String(), primary_key=True)
+    hits: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    updated_ts: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+
+    def __repr__(self) -> str:
+        return f"HotSlug(slug={self.slug}, hits={self.hits})"
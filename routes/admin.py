@@ -0,0 +1,56 @@
+"""FastAPI admin routes"""
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from database.database import pool_stats
+from metrics.profiler import request_profiler
+from services.analytics import click_recorder
+from services.bloom import slug_filter
+from services.cache import slug_cache
+from services.hot import hot_slugs
+
+router = APIRouter(prefix="/admin")
+
+
+@router.get("/bloom")
+async def read_bloom_stats() -> dict:
+    return slug_filter.stats()
+
+
+@router.get("/cache")
+async def read_cache_stats() -> dict:
+    return slug_cache.stats()
+
+
+@router.get("/clicks")
+async def read_click_stats() -> dict:
+    return click_recorder.stats()
+
+
+@router.get("/hot")
+async def read_hot_slugs(limit: int | None = None) -> dict:
+    return {
+        **hot_slugs.stats(),
+        "slugs": [{"slug": slug, "hits": hits} for slug, hits in hot_slugs.top(limit)],
+    }
+
+
+@router.get("/pool")
+async def read_pool_stats() -> dict:
+    return pool_stats()
+
+
+@router.get("/profiles")
+async def read_profiles() -> dict:
+    return {
+        **request_profiler.stats(),
+        "profiles": [
+            profile.summary() for profile in reversed(request_profiler.profiles)
+        ],
+    }
+
+
+@router.get("/profiles/collapsed", response_class=PlainTextResponse)
+async def read_collapsed_profiles(profile_id: int | None = None) -> str:
+    return request_profiler.collapsed(profile_id)
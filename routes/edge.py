@@ -0,0 +1,36 @@
+"""FastAPI routes of read-only edge nodes"""
+
+import time
+from datetime import datetime, timezone
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import RedirectResponse
+
+from config.config import settings
+from exceptions.exceptions import LinkExpiredError, NoMatchingSlugError
+from routes.redirects import redirect_headers
+from services.snapshot import slug_snapshot
+
+router = APIRouter()
+
+
+@router.get("/")
+async def read_root() -> dict:
+    return {"message": "Nice day for a picnic!"}
+
+
+@router.api_route("/{slug}", methods=["GET", "HEAD"])
+async def return_long_url(slug: str) -> RedirectResponse:
+    link: tuple[str, int] | None = slug_snapshot.lookup(slug)
+    if link is None:
+        raise HTTPException(status_code=404, detail=str(NoMatchingSlugError(slug)))
+    long_url, expires_at = link
+    if expires_at <= time.time():
+        raise HTTPException(
+            status_code=410, detail=str(LinkExpiredError(slug, settings.max_url_age))
+        )
+    return RedirectResponse(
+        url=long_url,
+        status_code=settings.redirect_status,
+        headers=redirect_headers(datetime.fromtimestamp(expires_at, timezone.utc)),
+    )
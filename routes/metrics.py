@@ -0,0 +1,13 @@
+"""FastAPI metrics route"""
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from metrics.metrics import render_metrics
+
+router = APIRouter()
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def read_metrics() -> str:
+    return render_metrics()
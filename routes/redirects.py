@@ -0,0 +1,21 @@
+"""Response headers of redirects, shared by the main and edge apps
+
+Kept free of storage and database imports, so that edge nodes load neither."""
+
+from datetime import datetime, timezone
+
+from config.config import settings
+
+
+def redirect_headers(expires_at: datetime) -> dict[str, str]:
+    """Lets clients and CDNs cache a redirect, but never past the link's expiry.
+
+    Without REDIRECT_CACHE_MAX_AGE redirects are marked no-store, since browsers
+    otherwise cache permanent (301/308) redirects indefinitely."""
+    if settings.redirect_cache_max_age <= 0:
+        return {"Cache-Control": "no-store"}
+    remaining: int = int((expires_at - datetime.now(timezone.utc)).total_seconds())
+    max_age: int = min(settings.redirect_cache_max_age, remaining)
+    if max_age <= 0:
+        return {"Cache-Control": "no-store"}
+    return {"Cache-Control": f"public, max-age={max_age}"}
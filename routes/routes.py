@@ -1,45 +1,140 @@
 """FastAPI Routes"""
 
-from typing import Annotated
+from typing import Annotated, Any
 
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi.responses import RedirectResponse
-from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import JSONResponse, RedirectResponse
+from pydantic import ValidationError
+from pydantic_core import to_json
 
-from database.database import get_db
-from exceptions.exceptions import LinkExpiredError, NoMatchingSlugError
-from schemas.schemas import LongUrlAccept, ShortUrlReturn
-from services.url import UrlService
+from config.config import settings
+from exceptions.exceptions import (
+    LinkExpiredError,
+    NoMatchingSlugError,
+    OverloadedError,
+)
+from routes.redirects import redirect_headers
+from schemas.schemas import (
+    LinkStatsReturn,
+    LongUrlAccept,
+    LongUrlBatchAccept,
+    ShortUrlBatchItem,
+    ShortUrlBatchReturn,
+    ShortUrlReturn,
+)
+from services.admission import shorten_admission
+from services.analytics import click_recorder
+from services.hot import hot_slugs
+from storage.storage import LinkStore, get_link_store
 
 router = APIRouter()
 
 
+class FastJSONResponse(JSONResponse):
+    """Encodes with pydantic-core's Rust serializer instead of json.dumps"""
+
+    def render(self, content: Any) -> bytes:  # noqa: ANN401
+        return to_json(content)
+
+
 @router.get("/")
 async def read_root() -> dict:
     return {"message": "Nice day for a picnic!"}
 
 
-@router.post("/shorten")
+def overloaded(e: OverloadedError) -> HTTPException:
+    """A fast 503 for shed requests, telling clients when to come back"""
+    return HTTPException(
+        status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)}
+    )
+
+
+@router.post("/shorten", response_model=ShortUrlReturn)
 async def return_short_url(
-    payload: LongUrlAccept, db: Annotated[AsyncSession, Depends(get_db)]
-) -> ShortUrlReturn:
+    payload: LongUrlAccept, store: Annotated[LinkStore, Depends(get_link_store)]
+) -> ShortUrlReturn | Response:
     try:
-        short_url: str = await UrlService().create_short_url(
-            db=db, long_url=str(payload.long_url)
-        )
+        async with shorten_admission.admit():
+            short_url: str = await store.create_short_url(str(payload.long_url))
+    except OverloadedError as e:
+        raise overloaded(e) from e
     except Exception as e:
         raise HTTPException(status_code=500, detail="Internal error") from e
+    if settings.fast_serialization:
+        # Built by the server from base_url, so not parsed back into an HttpUrl
+        return FastJSONResponse({"short_url": short_url})
     return ShortUrlReturn(short_url=short_url)  # type: ignore
 
 
-@router.get("/{slug}")
+@router.post("/shorten/batch", response_model=ShortUrlBatchReturn)
+async def return_short_urls(
+    payload: LongUrlBatchAccept, store: Annotated[LinkStore, Depends(get_link_store)]
+) -> ShortUrlBatchReturn | Response:
+    errors: dict[int, str] = {}
+    valid: dict[int, str] = {}
+    for index, long_url in enumerate(payload.long_urls):
+        try:
+            valid[index] = str(LongUrlAccept(long_url=long_url).long_url)  # type: ignore
+        except ValidationError as e:
+            errors[index] = e.errors()[0]["msg"]
+    try:
+        async with shorten_admission.admit():
+            short_urls: list[str | None] = await store.create_short_urls(
+                list(valid.values())
+            )
+    except OverloadedError as e:
+        raise overloaded(e) from e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail="Internal error") from e
+    saved: dict[int, str | None] = dict(zip(valid, short_urls, strict=True))
+    results: list[dict[str, str | None]] = []
+    for index, long_url in enumerate(payload.long_urls):
+        if index in errors:
+            item = {"long_url": long_url, "short_url": None, "error": errors[index]}
+        elif saved[index] is None:
+            item = {"long_url": long_url, "short_url": None, "error": "Internal error"}
+        else:
+            item = {"long_url": long_url, "short_url": saved[index], "error": None}
+        results.append(item)
+    if settings.fast_serialization:
+        return FastJSONResponse({"results": results})
+    return ShortUrlBatchReturn(
+        results=[ShortUrlBatchItem(**item) for item in results]  # type: ignore
+    )
+
+
+@router.api_route("/{slug}", methods=["GET", "HEAD"])
 async def return_long_url(
-    slug: str, db: Annotated[AsyncSession, Depends(get_db)]
+    slug: str,
+    request: Request,
+    store: Annotated[LinkStore, Depends(get_link_store)],
 ) -> RedirectResponse:
     try:
-        long_url: str | None = await UrlService().get_long_url(db=db, slug=slug)
+        long_url, expires_at = await store.get_link(slug)
     except NoMatchingSlugError as e:
         raise HTTPException(status_code=404, detail=str(e)) from e
     except LinkExpiredError as e:
         raise HTTPException(status_code=410, detail=str(e)) from e
-    return RedirectResponse(url=long_url if long_url else "/")
+    except OverloadedError as e:
+        raise overloaded(e) from e
+    # HEAD requests (link checkers, unfurlers) are not clicks
+    if request.method == "GET":
+        hot_slugs.record(slug)
+        if settings.click_tracking:
+            click_recorder.record(slug)
+    return RedirectResponse(
+        url=long_url,
+        status_code=settings.redirect_status,
+        headers=redirect_headers(expires_at),
+    )
+
+
+@router.get("/{slug}/stats")
+async def return_link_stats(
+    slug: str, store: Annotated[LinkStore, Depends(get_link_store)]
+) -> LinkStatsReturn:
+    try:
+        clicks, last_access_ts = await store.get_link_stats(slug)
+    except NoMatchingSlugError as e:
+        raise HTTPException(status_code=404, detail=str(e)) from e
+    return LinkStatsReturn(slug=slug, clicks=clicks, last_access_ts=last_access_ts)
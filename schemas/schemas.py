@@ -1,14 +1,24 @@
 """Pydantic models"""
 
-from pydantic import BaseModel, HttpUrl, field_validator
+from datetime import datetime
+
+from pydantic import BaseModel, Field, HttpUrl, field_validator
 
 from config.config import settings
 from exceptions.exceptions import (
+    ReservedSlugError,
     SelfReferencingURLError,
+    SlugCharactersError,
+    SlugLengthError,
     URLTooLongError,
     URLTooShortError,
 )
 
+# First path segments of the service's own routes, which /{slug} never sees
+RESERVED_SLUGS: frozenset[str] = frozenset(
+    {"admin", "docs", "metrics", "redoc", "shorten"}
+)
+
 
 class LongUrlAccept(BaseModel):
     long_url: HttpUrl
@@ -25,10 +35,47 @@ class LongUrlAccept(BaseModel):
     @field_validator("long_url")
     @classmethod
     def validate_reject_same_domain(cls, long_url: HttpUrl) -> HttpUrl:
-        if str(long_url.host) in str(settings.base_url):
+        if str(long_url.host) in settings.short_url_prefix:
             raise SelfReferencingURLError(str(long_url))
         return long_url
 
 
+class SlugAccept(BaseModel):
+    """A slug chosen by the caller rather than generated, e.g. when importing"""
+
+    slug: str
+
+    @field_validator("slug")
+    @classmethod
+    def validate_slug(cls, slug: str) -> str:
+        if not 0 < len(slug) <= settings.slug_length:
+            raise SlugLengthError(slug, settings.slug_length)
+        if not (slug.isascii() and slug.isalnum()):
+            raise SlugCharactersError(slug)
+        if slug in RESERVED_SLUGS:
+            raise ReservedSlugError(slug)
+        return slug
+
+
 class ShortUrlReturn(BaseModel):
     short_url: HttpUrl
+
+
+class LongUrlBatchAccept(BaseModel):
+    long_urls: list[str] = Field(min_length=1, max_length=settings.max_batch_size)
+
+
+class ShortUrlBatchItem(BaseModel):
+    long_url: str
+    short_url: HttpUrl | None = None
+    error: str | None = None
+
+
+class ShortUrlBatchReturn(BaseModel):
+    results: list[ShortUrlBatchItem]
+
+
+class LinkStatsReturn(BaseModel):
+    slug: str
+    clicks: int
+    last_access_ts: datetime | None
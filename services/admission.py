@@ -0,0 +1,133 @@
+"""Admission control for database-bound routes."""
+
+import asyncio
+import math
+import time
+from collections import deque
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+from config.config import settings
+from exceptions.exceptions import OverloadedError
+
+
+class AdmissionController:
+    """Caps how many requests of one route class use the database at once.
+
+    Requests beyond the limit wait in a bounded FIFO queue. A request is shed
+    (OverloadedError) rather than queued when the queue is full, or when the
+    recent time per request says it would wait longer than max_wait, and a
+    queued request that does reach max_wait is shed too. Shedding early keeps
+    a slow database from turning into a pile of requests that all time out."""
+
+    def __init__(self, name: str, limit: int, queue_size: int, max_wait: float) -> None:
+        self.name: str = name
+        self.limit: int = limit
+        self.queue_size: int = queue_size
+        self.max_wait: float = max_wait
+        self.active: int = 0
+        self._waiters: deque[asyncio.Future] = deque()
+        # Moving average of the time a request holds its slot
+        self.service_time: float = 0.0
+        self.admitted: int = 0
+        self.shed: int = 0
+        self.timeouts: int = 0
+
+    @asynccontextmanager
+    async def admit(self) -> AsyncIterator[None]:
+        """
+        Holds a slot for the duration of the block. With a limit of 0 or less,
+        every request is admitted at once.
+
+        Raises:
+            OverloadedError: If the request is shed.
+        """
+        if self.limit <= 0:
+            yield
+            return
+        await self._acquire()
+        start: float = time.monotonic()
+        try:
+            yield
+        finally:
+            self.service_time += 0.1 * (time.monotonic() - start - self.service_time)
+            self._release()
+
+    def expected_wait(self) -> float:
+        """Estimates how long a request joining the queue now would wait."""
+        return self.service_time * (len(self._waiters) + 1) / self.limit
+
+    def stats(self) -> dict:
+        """Returns the slot and queue counters."""
+        return {
+            "limit": self.limit,
+            "active": self.active,
+            "waiting": len(self._waiters),
+            "admitted": self.admitted,
+            "shed": self.shed,
+            "timeouts": self.timeouts,
+            "service_time_seconds": self.service_time,
+        }
+
+    async def _acquire(self) -> None:
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            self.admitted += 1
+            return
+        if (
+            len(self._waiters) >= self.queue_size
+            or self.expected_wait() > self.max_wait
+        ):
+            self.shed += 1
+            raise OverloadedError(self.name, self._retry_after())
+        waiter: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            async with asyncio.timeout(self.max_wait):
+                await waiter
+        except TimeoutError:
+            self.timeouts += 1
+            self.shed += 1
+            self._abandon(waiter)
+            raise OverloadedError(self.name, self._retry_after()) from None
+        except BaseException:
+            # e.g. the client went away while queued
+            self._abandon(waiter)
+            raise
+
+    def _abandon(self, waiter: asyncio.Future) -> None:
+        """Leaves the queue, passing on the slot if one was handed over meanwhile."""
+        if waiter.done() and not waiter.cancelled():
+            self._release()
+            return
+        waiter.cancel()
+        # _release drops cancelled waiters it comes across
+        if waiter in self._waiters:
+            self._waiters.remove(waiter)
+
+    def _release(self) -> None:
+        # The slot goes straight to the next waiter, so active stays the same
+        while self._waiters:
+            waiter: asyncio.Future = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                self.admitted += 1
+                return
+        self.active -= 1
+
+    def _retry_after(self) -> int:
+        return max(1, math.ceil(self.expected_wait()))
+
+
+shorten_admission: AdmissionController = AdmissionController(
+    name="shorten",
+    limit=settings.shorten_concurrency,
+    queue_size=settings.shorten_queue_size,
+    max_wait=settings.admission_max_wait,
+)
+redirect_admission: AdmissionController = AdmissionController(
+    name="redirect",
+    limit=settings.redirect_concurrency,
+    queue_size=settings.redirect_queue_size,
+    max_wait=settings.admission_max_wait,
+)
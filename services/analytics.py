@@ -0,0 +1,174 @@
+"""Service for click analytics."""
+
+import asyncio
+import logging
+import time
+from collections.abc import Awaitable, Callable
+from contextlib import suppress
+from datetime import datetime, timezone
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config.config import settings
+from database.database import async_session
+from exceptions.exceptions import NoMatchingSlugError
+from models.models import Link, LinkClicks
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+
+class AnalyticsService:
+    """Service class for storing and reading per-slug click counts."""
+
+    async def record_clicks(
+        self, db: AsyncSession, clicks: dict[str, tuple[int, float]]
+    ) -> None:
+        """
+        Adds click counts to the per-slug aggregates with one multi-row upsert.
+
+        Args:
+            db: The database session.
+            clicks: Maps each slug to its new clicks and latest access time (epoch).
+        """
+        stmt = insert(LinkClicks).values(
+            [
+                {
+                    "slug": slug,
+                    "clicks": count,
+                    "last_access_ts": datetime.fromtimestamp(ts, timezone.utc),
+                }
+                # Sorted so concurrent flushes lock rows in the same order
+                for slug, (count, ts) in sorted(clicks.items())
+            ]
+        )
+        await db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[LinkClicks.slug],
+                set_={
+                    "clicks": LinkClicks.clicks + stmt.excluded.clicks,
+                    "last_access_ts": func.greatest(
+                        LinkClicks.last_access_ts, stmt.excluded.last_access_ts
+                    ),
+                },
+            )
+        )
+        await db.commit()
+
+    async def get_link_stats(
+        self, db: AsyncSession, slug: str
+    ) -> tuple[int, datetime | None]:
+        """
+        Retrieves the click stats of a slug.
+
+        Args:
+            db: The database session.
+            slug: The slug to look up.
+
+        Returns:
+            The number of clicks and the time of the last click, if any.
+
+        Raises:
+            NoMatchingSlugError: If no matching slug is found.
+        """
+        result = await db.execute(
+            select(LinkClicks.clicks, LinkClicks.last_access_ts)
+            .select_from(Link)
+            .outerjoin(LinkClicks, LinkClicks.slug == Link.slug)
+            .where(Link.slug == slug)
+        )
+        row = result.first()
+        if not row:
+            raise NoMatchingSlugError(slug)
+        return row.clicks or 0, row.last_access_ts
+
+
+class ClickRecorder:
+    """Buffers redirect events in a bounded in-process queue.
+
+    A background worker writes them in aggregated batches whenever
+    settings.click_batch_size events are waiting or every
+    settings.click_flush_interval seconds. Events arriving while the queue is
+    full are dropped and counted."""
+
+    def __init__(self, queue_size: int, batch_size: int, flush_interval: float) -> None:
+        # Where flushed clicks go; the link store sets this at startup
+        self.write: Callable[[dict[str, tuple[int, float]]], Awaitable[None]] = (
+            self._write_to_database
+        )
+        self.batch_size: int = batch_size
+        self.flush_interval: float = flush_interval
+        self.queue: asyncio.Queue[tuple[str, float]] = asyncio.Queue(maxsize=queue_size)
+        self.recorded: int = 0
+        self.dropped: int = 0
+        self.flushed: int = 0
+        self._wakeup: asyncio.Event = asyncio.Event()
+        self._stopping: bool = False
+
+    def record(self, slug: str) -> None:
+        """Queues a click on a slug without waiting."""
+        try:
+            self.queue.put_nowait((slug, time.time()))
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return
+        self.recorded += 1
+        if self.queue.qsize() >= self.batch_size:
+            self._wakeup.set()
+
+    async def run(self) -> None:
+        """Flushes queued clicks until stopped, then flushes what is left."""
+        while not self._stopping:
+            with suppress(TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            self._wakeup.clear()
+            await self.flush()
+        await self.flush()
+        # Reset here rather than on entry, so a stop() that comes before the
+        # task first runs is not lost
+        self._stopping = False
+
+    def stop(self) -> None:
+        """Asks the worker started with run() to do a final flush and return."""
+        self._stopping = True
+        self._wakeup.set()
+
+    async def flush(self) -> None:
+        """Writes every queued click, one aggregated batch at a time."""
+        while not self.queue.empty():
+            events: int = min(self.batch_size, self.queue.qsize())
+            clicks: dict[str, tuple[int, float]] = {}
+            for _ in range(events):
+                slug, ts = self.queue.get_nowait()
+                count, last_ts = clicks.get(slug, (0, 0.0))
+                clicks[slug] = (count + 1, max(last_ts, ts))
+            try:
+                await self.write(clicks)
+            except SQLAlchemyError:
+                logger.exception("Writing %d clicks failed", events)
+                self.dropped += events
+                continue
+            self.flushed += events
+
+    @staticmethod
+    async def _write_to_database(clicks: dict[str, tuple[int, float]]) -> None:
+        async with async_session() as db:
+            await AnalyticsService().record_clicks(db=db, clicks=clicks)
+
+    def stats(self) -> dict:
+        """Returns the recorder counters."""
+        return {
+            "queued": self.queue.qsize(),
+            "recorded": self.recorded,
+            "flushed": self.flushed,
+            "dropped": self.dropped,
+        }
+
+
+click_recorder: ClickRecorder = ClickRecorder(
+    queue_size=settings.click_queue_size,
+    batch_size=settings.click_batch_size,
+    flush_interval=settings.click_flush_interval,
+)
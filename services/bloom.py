@@ -0,0 +1,159 @@
+"""In-process Bloom filter over known slugs."""
+
+import asyncio
+import math
+from collections.abc import Iterable
+from datetime import timedelta
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from config.config import settings
+from models.models import Link
+from services.hashing import double_hashes
+
+
+class SlugBloomFilter:
+    """Bloom filter answering "this slug is definitely not a link" in memory.
+
+    Slugs it was built from, or given through add, are never reported missing,
+    so a negative answer can be turned into a 404 without a database lookup.
+    Until the first build every slug is reported as possibly present."""
+
+    def __init__(self, capacity: int, error_rate: float) -> None:
+        self.capacity: int = capacity
+        self.error_rate: float = error_rate
+        self._bits: bytearray | None = None
+        self._size: int = 0
+        self._hashes: int = 0
+        # Slugs added while a rebuild is streaming, replayed into the new bits
+        self._pending: list[str] | None = None
+        # Periodic rebuilds and resyncs after a lost listener may overlap
+        self._rebuild_lock: asyncio.Lock = asyncio.Lock()
+        self.slugs: int = 0
+        self.rejections: int = 0
+        self.rebuilds: int = 0
+
+    @property
+    def built(self) -> bool:
+        return self._bits is not None
+
+    def might_contain(self, slug: str) -> bool:
+        """
+        Checks whether a slug may exist.
+
+        Args:
+            slug: The slug to check.
+
+        Returns:
+            False if the slug is definitely unknown, True otherwise.
+        """
+        bits: bytearray | None = self._bits
+        if bits is None:
+            return True
+        for position in double_hashes(slug, self._size, self._hashes):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                self.rejections += 1
+                return False
+        return True
+
+    def add(self, slug: str) -> None:
+        """Records a newly created slug."""
+        if self._pending is not None:
+            self._pending.append(slug)
+        if self._bits is not None:
+            self._set(self._bits, (slug,), self._size, self._hashes)
+            self.slugs += 1
+
+    async def rebuild(self, engine: AsyncEngine) -> int:
+        """
+        Rebuilds the filter from the links table, dropping slugs that are gone.
+
+        Links stay in the filter until they are due for purging, so expired
+        links keep answering 410 rather than 404 until they are deleted. The
+        filter is sized for the current number of links or self.capacity,
+        whichever is larger, and swapped in only once complete. Overlapping
+        calls run one after the other.
+
+        Args:
+            engine: The engine to read slugs from. Use the primary, so links
+                created moments ago are not missed.
+
+        Returns:
+            The number of slugs in the new filter.
+        """
+        async with self._rebuild_lock:
+            retained = Link.expires_at > func.now() - timedelta(
+                days=settings.purge_after_days
+            )
+            self._pending = []
+            try:
+                async with engine.connect() as conn:
+                    total: int = await conn.scalar(
+                        select(func.count()).select_from(Link).where(retained)
+                    )
+                    size, hashes = self._dimensions(
+                        max(self.capacity, math.ceil(total * 1.25)), self.error_rate
+                    )
+                    bits: bytearray = bytearray((size + 7) // 8)
+                    count: int = 0
+                    result = await conn.stream(
+                        select(Link.slug)
+                        .where(retained)
+                        .execution_options(yield_per=10000)
+                    )
+                    async for slugs in result.scalars().partitions():
+                        self._set(bits, slugs, size, hashes)
+                        count += len(slugs)
+                        # Hashing a partition is CPU-bound, let requests in between
+                        await asyncio.sleep(0)
+                self._set(bits, self._pending, size, hashes)
+                count += len(self._pending)
+                self._bits, self._size, self._hashes = bits, size, hashes
+                self.slugs = count
+                self.rebuilds += 1
+            finally:
+                self._pending = None
+            return count
+
+    def clear(self) -> None:
+        """Drops the filter, so every slug is possibly present again."""
+        self._bits = None
+        self._size = self._hashes = 0
+        self.slugs = self.rejections = self.rebuilds = 0
+
+    def stats(self) -> dict:
+        """Returns the filter size and counters, for sizing the filter."""
+        fill: float = (
+            int.from_bytes(self._bits).bit_count() / self._size if self._bits else 0.0
+        )
+        return {
+            "built": self.built,
+            "bits": self._size,
+            "hashes": self._hashes,
+            "slugs": self.slugs,
+            "rejections": self.rejections,
+            "rebuilds": self.rebuilds,
+            "fill_ratio": fill,
+            "false_positive_rate": fill**self._hashes if self._bits else 0.0,
+        }
+
+    @staticmethod
+    def _dimensions(capacity: int, error_rate: float) -> tuple[int, int]:
+        """Returns the (bits, hashes) giving error_rate at capacity slugs."""
+        size: int = max(
+            8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        )
+        return size, max(1, round(size / max(capacity, 1) * math.log(2)))
+
+    @staticmethod
+    def _set(bits: bytearray, slugs: Iterable[str], size: int, hashes: int) -> None:
+        for slug in slugs:
+            for position in double_hashes(slug, size, hashes):
+                bits[position >> 3] |= 1 << (position & 7)
+
+
+slug_filter: SlugBloomFilter = SlugBloomFilter(
+    capacity=settings.bloom_capacity,
+    error_rate=settings.bloom_error_rate,
+)
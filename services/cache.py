@@ -0,0 +1,116 @@
+"""In-process cache for slug lookups."""
+
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from config.config import settings
+
+
+class SlugCache:
+    """Bounded LRU cache mapping slugs to long URLs, with per-entry TTLs.
+
+    Slugs known not to exist are cached as None (negative caching)."""
+
+    def __init__(self, max_size: int, ttl: float, negative_ttl: float) -> None:
+        self.max_size: int = max_size
+        self.ttl: float = ttl
+        self.negative_ttl: float = negative_ttl
+        # slug -> (long_url, link expiry, cache deadline); long_url None if missing
+        self._entries: OrderedDict[str, tuple[str | None, datetime | None, float]] = (
+            OrderedDict()
+        )
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+        self.expirations: int = 0
+
+    def get_link(self, slug: str) -> tuple[bool, tuple[str, datetime] | None]:
+        """
+        Looks up a slug in the cache, along with the expiry of its link.
+
+        Args:
+            slug: The slug to look up.
+
+        Returns:
+            A (cached, (long_url, expires_at)) tuple. The link is None for
+            negative entries.
+        """
+        entry: tuple[str | None, datetime | None, float] | None = self._entries.get(
+            slug
+        )
+        if entry is None:
+            self.misses += 1
+            return False, None
+        long_url, expires_at, deadline = entry
+        if time.monotonic() >= deadline:
+            del self._entries[slug]
+            self.expirations += 1
+            self.misses += 1
+            return False, None
+        self._entries.move_to_end(slug)
+        self.hits += 1
+        if long_url is None or expires_at is None:
+            return True, None
+        return True, (long_url, expires_at)
+
+    def put(self, slug: str, long_url: str, expires_at: datetime) -> None:
+        """
+        Caches a long URL, never beyond the expiry of the link itself.
+
+        Args:
+            slug: The slug of the link.
+            long_url: The long URL the slug resolves to.
+            expires_at: When the link expires.
+        """
+        remaining: float = (expires_at - datetime.now(timezone.utc)).total_seconds()
+        self._store(slug, long_url, expires_at, min(self.ttl, remaining))
+
+    def put_missing(self, slug: str) -> None:
+        """Caches the fact that a slug does not exist."""
+        self._store(slug, None, None, self.negative_ttl)
+
+    def invalidate(self, slug: str) -> None:
+        """Removes a slug from the cache, if present."""
+        self._entries.pop(slug, None)
+
+    def clear(self, reset_stats: bool = True) -> None:
+        """Removes every entry and, unless told otherwise, resets the counters."""
+        self._entries.clear()
+        if reset_stats:
+            self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def stats(self) -> dict:
+        """Returns the cache counters, for sizing the cache."""
+        lookups: int = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+    def _store(
+        self,
+        slug: str,
+        long_url: str | None,
+        expires_at: datetime | None,
+        lifetime: float,
+    ) -> None:
+        if self.max_size <= 0 or lifetime <= 0:
+            return
+        self._entries[slug] = (long_url, expires_at, time.monotonic() + lifetime)
+        self._entries.move_to_end(slug)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+
+slug_cache: SlugCache = SlugCache(
+    max_size=settings.cache_size,
+    ttl=settings.cache_ttl,
+    negative_ttl=settings.cache_negative_ttl,
+)
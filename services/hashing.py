@@ -0,0 +1,66 @@
+"""Hashing shared by the in-memory sketches over slugs, and of long URLs."""
+
+import hashlib
+from collections.abc import Iterator
+from urllib.parse import urlsplit, urlunsplit
+
+
+def double_hashes(key: str, modulus: int, count: int) -> Iterator[int]:
+    """
+    Derives count hash values below modulus from one digest of key.
+
+    Double hashing (Kirsch and Mitzenmacher): a single 128-bit blake2b digest
+    is split into two 64-bit hashes h1 and h2, and value i is
+    (h1 + i * h2) % modulus. h2 is made odd, so the values are distinct
+    whenever modulus is a power of two.
+
+    Args:
+        key: The key to hash, e.g. a slug.
+        modulus: The exclusive upper bound of the values.
+        count: How many values to derive.
+
+    Returns:
+        The values, lazily.
+    """
+    digest: int = int.from_bytes(hashlib.blake2b(key.encode(), digest_size=16).digest())
+    first: int = digest >> 64
+    second: int = (digest & 0xFFFFFFFFFFFFFFFF) | 1
+    return ((first + index * second) % modulus for index in range(count))
+
+
+def normalize_url(long_url: str) -> str:
+    """
+    Normalizes a URL so equivalent spellings compare equal.
+
+    Lower-cases the scheme and host, drops default ports and fills in an
+    empty path.
+
+    Args:
+        long_url: The URL to normalize.
+
+    Returns:
+        The normalized URL.
+    """
+    parts = urlsplit(long_url)
+    scheme: str = parts.scheme.lower()
+    netloc: str = (parts.hostname or "").lower()
+    if ":" in netloc:
+        netloc = f"[{netloc}]"
+    if parts.username or parts.password:
+        netloc = f"{parts.netloc.rpartition('@')[0]}@{netloc}"
+    if parts.port and (scheme, parts.port) not in (("http", 80), ("https", 443)):
+        netloc = f"{netloc}:{parts.port}"
+    return urlunsplit((scheme, netloc, parts.path or "/", parts.query, parts.fragment))
+
+
+def hash_url(long_url: str) -> bytes:
+    """
+    Hashes the normalized form of a URL into a fixed-width lookup key.
+
+    Args:
+        long_url: The URL to hash.
+
+    Returns:
+        A 16-byte digest.
+    """
+    return hashlib.blake2b(normalize_url(long_url).encode(), digest_size=16).digest()
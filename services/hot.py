@@ -0,0 +1,193 @@
+"""Hot slug detection, for pre-warming the redirect cache of new processes."""
+
+import heapq
+import sys
+from array import array
+from datetime import timedelta
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from config.config import settings
+from models.models import HotSlug, Link
+from services.cache import slug_cache
+from services.hashing import double_hashes
+
+
+class HotSlugTracker:
+    """Fixed-memory estimate of the most requested slugs.
+
+    A count-min sketch of depth rows of width counters estimates how often
+    each slug was requested (never under, sometimes over), and a min-heap
+    keeps the top_k slugs by estimate. Every 10 * width requests all counts
+    are halved, so slugs that stop being requested drop out of the top."""
+
+    def __init__(self, width: int, depth: int, top_k: int) -> None:
+        self.width: int = width
+        self.depth: int = depth
+        self.top_k: int = top_k
+        self._rows: list[array] = [array("I", [0]) * width for _ in range(depth)]
+        # Every counter of a row but its top bit, to halve a row in one shift
+        counter_bits: int = 8 * self._rows[0].itemsize
+        self._halving_mask: int = int.from_bytes(
+            ((1 << (counter_bits - 1)) - 1).to_bytes(counter_bits // 8, sys.byteorder)
+            * width,
+            sys.byteorder,
+        )
+        # slug -> estimate, and one (estimate, slug) heap entry per slug. Heap
+        # entries lag behind as counts grow and are refreshed on eviction.
+        self._top: dict[str, int] = {}
+        self._heap: list[tuple[int, str]] = []
+        self._sample_size: int = 10 * width
+        self._since_decay: int = 0
+        self.requests: int = 0
+        self.decays: int = 0
+
+    def record(self, slug: str) -> None:
+        """Counts one request for a slug."""
+        if self.top_k <= 0:
+            return
+        self.requests += 1
+        self._since_decay += 1
+        if self._since_decay >= self._sample_size:
+            self._decay()
+        estimate: int = self._increment(slug)
+        top: dict[str, int] = self._top
+        if slug in top:
+            top[slug] = estimate
+            return
+        if len(top) < self.top_k:
+            top[slug] = estimate
+            heapq.heappush(self._heap, (estimate, slug))
+            return
+        while True:
+            lowest, victim = self._heap[0]
+            if top[victim] == lowest:
+                break
+            heapq.heapreplace(self._heap, (top[victim], victim))
+        if estimate > lowest:
+            heapq.heapreplace(self._heap, (estimate, slug))
+            del top[victim]
+            top[slug] = estimate
+
+    def estimate(self, slug: str) -> int:
+        """Returns the estimated number of requests for a slug."""
+        return min(
+            row[index]
+            for row, index in zip(
+                self._rows, double_hashes(slug, self.width, self.depth), strict=True
+            )
+        )
+
+    def top(self, limit: int | None = None) -> list[tuple[str, int]]:
+        """Returns the hottest slugs and their estimates, hottest first."""
+        return sorted(self._top.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+    def clear(self) -> None:
+        for row in self._rows:
+            row[:] = array("I", [0]) * self.width
+        self._top.clear()
+        self._heap.clear()
+        self._since_decay = self.requests = self.decays = 0
+
+    def stats(self) -> dict:
+        """Returns the sketch size and counters."""
+        return {
+            "width": self.width,
+            "depth": self.depth,
+            "top_k": self.top_k,
+            "tracked": len(self._top),
+            "requests": self.requests,
+            "decays": self.decays,
+        }
+
+    def _increment(self, slug: str) -> int:
+        estimate: int | None = None
+        for row, index in zip(
+            self._rows, double_hashes(slug, self.width, self.depth), strict=True
+        ):
+            count: int = row[index] + 1
+            row[index] = count
+            estimate = count if estimate is None else min(estimate, count)
+        return estimate or 0
+
+    def _decay(self) -> None:
+        # Runs inside a request, so each row is halved as one big integer:
+        # shifting it right moves every counter's low bit into the top bit of
+        # its neighbour, which the mask clears.
+        for row in self._rows:
+            halved: int = (
+                int.from_bytes(row.tobytes(), sys.byteorder) >> 1
+            ) & self._halving_mask
+            row[:] = array(
+                row.typecode, halved.to_bytes(len(row) * row.itemsize, sys.byteorder)
+            )
+        self._top = {slug: count >> 1 for slug, count in self._top.items()}
+        self._heap = [(count, slug) for slug, count in self._top.items()]
+        heapq.heapify(self._heap)
+        self._since_decay = 0
+        self.decays += 1
+
+
+async def save_hot_slugs(db: AsyncSession, slugs: list[tuple[str, int]]) -> None:
+    """
+    Records this process's hottest slugs for processes that start later.
+
+    Rows no process has refreshed for three snapshot intervals are dropped,
+    so slugs that cooled down, or belonged to stopped processes, age out.
+
+    Args:
+        db: The database session.
+        slugs: (slug, estimate) pairs, from HotSlugTracker.top.
+    """
+    if slugs:
+        stmt = insert(HotSlug).values(
+            # Sorted so concurrent snapshots lock rows in the same order
+            [{"slug": slug, "hits": hits} for slug, hits in sorted(slugs)]
+        )
+        await db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[HotSlug.slug],
+                set_={"hits": stmt.excluded.hits, "updated_ts": func.now()},
+            )
+        )
+    await db.execute(
+        delete(HotSlug).where(
+            HotSlug.updated_ts
+            < func.now() - timedelta(seconds=3 * settings.hot_slugs_snapshot_interval)
+        )
+    )
+    await db.commit()
+
+
+async def warm_slug_cache(engine: AsyncEngine, limit: int) -> int:
+    """
+    Loads the links of the hottest recorded slugs into the redirect cache.
+
+    Args:
+        engine: The engine to read from.
+        limit: How many of the hottest slugs to load.
+
+    Returns:
+        The number of links cached.
+    """
+    async with engine.connect() as conn:
+        result = await conn.execute(
+            select(Link.slug, Link.long_url, Link.expires_at)
+            .join(HotSlug, HotSlug.slug == Link.slug)
+            .where(Link.expires_at > func.now())
+            .order_by(HotSlug.hits.desc())
+            .limit(limit)
+        )
+        rows = result.all()
+    for slug, long_url, expires_at in rows:
+        slug_cache.put(slug, long_url, expires_at)
+    return len(rows)
+
+
+hot_slugs: HotSlugTracker = HotSlugTracker(
+    width=settings.hot_slugs_sketch_width,
+    depth=settings.hot_slugs_sketch_depth,
+    top_k=settings.hot_slugs_top_k,
+)
@@ -0,0 +1,222 @@
+"""Slug change events shared between application processes via LISTEN/NOTIFY."""
+
+import asyncio
+import logging
+from collections.abc import Iterator
+from contextlib import suppress
+from typing import Literal
+
+import psycopg
+from psycopg import sql
+from sqlalchemy import func, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from config.config import settings
+from services.bloom import slug_filter
+from services.cache import slug_cache
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+SlugEvent = Literal["created", "deleted"]
+# Postgres rejects NOTIFY payloads of 8000 bytes or more
+MAX_PAYLOAD: int = 7900
+
+
+def encode_events(event: SlugEvent, slugs: list[str]) -> Iterator[str]:
+    """
+    Packs slugs into as few NOTIFY payloads as fit, e.g. "created:abc,def".
+
+    Args:
+        event: What happened to the slugs.
+        slugs: The slugs.
+
+    Yields:
+        The payloads.
+    """
+    payload: list[str] = []
+    size: int = len(event) + 1
+    for slug in slugs:
+        if payload and size + len(slug) + 1 > MAX_PAYLOAD:
+            yield f"{event}:{','.join(payload)}"
+            payload, size = [], len(event) + 1
+        payload.append(slug)
+        size += len(slug) + 1
+    if payload:
+        yield f"{event}:{','.join(payload)}"
+
+
+async def publish_slug_changes(
+    db: AsyncSession, event: SlugEvent, slugs: list[str]
+) -> None:
+    """
+    Tells other processes about changed slugs, once db's transaction commits.
+
+    Does nothing unless settings.cache_notify is set. Used for purged slugs and
+    bulk imports; slugs created through the API go through slug_publisher.
+
+    Args:
+        db: The session whose transaction made the change.
+        event: What happened to the slugs.
+        slugs: The slugs.
+    """
+    if not settings.cache_notify:
+        return
+    for payload in encode_events(event, slugs):
+        await db.execute(select(func.pg_notify(settings.cache_notify_channel, payload)))
+
+
+class CreatedSlugPublisher:
+    """Publishes the slugs this process creates, a batch at a time.
+
+    Running pg_notify in the transaction creating a link would add a statement
+    to every insert, and NOTIFY takes a database-wide lock from the time it
+    queues until the transaction commits, serializing the commits of every
+    process. Created slugs are instead collected and published every
+    flush_interval seconds, in a short transaction of their own.
+
+    The trade-off: other processes learn about a new slug up to flush_interval
+    after its short URL was handed out. Until then, a client following the new
+    link to another process gets a 404 there, if the Bloom filter rejects the
+    slug or it is cached as missing. Slugs whose publish fails are queued again
+    and retried on the next flush, up to capacity; slugs beyond it, and slugs
+    still waiting when a process dies, are never published and stay unknown to
+    other processes' Bloom filters until their next rebuild."""
+
+    def __init__(self, channel: str, flush_interval: float, capacity: int) -> None:
+        self.channel: str = channel
+        self.flush_interval: float = flush_interval
+        self.capacity: int = capacity
+        self._created: list[str] = []
+        self._wakeup: asyncio.Event = asyncio.Event()
+        self._stopping: bool = False
+        self.published: int = 0
+        self.dropped: int = 0
+        self.failures: int = 0
+        self.flushes: int = 0
+
+    def add(self, slugs: list[str]) -> None:
+        """Queues newly committed slugs, if settings.cache_notify is set."""
+        if settings.cache_notify:
+            self._created.extend(slugs)
+
+    async def run(self, engine: AsyncEngine) -> None:
+        """Publishes queued slugs until stopped, then publishes what is left."""
+        while not self._stopping:
+            with suppress(TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            self._wakeup.clear()
+            await self.flush(engine)
+        await self.flush(engine)
+        # Reset here rather than on entry, so a stop() that comes before the
+        # task first runs is not lost
+        self._stopping = False
+
+    def stop(self) -> None:
+        """Asks the worker started with run() to do a final flush and return."""
+        self._stopping = True
+        self._wakeup.set()
+
+    async def flush(self, engine: AsyncEngine) -> None:
+        """Publishes every queued slug in one transaction, requeueing them if
+        that fails."""
+        if not self._created:
+            return
+        slugs, self._created = self._created, []
+        try:
+            async with engine.begin() as conn:
+                for payload in encode_events("created", slugs):
+                    await conn.execute(select(func.pg_notify(self.channel, payload)))
+        except SQLAlchemyError:
+            logger.exception("Publishing %d created slugs failed", len(slugs))
+            self.failures += 1
+            # Ahead of slugs queued meanwhile, dropping the oldest past capacity
+            self._created = slugs + self._created
+            overflow: int = len(self._created) - self.capacity
+            if overflow > 0:
+                del self._created[:overflow]
+                self.dropped += overflow
+            return
+        self.published += len(slugs)
+        self.flushes += 1
+
+    def stats(self) -> dict:
+        """Returns the publisher counters."""
+        return {
+            "queued": len(self._created),
+            "published": self.published,
+            "dropped": self.dropped,
+            "failures": self.failures,
+            "flushes": self.flushes,
+        }
+
+
+class SlugChangeListener:
+    """Applies slug change events from other processes to the local caches.
+
+    Created slugs are evicted from the slug cache (which may hold a negative
+    entry) and added to the Bloom filter; deleted slugs are evicted. If the
+    connection drops, events may have been missed, so after reconnecting the
+    cache is cleared and a built Bloom filter is rebuilt."""
+
+    def __init__(self, channel: str, reconnect_delay: float) -> None:
+        self.channel: str = channel
+        self.reconnect_delay: float = reconnect_delay
+        self.received: int = 0
+        self.reconnects: int = 0
+
+    async def run(self, dsn: str, engine: AsyncEngine) -> None:
+        """
+        Listens for events until cancelled, reconnecting on errors.
+
+        Args:
+            dsn: The psycopg connection string of the primary.
+            engine: The engine to rebuild the Bloom filter from.
+        """
+        connected_before: bool = False
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(
+                    dsn, autocommit=True
+                ) as conn:
+                    await conn.execute(
+                        sql.SQL("LISTEN {}").format(sql.Identifier(self.channel))
+                    )
+                    if connected_before:
+                        self.reconnects += 1
+                        await self._resync(engine)
+                    connected_before = True
+                    async for notify in conn.notifies():
+                        self.handle(notify.payload)
+            except (psycopg.Error, SQLAlchemyError, OSError):
+                logger.exception("Listening for slug changes failed")
+            await asyncio.sleep(self.reconnect_delay)
+
+    def handle(self, payload: str) -> None:
+        """Applies one event payload, as built by encode_events."""
+        event, _, slugs = payload.partition(":")
+        self.received += 1
+        for slug in slugs.split(","):
+            slug_cache.invalidate(slug)
+            if event == "created":
+                slug_filter.add(slug)
+
+    def stats(self) -> dict:
+        """Returns the listener counters."""
+        return {"received": self.received, "reconnects": self.reconnects}
+
+    @staticmethod
+    async def _resync(engine: AsyncEngine) -> None:
+        slug_cache.clear(reset_stats=False)
+        if slug_filter.built:
+            await slug_filter.rebuild(engine)
+
+
+slug_publisher: CreatedSlugPublisher = CreatedSlugPublisher(
+    channel=settings.cache_notify_channel,
+    flush_interval=settings.cache_notify_interval,
+    capacity=settings.cache_notify_queue_size,
+)
+slug_change_listener: SlugChangeListener = SlugChangeListener(
+    channel=settings.cache_notify_channel, reconnect_delay=1.0
+)
@@ -0,0 +1,157 @@
+"""Random slugs, and collision-free slugs derived from database sequence values."""
+
+import asyncio
+import hashlib
+import secrets
+import string
+from collections import deque
+
+from sqlalchemy import Sequence, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config.config import settings
+from exceptions.exceptions import SlugSpaceExhaustedError
+from models.models import link_slug_seq
+
+BASE62: str = string.ascii_letters + string.digits
+
+
+def generate_slug(length: int) -> str:
+    """
+    Generates a random slug of a given length.
+
+    Args:
+        length: The desired length of the slug.
+
+    Returns:
+        A random slug.
+    """
+    return "".join(secrets.choice(seq=BASE62) for _ in range(length))
+
+
+class SlugPermutation:
+    """Keyed, reversible permutation of the integers [0, 62**length).
+
+    Uses a Feistel network with cycle walking, so consecutive sequence values
+    map to unrelated-looking fixed-length base62 slugs, and every slug can be
+    decoded back to the value it came from."""
+
+    rounds: int = 4
+
+    def __init__(self, length: int, key: bytes) -> None:
+        self.length: int = length
+        self.size: int = 62**length
+        self._half_bits: int = ((self.size - 1).bit_length() + 1) // 2
+        self._mask: int = (1 << self._half_bits) - 1
+        self._key: bytes = hashlib.blake2b(key, digest_size=32).digest()
+
+    def encode(self, value: int) -> str:
+        """
+        Maps a sequence value to its slug.
+
+        Args:
+            value: A non-negative integer below 62**length.
+
+        Returns:
+            The slug for the value.
+
+        Raises:
+            SlugSpaceExhaustedError: If the value does not fit in the slug space.
+        """
+        if not 0 <= value < self.size:
+            raise SlugSpaceExhaustedError(value, self.length)
+        number: int = self._permute(value)
+        chars: list[str] = []
+        for _ in range(self.length):
+            number, digit = divmod(number, 62)
+            chars.append(BASE62[digit])
+        return "".join(reversed(chars))
+
+    def decode(self, slug: str) -> int:
+        """
+        Maps a slug back to the sequence value it was derived from.
+
+        Args:
+            slug: A slug produced by encode.
+
+        Returns:
+            The sequence value.
+        """
+        number: int = 0
+        for char in slug:
+            number = number * 62 + BASE62.index(char)
+        return self._unpermute(number)
+
+    def _round(self, index: int, half: int) -> int:
+        digest: bytes = hashlib.blake2b(
+            half.to_bytes(8, "big"), key=self._key, salt=bytes([index]), digest_size=8
+        ).digest()
+        return int.from_bytes(digest, "big") & self._mask
+
+    def _permute(self, number: int) -> int:
+        while True:
+            left, right = number >> self._half_bits, number & self._mask
+            for index in range(self.rounds):
+                left, right = right, left ^ self._round(index, right)
+            number = (left << self._half_bits) | right
+            if number < self.size:
+                return number
+
+    def _unpermute(self, number: int) -> int:
+        while True:
+            left, right = number >> self._half_bits, number & self._mask
+            for index in reversed(range(self.rounds)):
+                left, right = right ^ self._round(index, left), left
+            number = (left << self._half_bits) | right
+            if number < self.size:
+                return number
+
+
+class SequenceSlugAllocator:
+    """Hands out slugs derived from blocks of pre-reserved sequence values.
+
+    Values are reserved settings.slug_block_size at a time in one round trip,
+    so most slugs are allocated without touching the database at all."""
+
+    def __init__(
+        self, sequence: Sequence, permutation: SlugPermutation, block_size: int
+    ) -> None:
+        self.sequence: Sequence = sequence
+        self.permutation: SlugPermutation = permutation
+        self.block_size: int = block_size
+        self._reserved: deque[int] = deque()
+        self._lock: asyncio.Lock = asyncio.Lock()
+
+    async def allocate(self, db: AsyncSession, count: int) -> list[str]:
+        """
+        Allocates slugs that no other writer can be given.
+
+        Args:
+            db: The database session.
+            count: The number of slugs needed.
+
+        Returns:
+            The allocated slugs.
+        """
+        async with self._lock:
+            if len(self._reserved) < count:
+                reserve: int = max(self.block_size, count - len(self._reserved))
+                values = await db.scalars(
+                    select(self.sequence.next_value()).select_from(
+                        func.generate_series(1, reserve)
+                    )
+                )
+                self._reserved.extend(values.all())
+            return [
+                self.permutation.encode(self._reserved.popleft()) for _ in range(count)
+            ]
+
+
+slug_allocator: SequenceSlugAllocator = SequenceSlugAllocator(
+    sequence=link_slug_seq,
+    permutation=SlugPermutation(
+        length=settings.slug_length,
+        key=settings.slug_key.get_secret_value().encode(),
+    ),
+    block_size=settings.slug_block_size,
+)
@@ -0,0 +1,208 @@
+"""Read-only slug snapshots, for redirect nodes without a database.
+
+A snapshot file holds, after a fixed-size header:
+
+- keys: every slug, NUL-padded to the same width, sorted bytewise
+- expiries: the expiry of each link, as int64 epoch seconds
+- offsets: count + 1 uint64 offsets of each long URL into the blob
+- blob: the UTF-8 long URLs, back to back
+
+so a slug is found by binary search over the memory-mapped keys, without
+loading or decoding the file."""
+
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+import time
+from bisect import bisect_left
+from collections.abc import Iterable
+
+from config.config import settings
+from exceptions.exceptions import InvalidSnapshotError
+
+MAGIC: bytes = b"SLUGSNP1"
+# magic, link count, slug width, reserved, created at (epoch seconds)
+HEADER: struct.Struct = struct.Struct("<8sQIIq")
+EXPIRY: struct.Struct = struct.Struct("<q")
+OFFSET: struct.Struct = struct.Struct("<Q")
+URL_SPAN: struct.Struct = struct.Struct("<QQ")
+
+
+def write_snapshot(
+    path: str, rows: Iterable[tuple[str, str, int]], count: int, width: int
+) -> int:
+    """
+    Writes a snapshot, replacing any file at path only once it is complete.
+
+    Args:
+        path: Where to write the snapshot.
+        rows: (slug, long_url, expires_at epoch) rows, sorted by slug bytewise.
+        count: The number of rows.
+        width: The length in bytes of the longest slug.
+
+    Returns:
+        The number of links written.
+
+    Raises:
+        InvalidSnapshotError: If the rows are unsorted or not count of them.
+    """
+    partial: str = f"{path}.partial"
+    written: int = 0
+    with (
+        open(partial, "wb") as file,
+        tempfile.TemporaryFile() as expiries,
+        tempfile.TemporaryFile() as offsets,
+        tempfile.TemporaryFile() as blob,
+    ):
+        file.write(HEADER.pack(MAGIC, count, width, 0, int(time.time())))
+        offsets.write(OFFSET.pack(0))
+        previous: bytes = b""
+        position: int = 0
+        for slug, long_url, expires_at in rows:
+            key: bytes = slug.encode().ljust(width, b"\0")
+            if len(key) != width:
+                raise InvalidSnapshotError(path, f"slug {slug!r} is over {width} bytes")
+            if key <= previous:
+                raise InvalidSnapshotError(path, f"slug {slug!r} out of order")
+            previous = key
+            url: bytes = long_url.encode()
+            position += len(url)
+            file.write(key)
+            expiries.write(EXPIRY.pack(expires_at))
+            offsets.write(OFFSET.pack(position))
+            blob.write(url)
+            written += 1
+        if written != count:
+            raise InvalidSnapshotError(path, f"expected {count} links, got {written}")
+        for section in (expiries, offsets, blob):
+            section.seek(0)
+            shutil.copyfileobj(section, file)
+        file.flush()
+        os.fsync(file.fileno())
+    # Readers either see the old file or the whole new one
+    os.replace(partial, path)
+    return written
+
+
+class SlugSnapshot:
+    """A memory-mapped snapshot file.
+
+    Indexing returns the padded slug key at a position, so bisect can search
+    the keys in place."""
+
+    def __init__(self, path: str) -> None:
+        with open(path, "rb") as file:
+            try:
+                self._map: mmap.mmap = mmap.mmap(
+                    file.fileno(), 0, access=mmap.ACCESS_READ
+                )
+            except ValueError:
+                # mmap refuses empty files
+                raise InvalidSnapshotError(path, "empty") from None
+        try:
+            magic, self.count, self.width, _, self.created_at = HEADER.unpack_from(
+                self._map
+            )
+        except struct.error:
+            self._map.close()
+            raise InvalidSnapshotError(path, "truncated header") from None
+        self._expiries: int = HEADER.size + self.count * self.width
+        self._offsets: int = self._expiries + self.count * EXPIRY.size
+        self._blob: int = self._offsets + (self.count + 1) * OFFSET.size
+        if magic != MAGIC or len(self._map) < self._blob:
+            self._map.close()
+            raise InvalidSnapshotError(path, "not a slug snapshot")
+        (blob_size,) = OFFSET.unpack_from(self._map, self._blob - OFFSET.size)
+        if len(self._map) != self._blob + blob_size:
+            self._map.close()
+            raise InvalidSnapshotError(path, "truncated")
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, index: int) -> bytes:
+        start: int = HEADER.size + index * self.width
+        return self._map[start : start + self.width]
+
+    def lookup(self, slug: str) -> tuple[str, int] | None:
+        """
+        Finds a link by binary search over the keys.
+
+        Args:
+            slug: The slug to look up.
+
+        Returns:
+            The long URL and the expiry of the link (epoch seconds), or None if
+            the snapshot does not hold the slug.
+        """
+        key: bytes = slug.encode()
+        if len(key) > self.width:
+            return None
+        key = key.ljust(self.width, b"\0")
+        index: int = bisect_left(self, key)
+        if index == self.count or self[index] != key:
+            return None
+        (expires_at,) = EXPIRY.unpack_from(self._map, self._expiries + index * 8)
+        start, end = URL_SPAN.unpack_from(self._map, self._offsets + index * 8)
+        return self._map[self._blob + start : self._blob + end].decode(), expires_at
+
+    def close(self) -> None:
+        self._map.close()
+
+
+class SnapshotStore:
+    """Serves lookups from the newest snapshot at a path.
+
+    reload swaps in a replaced file. Lookups never await, so no request can be
+    part-way through the old snapshot when it is closed."""
+
+    def __init__(self, path: str) -> None:
+        self.path: str = path
+        self._snapshot: SlugSnapshot | None = None
+        self._identity: tuple[int, int] | None = None
+        self.reloads: int = 0
+
+    def reload(self) -> bool:
+        """
+        Opens the file at self.path if it changed since it was last opened.
+
+        Returns:
+            Whether a new snapshot was swapped in.
+
+        Raises:
+            OSError: If the file cannot be read.
+            InvalidSnapshotError: If the file is not a valid snapshot. The
+                previous snapshot keeps being served.
+        """
+        stat: os.stat_result = os.stat(self.path)
+        identity: tuple[int, int] = (stat.st_ino, stat.st_mtime_ns)
+        if identity == self._identity:
+            return False
+        snapshot: SlugSnapshot = SlugSnapshot(self.path)
+        previous, self._snapshot = self._snapshot, snapshot
+        self._identity = identity
+        self.reloads += 1
+        if previous is not None:
+            previous.close()
+        return True
+
+    def lookup(self, slug: str) -> tuple[str, int] | None:
+        """Looks up a slug in the current snapshot, see SlugSnapshot.lookup."""
+        if self._snapshot is None:
+            return None
+        return self._snapshot.lookup(slug)
+
+    def stats(self) -> dict:
+        """Returns the current snapshot's size and age."""
+        snapshot: SlugSnapshot | None = self._snapshot
+        return {
+            "links": snapshot.count if snapshot else 0,
+            "created_at": snapshot.created_at if snapshot else 0,
+            "age_seconds": time.time() - snapshot.created_at if snapshot else 0.0,
+            "reloads": self.reloads,
+        }
+
+
+slug_snapshot: SnapshotStore = SnapshotStore(settings.snapshot_path)
@@ -1,40 +1,100 @@
 """Service for URL-related operations."""
 
-import secrets
-import string
-from datetime import datetime, timedelta, timezone
+import asyncio
+from datetime import datetime, timedelta
 
-from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import bindparam, delete, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
 
 from config.config import settings
+from database.database import async_session
+from database.partitions import create_link_partitions, is_missing_partition
 from exceptions.exceptions import LinkExpiredError, NoMatchingSlugError
-from models.models import Link
+from models.models import Link, LinkClicks
+from services.admission import redirect_admission
+from services.bloom import slug_filter
+from services.cache import slug_cache
+from services.hashing import hash_url, normalize_url
+from services.notify import publish_slug_changes, slug_publisher
+from services.slug import generate_slug, slug_allocator
+
+# Built once, so each lookup reuses the compiled statement from the engine cache
+LOOKUP_LINK = select(
+    Link.long_url,
+    Link.expires_at,
+    (Link.expires_at <= func.now()).label("expired"),
+).where(Link.slug == bindparam("slug"))
 
 
 class UrlService:
     """Service class for handling URL shortening and retrieval."""
 
-    async def get_long_url(self, db: AsyncSession, slug: str) -> str:
+    async def get_link(
+        self, engine: AsyncEngine, slug: str, primary: AsyncEngine | None = None
+    ) -> tuple[str, datetime]:
         """
-        Retrieves the long URL associated with a given slug.
+        Retrieves the long URL associated with a given slug, and its expiry.
+
+        Cache hits, and slugs the Bloom filter knows do not exist, are answered
+        without checking out a database connection, so they are never shed by
+        redirect_admission.
 
         Args:
-            db: The database session.
+            engine: The engine to read from, e.g. a read replica.
             slug: The slug to look up.
+            primary: The engine to retry on when engine does not have the slug,
+                to cover replication lag right after a link is created.
 
         Returns:
-            The long URL.
+            The long URL and when the link expires.
 
         Raises:
             NoMatchingSlugError: If no matching slug is found.
+            LinkExpiredError: If the link has expired.
+            OverloadedError: If the lookup needs the database and is shed.
         """
-        result: Link | None = await db.scalar(select(Link).where(Link.slug == slug))
-        if not result:
+        cached, link = slug_cache.get_link(slug)
+        if cached:
+            if link is None:
+                raise NoMatchingSlugError(slug)
+            return link
+        if not slug_filter.might_contain(slug):
+            raise NoMatchingSlugError(slug)
+        async with redirect_admission.admit():
+            row: tuple[str, datetime, bool] | None = await self._fetch_link(
+                engine, slug
+            )
+            if not row and primary is not None and primary is not engine:
+                row = await self._fetch_link(primary, slug)
+        if not row:
+            slug_cache.put_missing(slug)
             raise NoMatchingSlugError(slug)
-        if self._link_expired(result.created_ts):
-            raise LinkExpiredError(str(result.slug), settings.max_url_age)
-        return str(result.long_url)
+        long_url, expires_at, expired = row
+        if expired:
+            raise LinkExpiredError(slug, settings.max_url_age)
+        slug_cache.put(slug, long_url, expires_at)
+        return long_url, expires_at
+
+    @staticmethod
+    async def _fetch_link(
+        engine: AsyncEngine, slug: str
+    ) -> tuple[str, datetime, bool] | None:
+        """
+        Looks up a link with the pre-built Core statement, skipping the ORM.
+
+        Args:
+            engine: The engine to read from.
+            slug: The slug to look up.
+
+        Returns:
+            A (long_url, expires_at, expired) tuple, or None if there is no link.
+        """
+        async with engine.connect() as conn:
+            result = await conn.execute(LOOKUP_LINK, {"slug": slug})
+            row = result.first()
+        return tuple(row) if row else None  # type: ignore
 
     async def create_short_url(self, db: AsyncSession, long_url: str) -> str:
         """
@@ -45,49 +105,319 @@ class UrlService:
             long_url: The long URL to shorten.
 
         Returns:
-            The shortened URL.
+            The shortened URL. With settings.dedupe_urls, the short URL of an
+            existing live link to the same (normalized) long URL, if any.
+
+        With settings.coalesce_writes, the link is saved together with those of
+        concurrent calls, in one insert and one commit.
+        """
+        if settings.dedupe_urls:
+            existing: str | None = await self._find_live_slug(db, long_url)
+            if existing:
+                return f"{settings.short_url_prefix}{existing}"
+        slug: str
+        if settings.coalesce_writes:
+            slug = await shorten_coalescer.submit(long_url)
+        else:
+            slug = (await self._insert_links(db, [long_url]))[0]
+            await db.commit()
+        slug_cache.invalidate(slug)
+        slug_filter.add(slug)
+        slug_publisher.add([slug])
+        return f"{settings.short_url_prefix}{slug}"
+
+    async def create_short_urls(
+        self, db: AsyncSession, long_urls: list[str]
+    ) -> list[str | None]:
+        """
+        Creates short URLs for many long URLs at once.
+
+        Each chunk of settings.batch_chunk_size URLs is saved with a single
+        multi-row insert and committed on its own, so one failing chunk does not
+        fail the rest of the batch.
+
+        Args:
+            db: The database session.
+            long_urls: The long URLs to shorten.
+
+        Returns:
+            The shortened URLs, in input order. None for URLs in a chunk that
+            could not be saved.
+        """
+        short_urls: list[str | None] = []
+        for start in range(0, len(long_urls), settings.batch_chunk_size):
+            chunk: list[str] = long_urls[start : start + settings.batch_chunk_size]
+            try:
+                slugs: list[str] = await self._insert_links(db, chunk)
+                await db.commit()
+            except SQLAlchemyError:
+                await db.rollback()
+                short_urls.extend([None] * len(chunk))
+                continue
+            for slug in slugs:
+                slug_cache.invalidate(slug)
+                slug_filter.add(slug)
+            slug_publisher.add(slugs)
+            short_urls.extend(f"{settings.short_url_prefix}{slug}" for slug in slugs)
+        return short_urls
+
+    async def purge_expired_links(self, db: AsyncSession, batch_size: int) -> int:
+        """
+        Deletes one batch of links that expired over settings.purge_after_days ago,
+        along with their click stats.
+
+        Not used with settings.links_partitioned, where whole partitions are
+        dropped instead.
+
+        Rows locked by other transactions are skipped, so concurrent purges
+        never wait on each other.
+
+        Args:
+            db: The database session.
+            batch_size: The maximum number of links to delete.
+
+        Returns:
+            The number of links deleted.
         """
-        slug: str = await self._generate_unique_slug(db)
-        link = Link(slug=slug, long_url=long_url)
-        db.add(link)
+        expired = (
+            select(Link.link_id)
+            .where(
+                Link.expires_at < func.now() - timedelta(days=settings.purge_after_days)
+            )
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        deleted = await db.scalars(
+            delete(Link).where(Link.link_id.in_(expired)).returning(Link.slug)
+        )
+        slugs: list[str] = list(deleted.all())
+        if slugs:
+            await db.execute(delete(LinkClicks).where(LinkClicks.slug.in_(slugs)))
+            await publish_slug_changes(db, "deleted", slugs)
         await db.commit()
-        await db.refresh(link)
-        return f"{settings.base_url}{slug}"
+        for slug in slugs:
+            slug_cache.invalidate(slug)
+        return len(slugs)
 
-    @staticmethod
-    def _generate_slug(length: int) -> str:
+    async def _insert_links(self, db: AsyncSession, long_urls: list[str]) -> list[str]:
+        """
+        Inserts links for the given long URLs with freshly generated slugs.
+
+        Rows are written with one INSERT ... ON CONFLICT DO NOTHING RETURNING
+        statement. Only rows whose slug was already taken are retried. Other
+        processes are told about the new slugs through slug_publisher, by the
+        caller once it has committed.
+
+        With settings.links_partitioned, if no partition exists for today (the
+        purge task has not run for a while), the transaction is rolled back,
+        the partitions created and the insert retried once.
+
+        Args:
+            db: The database session.
+            long_urls: The long URLs to insert.
+
+        Returns:
+            The slugs of the new links, in input order.
         """
-        Generates a random slug of a given length.
+        slugs: list[str | None] = [None] * len(long_urls)
+        pending: list[int] = list(range(len(long_urls)))
+        partitions_created: bool = False
+        while pending:
+            candidates: dict[str, int] = dict(
+                zip(await self._candidate_slugs(db, len(pending)), pending, strict=True)
+            )
+            try:
+                inserted = await db.scalars(
+                    insert(Link)
+                    .values(
+                        [
+                            {
+                                "slug": slug,
+                                "long_url": long_urls[index],
+                                "url_hash": hash_url(long_urls[index]),
+                                "expires_at": func.now()
+                                + timedelta(days=settings.max_url_age),
+                            }
+                            for slug, index in candidates.items()
+                        ]
+                    )
+                    # No conflict target: partitioned links have no unique slug index
+                    .on_conflict_do_nothing()
+                    .returning(Link.slug)
+                )
+            except IntegrityError as e:
+                if partitions_created or not is_missing_partition(e):
+                    raise
+                await db.rollback()
+                await create_link_partitions(
+                    await db.connection(), settings.partition_days_ahead
+                )
+                await db.commit()
+                partitions_created = True
+                # The rollback undid any rows inserted by earlier rounds
+                slugs = [None] * len(long_urls)
+                pending = list(range(len(long_urls)))
+                continue
+            for slug in inserted.all():
+                slugs[candidates[slug]] = slug
+            pending = [index for index in candidates.values() if slugs[index] is None]
+        return [slug for slug in slugs if slug is not None]
+
+    async def _candidate_slugs(self, db: AsyncSession, count: int) -> list[str]:
+        """
+        Generates distinct slugs using the configured slug strategy.
 
         Args:
-            length: The desired length of the slug.
+            db: The database session.
+            count: The number of slugs needed.
 
         Returns:
-            A random slug.
+            The slugs. Sequence slugs are guaranteed unused, random slugs are not.
         """
-        base62: str = string.ascii_letters + string.digits
-        return "".join(secrets.choice(seq=base62) for _ in range(length))
+        if settings.slug_strategy == "sequence":
+            return await slug_allocator.allocate(db, count)
+        slugs: dict[str, None] = {}
+        while len(slugs) < count:
+            slugs[generate_slug(settings.slug_length)] = None
+        return list(slugs)
 
-    async def _generate_unique_slug(self, db: AsyncSession) -> str:
+    async def _find_live_slug(self, db: AsyncSession, long_url: str) -> str | None:
         """
-        Generates a unique slug.
+        Finds the newest live link to the same long URL.
+
+        Candidates are looked up by URL hash, then compared in full to rule out
+        hash collisions.
 
         Args:
             db: The database session.
+            long_url: The long URL to look for.
 
         Returns:
-            A unique slug.
+            The slug of the matching link, or None.
         """
-        while True:
-            slug: str = self._generate_slug(settings.slug_length)
-            slug_exists: Link | None = await db.scalar(
-                select(Link).where(Link.slug == slug)
+        normalized: str = normalize_url(long_url)
+        candidates = await db.execute(
+            select(Link.slug, Link.long_url)
+            .where(
+                Link.url_hash == hash_url(long_url),
+                Link.expires_at > func.now(),
             )
-            if not slug_exists:
+            .order_by(Link.created_ts.desc())
+        )
+        for slug, stored_url in candidates:
+            if normalize_url(stored_url) == normalized:
                 return slug
+        return None
+
+
+class ShortenCoalescer:
+    """Group-commits links created by concurrent create_short_url calls.
+
+    The first call opens a window of settings.coalesce_window seconds; every
+    call arriving within it, up to settings.coalesce_max_batch, is saved with
+    one multi-row insert and a single commit on a session of its own. If the
+    batch fails, its links are retried one by one, so each caller only ever
+    sees its own error."""
+
+    def __init__(self, window: float, max_batch: int) -> None:
+        self.window: float = window
+        self.max_batch: int = max_batch
+        self._pending: list[tuple[str, asyncio.Future[str]]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._flushes: set[asyncio.Task] = set()
+        self.requests: int = 0
+        self.batches: int = 0
+        self.fallbacks: int = 0
+        self.largest_batch: int = 0
+
+    async def submit(self, long_url: str) -> str:
+        """
+        Saves a link as part of the next batch.
+
+        Args:
+            long_url: The long URL to shorten.
+
+        Returns:
+            The slug of the new link.
+        """
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future[str] = loop.create_future()
+        self._pending.append((long_url, future))
+        self.requests += 1
+        if len(self._pending) >= self.max_batch:
+            self._flush_pending()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush_pending)
+        return await future
+
+    async def drain(self) -> None:
+        """Saves waiting links and waits for batches in flight, on shutdown."""
+        self._flush_pending()
+        if self._flushes:
+            await asyncio.gather(*self._flushes)
+
+    def stats(self) -> dict:
+        """Returns the coalescer counters."""
+        return {
+            "waiting": len(self._pending),
+            "requests": self.requests,
+            "batches": self.batches,
+            "fallbacks": self.fallbacks,
+            "largest_batch": self.largest_batch,
+            "avg_batch": self.requests / self.batches if self.batches else 0.0,
+        }
+
+    def _flush_pending(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        task: asyncio.Task = asyncio.create_task(self._flush(batch))
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def _flush(self, batch: list[tuple[str, asyncio.Future[str]]]) -> None:
+        # Counted once here, not for each retry of the fallback
+        self.batches += 1
+        self.largest_batch = max(self.largest_batch, len(batch))
+        await self._save(batch)
+
+    async def _save(self, batch: list[tuple[str, asyncio.Future[str]]]) -> None:
+        try:
+            async with async_session() as db:
+                slugs: list[str] = await UrlService()._insert_links(
+                    db, [long_url for long_url, _ in batch]
+                )
+                await db.commit()
+        except Exception as error:
+            if len(batch) == 1:
+                self._resolve(batch[0][1], error=error)
+                return
+            self.fallbacks += 1
+            for entry in batch:
+                await self._save([entry])
+            return
+        for (_, future), slug in zip(batch, slugs, strict=True):
+            self._resolve(future, slug=slug)
 
     @staticmethod
-    def _link_expired(created_ts: datetime) -> bool:
-        return datetime.now(timezone.utc) - created_ts > timedelta(
-            days=settings.max_url_age
-        )
+    def _resolve(
+        future: asyncio.Future[str],
+        slug: str | None = None,
+        error: Exception | None = None,
+    ) -> None:
+        # Callers may have gone away, e.g. on client disconnect
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(slug)  # type: ignore
+
+
+shorten_coalescer: ShortenCoalescer = ShortenCoalescer(
+    window=settings.coalesce_window, max_batch=settings.coalesce_max_batch
+)
@@ -0,0 +1,132 @@
+"""Link storage in process memory, for single-process deployments and tests"""
+
+import heapq
+import itertools
+from datetime import datetime, timedelta, timezone
+
+from config.config import settings
+from exceptions.exceptions import LinkExpiredError, NoMatchingSlugError
+from services.hashing import hash_url, normalize_url
+from services.slug import generate_slug, slug_allocator
+
+
+class MemoryLinkStore:
+    """Keeps links and click counts in dictionaries.
+
+    Nothing is persisted and nothing is shared, so links are lost on restart
+    and every process has links of its own: run a single worker. Lookups are
+    dictionary reads, so the redirect cache and Bloom filter are not used."""
+
+    def __init__(self) -> None:
+        # slug -> (long_url, expires_at)
+        self._links: dict[str, tuple[str, datetime]] = {}
+        # URL hash -> slug of the newest link, for settings.dedupe_urls
+        self._by_hash: dict[bytes, str] = {}
+        self._clicks: dict[str, tuple[int, datetime]] = {}
+        # (expires_at, slug), so purges only look at links due for purging
+        self._expiries: list[tuple[datetime, str]] = []
+        self._sequence: itertools.count = itertools.count(1)
+
+    async def setup(self) -> None:
+        pass
+
+    async def create_short_url(self, long_url: str) -> str:
+        if settings.dedupe_urls:
+            existing: str | None = self._find_live_slug(long_url)
+            if existing:
+                return f"{settings.short_url_prefix}{existing}"
+        return f"{settings.short_url_prefix}{self.add_link(long_url)}"
+
+    async def create_short_urls(self, long_urls: list[str]) -> list[str | None]:
+        return [f"{settings.short_url_prefix}{self.add_link(url)}" for url in long_urls]
+
+    async def get_link(self, slug: str) -> tuple[str, datetime]:
+        link: tuple[str, datetime] | None = self._links.get(slug)
+        if link is None:
+            raise NoMatchingSlugError(slug)
+        if link[1] <= datetime.now(timezone.utc):
+            raise LinkExpiredError(slug, settings.max_url_age)
+        return link
+
+    async def get_link_stats(self, slug: str) -> tuple[int, datetime | None]:
+        if slug not in self._links:
+            raise NoMatchingSlugError(slug)
+        clicks, last_access_ts = self._clicks.get(slug, (0, None))
+        return clicks, last_access_ts
+
+    async def record_clicks(self, clicks: dict[str, tuple[int, float]]) -> None:
+        for slug, (count, ts) in clicks.items():
+            if slug not in self._links:
+                continue
+            accessed: datetime = datetime.fromtimestamp(ts, timezone.utc)
+            previous, last_access_ts = self._clicks.get(slug, (0, accessed))
+            self._clicks[slug] = (previous + count, max(last_access_ts, accessed))
+
+    async def purge_expired_links(self, batch_size: int) -> int:
+        cutoff: datetime = datetime.now(timezone.utc) - timedelta(
+            days=settings.purge_after_days
+        )
+        purged: int = 0
+        while self._expiries and purged < batch_size:
+            expires_at, slug = self._expiries[0]
+            if expires_at >= cutoff:
+                break
+            heapq.heappop(self._expiries)
+            link: tuple[str, datetime] | None = self._links.get(slug)
+            # Left behind when add_link replaced the link
+            if link is None or link[1] != expires_at:
+                continue
+            long_url, _ = self._links.pop(slug)
+            self._clicks.pop(slug, None)
+            url_hash: bytes = hash_url(long_url)
+            if self._by_hash.get(url_hash) == slug:
+                del self._by_hash[url_hash]
+            purged += 1
+        return purged
+
+    def add_link(
+        self,
+        long_url: str,
+        slug: str | None = None,
+        expires_at: datetime | None = None,
+    ) -> str:
+        """
+        Stores a link, e.g. to seed the store for a benchmark.
+
+        Args:
+            long_url: The long URL.
+            slug: The slug, or None for a new one from settings.slug_strategy.
+            expires_at: The expiry, by default settings.max_url_age days away.
+
+        Returns:
+            The slug of the link.
+        """
+        if slug is None:
+            slug = self._new_slug()
+        if expires_at is None:
+            expires_at = datetime.now(timezone.utc) + timedelta(
+                days=settings.max_url_age
+            )
+        self._links[slug] = (long_url, expires_at)
+        self._by_hash[hash_url(long_url)] = slug
+        heapq.heappush(self._expiries, (expires_at, slug))
+        return slug
+
+    def _new_slug(self) -> str:
+        if settings.slug_strategy == "sequence":
+            return slug_allocator.permutation.encode(next(self._sequence))
+        while True:
+            slug: str = generate_slug(settings.slug_length)
+            if slug not in self._links:
+                return slug
+
+    def _find_live_slug(self, long_url: str) -> str | None:
+        slug: str | None = self._by_hash.get(hash_url(long_url))
+        if slug is None:
+            return None
+        stored_url, expires_at = self._links[slug]
+        if expires_at <= datetime.now(timezone.utc) or normalize_url(
+            stored_url
+        ) != normalize_url(long_url):
+            return None
+        return slug
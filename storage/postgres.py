@@ -0,0 +1,60 @@
+"""Link storage in Postgres, through the SQLAlchemy services"""
+
+from datetime import datetime
+
+from config.config import settings
+from database.database import (
+    async_session,
+    get_engine,
+    get_primary_engine,
+    get_read_engine,
+    warm_up_pool,
+)
+from database.migrations import check_schema_version, migrate_database
+from database.partitions import create_link_partitions
+from services.analytics import AnalyticsService
+from services.url import UrlService
+
+
+class PostgresLinkStore:
+    """Stores links with UrlService and AnalyticsService, each call on a
+    session of its own. Lookups read from the replicas, if any, and go through
+    the redirect cache, Bloom filter and admission control."""
+
+    async def setup(self) -> None:
+        if settings.migrate_on_startup:
+            await migrate_database(get_engine())
+        else:
+            await check_schema_version(get_engine())
+        if settings.links_partitioned:
+            # Inserts fail without a partition for today, e.g. after a long
+            # PURGE_INTERVAL or with the purge task turned off
+            async with get_engine().begin() as conn:
+                await create_link_partitions(conn, settings.partition_days_ahead)
+        if settings.db_pool_warm_up:
+            await warm_up_pool()
+
+    async def create_short_url(self, long_url: str) -> str:
+        async with async_session() as db:
+            return await UrlService().create_short_url(db=db, long_url=long_url)
+
+    async def create_short_urls(self, long_urls: list[str]) -> list[str | None]:
+        async with async_session() as db:
+            return await UrlService().create_short_urls(db=db, long_urls=long_urls)
+
+    async def get_link(self, slug: str) -> tuple[str, datetime]:
+        return await UrlService().get_link(
+            engine=get_read_engine(), slug=slug, primary=get_primary_engine()
+        )
+
+    async def get_link_stats(self, slug: str) -> tuple[int, datetime | None]:
+        async with async_session() as db:
+            return await AnalyticsService().get_link_stats(db=db, slug=slug)
+
+    async def record_clicks(self, clicks: dict[str, tuple[int, float]]) -> None:
+        async with async_session() as db:
+            await AnalyticsService().record_clicks(db=db, clicks=clicks)
+
+    async def purge_expired_links(self, batch_size: int) -> int:
+        async with async_session() as db:
+            return await UrlService().purge_expired_links(db=db, batch_size=batch_size)
@@ -0,0 +1,97 @@
+"""Link storage backends, picked with settings.storage_backend"""
+
+from datetime import datetime
+from typing import Protocol
+
+from config.config import settings
+from storage.memory import MemoryLinkStore
+from storage.postgres import PostgresLinkStore
+
+
+class LinkStore(Protocol):
+    """What the routes and background tasks need from link storage"""
+
+    async def setup(self) -> None:
+        """Prepares the store at startup, e.g. creates tables."""
+
+    async def create_short_url(self, long_url: str) -> str:
+        """
+        Creates a link.
+
+        Args:
+            long_url: The long URL to shorten.
+
+        Returns:
+            The short URL. With settings.dedupe_urls, possibly that of an
+            existing live link to the same long URL.
+        """
+
+    async def create_short_urls(self, long_urls: list[str]) -> list[str | None]:
+        """
+        Creates many links.
+
+        Args:
+            long_urls: The long URLs to shorten.
+
+        Returns:
+            The short URLs in input order, None for URLs that could not be saved.
+        """
+
+    async def get_link(self, slug: str) -> tuple[str, datetime]:
+        """
+        Looks up a link.
+
+        Args:
+            slug: The slug to look up.
+
+        Returns:
+            The long URL and when the link expires.
+
+        Raises:
+            NoMatchingSlugError: If no matching slug is found.
+            LinkExpiredError: If the link has expired.
+            OverloadedError: If the lookup is shed.
+        """
+
+    async def get_link_stats(self, slug: str) -> tuple[int, datetime | None]:
+        """
+        Looks up the click stats of a link.
+
+        Args:
+            slug: The slug to look up.
+
+        Returns:
+            The number of clicks and the time of the last click, if any.
+
+        Raises:
+            NoMatchingSlugError: If no matching slug is found.
+        """
+
+    async def record_clicks(self, clicks: dict[str, tuple[int, float]]) -> None:
+        """
+        Adds click counts to the per-slug totals.
+
+        Args:
+            clicks: Maps each slug to its new clicks and latest access time (epoch).
+        """
+
+    async def purge_expired_links(self, batch_size: int) -> int:
+        """
+        Deletes one batch of links that expired over settings.purge_after_days
+        ago, along with their click stats.
+
+        Args:
+            batch_size: The maximum number of links to delete.
+
+        Returns:
+            The number of links deleted.
+        """
+
+
+link_store: LinkStore = (
+    MemoryLinkStore() if settings.storage_backend == "memory" else PostgresLinkStore()
+)
+
+
+def get_link_store() -> LinkStore:
+    return link_store
@@ -0,0 +1,25 @@
+"""Periodic rebuild of the slug Bloom filter"""
+
+import asyncio
+import logging
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from config.config import settings
+from database.database import get_engine
+from services.bloom import slug_filter
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+
+async def rebuild_slug_filter() -> None:
+    """Rebuilds the Bloom filter every settings.bloom_rebuild_interval seconds.
+
+    Drops slugs of links that have since been purged, which would otherwise
+    fill the filter up and raise its false positive rate over time."""
+    while True:
+        await asyncio.sleep(settings.bloom_rebuild_interval)
+        try:
+            await slug_filter.rebuild(get_engine())
+        except SQLAlchemyError:
+            logger.exception("Rebuilding the slug filter failed")
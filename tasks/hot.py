@@ -0,0 +1,24 @@
+"""Periodic snapshot of the hottest slugs"""
+
+import asyncio
+import logging
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from config.config import settings
+from database.database import async_session
+from services.hot import hot_slugs, save_hot_slugs
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+
+async def snapshot_hot_slugs() -> None:
+    """Saves this process's top slugs every settings.hot_slugs_snapshot_interval
+    seconds, for new processes to warm their cache from."""
+    while True:
+        await asyncio.sleep(settings.hot_slugs_snapshot_interval)
+        try:
+            async with async_session() as db:
+                await save_hot_slugs(db, hot_slugs.top())
+        except SQLAlchemyError:
+            logger.exception("Saving hot slugs failed")
@@ -0,0 +1,46 @@
+"""Background purge of expired links"""
+
+import asyncio
+import logging
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from config.config import settings
+from database.database import get_engine
+from database.partitions import create_link_partitions, drop_expired_link_partitions
+from storage.storage import link_store
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+
+async def purge_expired_links() -> None:
+    """Deletes expired links every settings.purge_interval seconds.
+
+    Works through small batches, each in its own short transaction with a
+    pause in between, so a large backlog never holds locks for long. With
+    settings.links_partitioned, creates upcoming partitions and drops expired
+    ones instead."""
+    while True:
+        try:
+            if settings.links_partitioned:
+                await maintain_link_partitions()
+                await asyncio.sleep(settings.purge_interval)
+                continue
+            while (
+                await link_store.purge_expired_links(settings.purge_batch_size)
+                == settings.purge_batch_size
+            ):
+                await asyncio.sleep(settings.purge_batch_delay)
+        except SQLAlchemyError:
+            logger.exception("Purging expired links failed")
+        await asyncio.sleep(settings.purge_interval)
+
+
+async def maintain_link_partitions() -> None:
+    async with get_engine().begin() as conn:
+        created: list[str] = await create_link_partitions(
+            conn, settings.partition_days_ahead
+        )
+    dropped: list[str] = await drop_expired_link_partitions(get_engine())
+    if created or dropped:
+        logger.info("Created partitions %s, dropped %s", created, dropped)
@@ -0,0 +1,22 @@
+"""Periodic reload of the slug snapshot on edge nodes"""
+
+import asyncio
+import logging
+
+from config.config import settings
+from exceptions.exceptions import InvalidSnapshotError
+from services.snapshot import slug_snapshot
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+
+async def reload_snapshot() -> None:
+    """Swaps in a replaced snapshot file every settings.snapshot_reload_interval
+    seconds. A missing or broken file leaves the current snapshot in service."""
+    while True:
+        await asyncio.sleep(settings.snapshot_reload_interval)
+        try:
+            if slug_snapshot.reload():
+                logger.info("Loaded slug snapshot %s", slug_snapshot.path)
+        except (OSError, InvalidSnapshotError):
+            logger.exception("Reloading the slug snapshot failed")
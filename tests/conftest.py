@@ -0,0 +1,31 @@
+from collections.abc import Iterator
+
+import pytest
+
+from services.bloom import slug_filter
+from services.cache import slug_cache
+from services.hot import hot_slugs
+
+
+@pytest.fixture(autouse=True)
+def clear_slug_cache() -> Iterator[None]:
+    """Stop cached lookups leaking between tests."""
+    slug_cache.clear()
+    yield
+    slug_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def clear_slug_filter() -> Iterator[None]:
+    """Stop a filter built by one test rejecting slugs in another."""
+    slug_filter.clear()
+    yield
+    slug_filter.clear()
+
+
+@pytest.fixture(autouse=True)
+def clear_hot_slugs() -> Iterator[None]:
+    """Stop requests in one test counting towards hot slugs in another."""
+    hot_slugs.clear()
+    yield
+    hot_slugs.clear()
@@ -0,0 +1,126 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from config.config import settings
+from exceptions.exceptions import OverloadedError
+from main import app
+from services.admission import AdmissionController
+
+
+async def hold(controller: AdmissionController, release: asyncio.Event) -> None:
+    async with controller.admit():
+        await release.wait()
+
+
+class TestAdmissionController:
+    """Test suite for admission control."""
+
+    @pytest.mark.asyncio
+    async def test_unlimited(self) -> None:
+        """A limit of 0 admits everything without counting."""
+        controller = AdmissionController("test", limit=0, queue_size=0, max_wait=0)
+        async with controller.admit(), controller.admit():
+            assert controller.active == 0
+
+    @pytest.mark.asyncio
+    async def test_queued_request_gets_released_slot(self) -> None:
+        """Requests over the limit wait for a slot, first come first served."""
+        controller = AdmissionController("test", limit=1, queue_size=5, max_wait=1.0)
+        release = asyncio.Event()
+        holder = asyncio.create_task(hold(controller, release))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(hold(controller, asyncio.Event()))
+        await asyncio.sleep(0)
+        assert controller.stats()["waiting"] == 1
+
+        release.set()
+        await holder
+        await asyncio.sleep(0)
+        assert controller.stats()["waiting"] == 0
+        assert controller.active == 1
+        assert controller.admitted == 2
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert controller.active == 0
+
+    @pytest.mark.asyncio
+    async def test_sheds_when_queue_full(self) -> None:
+        """A full queue sheds new requests at once."""
+        controller = AdmissionController("test", limit=1, queue_size=0, max_wait=1.0)
+        release = asyncio.Event()
+        holder = asyncio.create_task(hold(controller, release))
+        await asyncio.sleep(0)
+        with pytest.raises(OverloadedError) as e:
+            async with controller.admit():
+                pass
+        assert e.value.retry_after >= 1
+        assert controller.shed == 1
+        release.set()
+        await holder
+        assert controller.active == 0
+
+    @pytest.mark.asyncio
+    async def test_sheds_when_expected_wait_too_long(self) -> None:
+        """Requests that would not get a slot within max_wait are not queued."""
+        controller = AdmissionController("test", limit=1, queue_size=5, max_wait=1.0)
+        controller.service_time = 2.0
+        release = asyncio.Event()
+        holder = asyncio.create_task(hold(controller, release))
+        await asyncio.sleep(0)
+        with pytest.raises(OverloadedError) as e:
+            async with controller.admit():
+                pass
+        assert e.value.retry_after == 2
+        assert controller.stats()["waiting"] == 0
+        release.set()
+        await holder
+
+    @pytest.mark.asyncio
+    async def test_sheds_after_max_wait(self) -> None:
+        """Queued requests give up after max_wait and leave the queue."""
+        controller = AdmissionController("test", limit=1, queue_size=5, max_wait=0.01)
+        release = asyncio.Event()
+        holder = asyncio.create_task(hold(controller, release))
+        await asyncio.sleep(0)
+        with pytest.raises(OverloadedError):
+            async with controller.admit():
+                pass
+        assert controller.timeouts == 1
+        assert controller.stats()["waiting"] == 0
+        release.set()
+        await holder
+        assert controller.active == 0
+
+
+class TestAdmissionRoutes:
+    """Shed requests answer 503 with Retry-After."""
+
+    @pytest.mark.asyncio
+    @patch("services.url.UrlService.create_short_url", new_callable=AsyncMock)
+    async def test_shorten_overloaded(self, mock_create_short_url: MagicMock) -> None:
+        mock_create_short_url.side_effect = OverloadedError("shorten", 3)
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url=str(settings.base_url)
+        ) as ac:
+            response = await ac.post(
+                url="/shorten", json={"long_url": "https://www.example.com/page"}
+            )
+
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "3"
+
+    @pytest.mark.asyncio
+    @patch("services.url.UrlService.get_link", new_callable=AsyncMock)
+    async def test_redirect_overloaded(self, mock_get_link: MagicMock) -> None:
+        mock_get_link.side_effect = OverloadedError("redirect", 1)
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url=str(settings.base_url)
+        ) as ac:
+            response = await ac.get("/A1b2C3d")
+
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "1"
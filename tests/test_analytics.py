@@ -0,0 +1,158 @@
+import asyncio
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from exceptions.exceptions import NoMatchingSlugError
+from services.analytics import AnalyticsService, ClickRecorder
+
+
+class TestAnalyticsService:
+    """Test suite for the AnalyticsService class."""
+
+    @pytest.mark.asyncio
+    async def test_record_clicks(self) -> None:
+        """Test that click counts are written with one upsert and commit."""
+        mock_db = AsyncMock(AsyncSession)
+        await AnalyticsService().record_clicks(
+            mock_db, {"A1b2C3d": (3, 1700000000.0), "ABCDEFG": (1, 1700000001.0)}
+        )
+        assert mock_db.execute.await_count == 1
+        assert mock_db.commit.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_get_link_stats(self) -> None:
+        """Test that the stats of a slug are returned."""
+        last_access_ts = datetime.now(timezone.utc)
+        mock_db = AsyncMock(AsyncSession)
+        mock_db.execute.return_value = MagicMock(
+            first=MagicMock(
+                return_value=MagicMock(clicks=5, last_access_ts=last_access_ts)
+            )
+        )
+        stats = await AnalyticsService().get_link_stats(mock_db, "A1b2C3d")
+        assert stats == (5, last_access_ts)
+
+    @pytest.mark.asyncio
+    async def test_get_link_stats_never_clicked(self) -> None:
+        """Test that links without clicks report zero clicks."""
+        mock_db = AsyncMock(AsyncSession)
+        mock_db.execute.return_value = MagicMock(
+            first=MagicMock(return_value=MagicMock(clicks=None, last_access_ts=None))
+        )
+        stats = await AnalyticsService().get_link_stats(mock_db, "A1b2C3d")
+        assert stats == (0, None)
+
+    @pytest.mark.asyncio
+    async def test_get_link_stats_missing_slug(self) -> None:
+        """Test that an error is raised when a slug is not found."""
+        mock_db = AsyncMock(AsyncSession)
+        mock_db.execute.return_value = MagicMock(first=MagicMock(return_value=None))
+        with pytest.raises(NoMatchingSlugError):
+            await AnalyticsService().get_link_stats(mock_db, "A1b2C3d")
+
+
+@patch("services.analytics.async_session")
+@patch("services.analytics.AnalyticsService.record_clicks", new_callable=AsyncMock)
+class TestClickRecorder:
+    """Test suite for the ClickRecorder class."""
+
+    @pytest.mark.asyncio
+    async def test_flush_aggregates_clicks(
+        self, mock_record_clicks: MagicMock, mock_async_session: MagicMock
+    ) -> None:
+        """Queued clicks are written as per-slug totals."""
+        recorder = ClickRecorder(queue_size=10, batch_size=10, flush_interval=1)
+        for slug in ("A1b2C3d", "A1b2C3d", "ABCDEFG"):
+            recorder.record(slug)
+
+        await recorder.flush()
+
+        clicks = mock_record_clicks.await_args.kwargs["clicks"]
+        assert {slug: count for slug, (count, _) in clicks.items()} == {
+            "A1b2C3d": 2,
+            "ABCDEFG": 1,
+        }
+        assert recorder.stats()["flushed"] == 3
+        mock_async_session.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_flush_in_batches(
+        self, mock_record_clicks: MagicMock, mock_async_session: MagicMock
+    ) -> None:
+        """Large backlogs are written one batch at a time."""
+        recorder = ClickRecorder(queue_size=10, batch_size=2, flush_interval=1)
+        for _ in range(5):
+            recorder.record("A1b2C3d")
+
+        await recorder.flush()
+
+        assert mock_record_clicks.await_count == 3
+        assert mock_async_session.call_count == 3
+
+    @pytest.mark.asyncio
+    async def test_record_drops_on_overflow(
+        self, mock_record_clicks: MagicMock, mock_async_session: MagicMock
+    ) -> None:
+        """Clicks arriving while the queue is full are dropped and counted."""
+        recorder = ClickRecorder(queue_size=2, batch_size=10, flush_interval=1)
+        for _ in range(3):
+            recorder.record("A1b2C3d")
+
+        assert recorder.stats() == {
+            "queued": 2,
+            "recorded": 2,
+            "flushed": 0,
+            "dropped": 1,
+        }
+        mock_record_clicks.assert_not_awaited()
+        mock_async_session.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_failed_flush_counts_dropped(
+        self, mock_record_clicks: MagicMock, mock_async_session: MagicMock
+    ) -> None:
+        """Clicks that cannot be written are counted as dropped."""
+        mock_record_clicks.side_effect = SQLAlchemyError("boom")
+        recorder = ClickRecorder(queue_size=10, batch_size=10, flush_interval=1)
+        recorder.record("A1b2C3d")
+
+        await recorder.flush()
+
+        assert recorder.stats()["dropped"] == 1
+        mock_async_session.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_stop_flushes_remaining_clicks(
+        self, mock_record_clicks: MagicMock, mock_async_session: MagicMock
+    ) -> None:
+        """Stopping the worker writes clicks still in the queue."""
+        recorder = ClickRecorder(queue_size=10, batch_size=10, flush_interval=60)
+        worker = asyncio.create_task(recorder.run())
+        await asyncio.sleep(0)
+        recorder.record("A1b2C3d")
+
+        recorder.stop()
+        await asyncio.wait_for(worker, timeout=1)
+
+        assert mock_record_clicks.await_count == 1
+        assert recorder.stats()["queued"] == 0
+        mock_async_session.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_stop_before_worker_starts(
+        self, mock_record_clicks: MagicMock, mock_async_session: MagicMock
+    ) -> None:
+        """A stop issued before the worker first runs still ends it."""
+        recorder = ClickRecorder(queue_size=10, batch_size=10, flush_interval=60)
+        worker = asyncio.create_task(recorder.run())
+        recorder.record("A1b2C3d")
+
+        recorder.stop()
+        await asyncio.wait_for(worker, timeout=1)
+
+        assert mock_record_clicks.await_count == 1
+        mock_async_session.assert_called_once()
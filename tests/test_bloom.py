@@ -0,0 +1,144 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from config.config import Settings
+from services.bloom import SlugBloomFilter
+
+
+class AsyncRows:
+    """Streamed result standing in for AsyncScalarResult.partitions()."""
+
+    def __init__(self, rows: list[str]) -> None:
+        self._partitions = iter(
+            [rows[start : start + 100] for start in range(0, len(rows), 100)]
+        )
+
+    def partitions(self) -> "AsyncRows":
+        return self
+
+    def __aiter__(self) -> "AsyncRows":
+        return self
+
+    async def __anext__(self) -> list[str]:
+        try:
+            return next(self._partitions)
+        except StopIteration:
+            raise StopAsyncIteration from None
+
+
+def mock_slug_engine(slugs: list[str]) -> MagicMock:
+    """Builds a mock engine whose links table holds the given slugs."""
+    mock_conn = AsyncMock(AsyncConnection)
+    mock_conn.scalar.return_value = len(slugs)
+    mock_conn.stream = AsyncMock(
+        return_value=MagicMock(scalars=MagicMock(return_value=AsyncRows(slugs)))
+    )
+    mock_engine = MagicMock(AsyncEngine)
+    mock_engine.connect.return_value.__aenter__.return_value = mock_conn
+    return mock_engine
+
+
+class TestSlugBloomFilter:
+    """Test suite for the SlugBloomFilter class."""
+
+    def test_unbuilt_filter_allows_everything(self) -> None:
+        """Before the first build, no slug is rejected."""
+        bloom = SlugBloomFilter(capacity=100, error_rate=0.01)
+        bloom.add("A1b2C3d")
+        assert bloom.might_contain("zzzzzzz")
+        assert bloom.stats()["built"] is False
+
+    @pytest.mark.asyncio
+    async def test_rebuild_contains_every_slug(self) -> None:
+        """Slugs read from the database are never rejected."""
+        slugs = [f"slug{index:04}" for index in range(1000)]
+        bloom = SlugBloomFilter(capacity=1000, error_rate=0.01)
+
+        assert await bloom.rebuild(mock_slug_engine(slugs)) == 1000
+
+        assert all(bloom.might_contain(slug) for slug in slugs)
+        assert bloom.stats()["slugs"] == 1000
+
+    @pytest.mark.asyncio
+    async def test_unknown_slugs_mostly_rejected(self) -> None:
+        """Unknown slugs are rejected at about the configured error rate."""
+        bloom = SlugBloomFilter(capacity=1000, error_rate=0.01)
+        await bloom.rebuild(mock_slug_engine([f"slug{i:04}" for i in range(1000)]))
+
+        accepted = sum(bloom.might_contain(f"miss{i:05}") for i in range(10000))
+
+        assert accepted < 300
+        assert bloom.rejections == 10000 - accepted
+
+    @pytest.mark.asyncio
+    async def test_added_slugs_are_contained(self) -> None:
+        """Slugs created after the build are not rejected."""
+        bloom = SlugBloomFilter(capacity=100, error_rate=0.01)
+        await bloom.rebuild(mock_slug_engine([]))
+        assert not bloom.might_contain("A1b2C3d")
+
+        bloom.add("A1b2C3d")
+
+        assert bloom.might_contain("A1b2C3d")
+
+    @pytest.mark.asyncio
+    async def test_slugs_added_during_rebuild_survive(self) -> None:
+        """Slugs created while a rebuild streams are kept in the new filter."""
+        bloom = SlugBloomFilter(capacity=100, error_rate=0.01)
+        engine = mock_slug_engine(["aaaaaaa"])
+        conn = engine.connect.return_value.__aenter__.return_value
+        scalars = conn.stream.return_value.scalars
+
+        def add_then_stream() -> AsyncRows:
+            bloom.add("bbbbbbb")
+            return AsyncRows(["aaaaaaa"])
+
+        scalars.side_effect = add_then_stream
+        await bloom.rebuild(engine)
+
+        assert bloom.might_contain("aaaaaaa")
+        assert bloom.might_contain("bbbbbbb")
+
+    @pytest.mark.asyncio
+    async def test_overlapping_rebuilds_run_in_turn(self) -> None:
+        """A resync during a periodic rebuild does not clobber its pending slugs."""
+        bloom = SlugBloomFilter(capacity=100, error_rate=0.01)
+        first = mock_slug_engine(["aaaaaaa"] * 200)
+        conn = first.connect.return_value.__aenter__.return_value
+
+        def add_then_stream() -> AsyncRows:
+            bloom.add("bbbbbbb")
+            return AsyncRows(["aaaaaaa"] * 200)
+
+        conn.stream.return_value.scalars.side_effect = add_then_stream
+        await asyncio.gather(
+            bloom.rebuild(first), bloom.rebuild(mock_slug_engine(["bbbbbbb"]))
+        )
+
+        assert bloom.rebuilds == 2
+        assert bloom.might_contain("bbbbbbb")
+
+    @pytest.mark.asyncio
+    async def test_rebuild_grows_past_capacity(self) -> None:
+        """The filter is sized for the table when it outgrows the capacity."""
+        bloom = SlugBloomFilter(capacity=10, error_rate=0.01)
+        small_bits = bloom._dimensions(10, 0.01)[0]
+
+        await bloom.rebuild(mock_slug_engine([f"slug{i:04}" for i in range(1000)]))
+
+        assert bloom.stats()["bits"] > small_bits * 100
+        assert bloom.stats()["false_positive_rate"] < 0.02
+
+
+class TestBloomFilterSettings:
+    """Test suite for the Bloom filter settings."""
+
+    def test_bloom_filter_requires_notify(self) -> None:
+        """Without notifications, other processes' new links would answer 404."""
+        with pytest.raises(ValidationError, match="CACHE_NOTIFY"):
+            Settings(bloom_filter=True, cache_notify=False)  # type: ignore
+        assert Settings(bloom_filter=True, cache_notify=True).bloom_filter  # type: ignore
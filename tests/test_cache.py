@@ -0,0 +1,91 @@
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+from services.cache import SlugCache
+
+slug = "A1b2C3d"
+long_url = "https://example.com/a/deep/page/and-some-more-information-here.html"
+expires_at = datetime.now(timezone.utc) + timedelta(days=1)
+
+
+class TestSlugCache:
+    """Test suite for the SlugCache class."""
+
+    def test_get_missing_slug(self) -> None:
+        """Unknown slugs are reported as not cached."""
+        cache = SlugCache(max_size=10, ttl=60, negative_ttl=10)
+        assert cache.get_link(slug) == (False, None)
+        assert cache.misses == 1
+
+    def test_put_and_get(self) -> None:
+        """Cached slugs return their long URL."""
+        cache = SlugCache(max_size=10, ttl=60, negative_ttl=10)
+        cache.put(slug, long_url, expires_at)
+        assert cache.get_link(slug) == (True, (long_url, expires_at))
+        assert cache.hits == 1
+
+    def test_put_missing(self) -> None:
+        """Negative entries are cached as None."""
+        cache = SlugCache(max_size=10, ttl=60, negative_ttl=10)
+        cache.put_missing(slug)
+        assert cache.get_link(slug) == (True, None)
+
+    def test_lru_eviction(self) -> None:
+        """The least recently used entry is evicted when the cache is full."""
+        cache = SlugCache(max_size=2, ttl=60, negative_ttl=10)
+        cache.put("aaaaaaa", long_url, expires_at)
+        cache.put("bbbbbbb", long_url, expires_at)
+        cache.get_link("aaaaaaa")
+        cache.put("ccccccc", long_url, expires_at)
+        assert cache.get_link("bbbbbbb") == (False, None)
+        assert cache.get_link("aaaaaaa") == (True, (long_url, expires_at))
+        assert cache.evictions == 1
+
+    def test_entry_expires_after_ttl(self) -> None:
+        """Entries are dropped once their TTL has passed."""
+        cache = SlugCache(max_size=10, ttl=60, negative_ttl=10)
+        with patch("services.cache.time.monotonic", return_value=1000.0):
+            cache.put(slug, long_url, expires_at)
+        with patch("services.cache.time.monotonic", return_value=1061.0):
+            assert cache.get_link(slug) == (False, None)
+        assert cache.expirations == 1
+
+    def test_entry_lifetime_capped_by_link_expiry(self) -> None:
+        """Entries never outlive the link they point to."""
+        cache = SlugCache(max_size=10, ttl=3600, negative_ttl=10)
+        soon = datetime.now(timezone.utc) + timedelta(seconds=30)
+        with patch("services.cache.time.monotonic", return_value=1000.0):
+            cache.put(slug, long_url, soon)
+        with patch("services.cache.time.monotonic", return_value=1031.0):
+            assert cache.get_link(slug) == (False, None)
+
+    def test_expired_link_not_cached(self) -> None:
+        """Links that have already expired are not cached."""
+        cache = SlugCache(max_size=10, ttl=60, negative_ttl=10)
+        cache.put(slug, long_url, datetime.now(timezone.utc) - timedelta(seconds=1))
+        assert cache.get_link(slug) == (False, None)
+
+    def test_zero_size_disables_cache(self) -> None:
+        """A max size of zero stores nothing."""
+        cache = SlugCache(max_size=0, ttl=60, negative_ttl=10)
+        cache.put(slug, long_url, expires_at)
+        assert cache.get_link(slug) == (False, None)
+
+    def test_invalidate(self) -> None:
+        """Invalidated slugs are removed from the cache."""
+        cache = SlugCache(max_size=10, ttl=60, negative_ttl=10)
+        cache.put_missing(slug)
+        cache.invalidate(slug)
+        assert cache.get_link(slug) == (False, None)
+
+    def test_stats(self) -> None:
+        """Stats report the counters and hit ratio."""
+        cache = SlugCache(max_size=10, ttl=60, negative_ttl=10)
+        cache.put(slug, long_url, expires_at)
+        cache.get_link(slug)
+        cache.get_link("unknown")
+        stats = cache.stats()
+        assert stats["size"] == 1
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["hit_ratio"] == 0.5
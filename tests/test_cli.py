@@ -0,0 +1,165 @@
+import io
+from datetime import datetime, timezone
+from unittest.mock import MagicMock, patch
+
+import psycopg
+import pytest
+
+from cli.cli import (
+    CREATE_STAGING_TABLE,
+    guess_format,
+    import_chunk,
+    parse_record,
+    read_records,
+)
+from config.config import settings
+from database.database import get_engine
+from database.migrations import migrate_database
+from exceptions.exceptions import InvalidImportRecordError
+
+long_url = "https://example.com/a/deep/page/and-some-more-information-here.html"
+
+
+class TestCli:
+    """Test suite for the bulk import/export CLI."""
+
+    def test_guess_format(self) -> None:
+        """The format follows the file extension."""
+        assert guess_format("links.csv") == "csv"
+        assert guess_format("links.jsonl") == "jsonl"
+        assert guess_format("links.txt") is None
+
+    def test_read_csv_records(self) -> None:
+        """CSV rows are read as dicts keyed by the header."""
+        file = io.StringIO(f"slug,long_url\nA1b2C3d,{long_url}\n")
+        assert list(read_records(file, "csv")) == [
+            (2, {"slug": "A1b2C3d", "long_url": long_url})
+        ]
+
+    def test_read_jsonl_records(self) -> None:
+        """Blank lines are skipped and malformed lines passed through raw."""
+        file = io.StringIO(f'{{"long_url": "{long_url}"}}\n\nnot json\n[1]\n')
+        assert list(read_records(file, "jsonl")) == [
+            (1, {"long_url": long_url}),
+            (3, "not json"),
+            (4, "[1]"),
+        ]
+
+    def test_parse_record(self) -> None:
+        """Valid records become rows with a URL hash and parsed timestamps."""
+        slug, url, url_hash, created_ts, expires_at = parse_record(
+            {"long_url": long_url, "expires_at": "2030-01-01T00:00:00+00:00"}
+        )
+        assert (slug, url, created_ts) == (None, long_url, None)
+        assert len(url_hash) == 16
+        assert expires_at == datetime(2030, 1, 1, tzinfo=timezone.utc)
+
+    def test_parse_naive_timestamps_as_utc(self) -> None:
+        """Timestamps without an offset do not depend on the session time zone."""
+        *_, expires_at = parse_record(
+            {"long_url": long_url, "expires_at": "2030-01-01T12:00:00"}
+        )
+        assert expires_at == datetime(2030, 1, 1, 12, tzinfo=timezone.utc)
+
+    @pytest.mark.parametrize(
+        "record",
+        [
+            "not json",
+            {"slug": "A1b2C3d"},
+            {"long_url": "https://x.io"},
+            {"long_url": long_url, "expires_at": "next tuesday"},
+            {"slug": "metrics", "long_url": long_url},
+            {"slug": "a/b", "long_url": long_url},
+            {"slug": "A1b2C3d4", "long_url": long_url},
+        ],
+    )
+    def test_parse_invalid_record(self, record: dict | str) -> None:
+        """Invalid records are rejected with the POST /shorten rules."""
+        with pytest.raises(InvalidImportRecordError):
+            parse_record(record)
+
+    def test_parse_given_slug_when_partitioned(self) -> None:
+        """Partitioned links have no unique index, so only the sequence picks slugs."""
+        partitioned = settings.model_copy(update={"links_partitioned": True})
+        with patch("cli.cli.settings", partitioned):
+            with pytest.raises(InvalidImportRecordError, match="partitioned"):
+                parse_record({"slug": "A1b2C3d", "long_url": long_url})
+            assert parse_record({"long_url": long_url})[0] is None
+
+    @patch("cli.cli.settings")
+    @patch("cli.cli.generate_slug")
+    def test_import_chunk_retries_taken_generated_slugs(
+        self, mock_generate_slug: MagicMock, mock_settings: MagicMock
+    ) -> None:
+        """Generated slugs that are taken are retried, given ones are skipped."""
+        mock_settings.slug_strategy = "random"
+        mock_settings.cache_notify = False
+        mock_generate_slug.side_effect = ["taken00", "fresh00"]
+        cursor = MagicMock()
+        cursor.__iter__.side_effect = [iter([]), iter([("fresh00",)])]
+        rows = [
+            ("given00", long_url, b"0" * 16, None, None),
+            (None, long_url, b"0" * 16, None, None),
+        ]
+
+        assert import_chunk(cursor, rows) == (1, 1)
+
+        copy = cursor.copy.return_value.__enter__.return_value
+        assert [call.args[0][0] for call in copy.write_row.call_args_list] == [
+            "given00",
+            "taken00",
+            "fresh00",
+        ]
+        cursor.connection.transaction.assert_called_once()
+
+    @patch("cli.cli.settings")
+    def test_import_chunk_skips_repeated_slugs_and_publishes(
+        self, mock_settings: MagicMock
+    ) -> None:
+        """Repeats of a given slug are never staged; inserted slugs are notified."""
+        mock_settings.cache_notify = True
+        mock_settings.cache_notify_channel = "slug_changes"
+        cursor = MagicMock()
+        cursor.__iter__.side_effect = [iter([("given00",)])]
+        row = ("given00", long_url, b"0" * 16, None, None)
+
+        assert import_chunk(cursor, [row, row]) == (1, 1)
+
+        copy = cursor.copy.return_value.__enter__.return_value
+        copy.write_row.assert_called_once_with(row)
+        cursor.execute.assert_called_with(
+            "SELECT pg_notify(%s, %s)", ("slug_changes", "created:given00")
+        )
+
+
+class TestImport:
+    """Imports chunks into Postgres."""
+
+    @pytest.mark.asyncio
+    async def test_import_chunk(self) -> None:
+        """Slugs repeated in the chunk or already taken are skipped."""
+        await migrate_database(get_engine())
+        await get_engine().dispose()
+        slugs = ["cliA001", "cliA002"]
+        with psycopg.connect(settings.postgres_dsn, autocommit=True) as conn:
+            conn.execute(CREATE_STAGING_TABLE)
+            cursor = conn.cursor()
+            rows = [
+                (slugs[0], long_url, b"0" * 16, None, None),
+                (slugs[0], long_url, b"1" * 16, None, None),
+                (slugs[1], long_url, b"0" * 16, None, None),
+            ]
+            try:
+                assert import_chunk(cursor, rows) == (2, 1)
+                assert import_chunk(cursor, rows[1:]) == (0, 2)
+                cursor.execute(
+                    "SELECT slug, url_hash FROM links WHERE slug = ANY(%s) "
+                    "ORDER BY slug",
+                    (slugs,),
+                )
+                assert cursor.fetchall() == [
+                    (slugs[0], b"0" * 16),
+                    (slugs[1], b"0" * 16),
+                ]
+            finally:
+                conn.execute("DELETE FROM links WHERE slug = ANY(%s)", (slugs,))
@@ -1,7 +1,18 @@
+import os
+from unittest.mock import MagicMock, patch
+
 import pytest
-from sqlalchemy import text
+from sqlalchemy import exc, text
+from sqlalchemy.util import greenlet_spawn
 
-from database.database import async_session
+from config.config import Settings
+from database.database import (
+    InstrumentedPool,
+    async_session,
+    get_primary_engine,
+    get_read_engine,
+)
+from exceptions.exceptions import MissingPostgresSettingsError
 
 
 class TestDatabase:
@@ -14,3 +25,51 @@ class TestDatabase:
             assert value == 1, (
                 "Database connection failed or returned unexpected result"
             )
+
+
+class TestDatabaseSettings:
+    def test_postgres_settings_checked_on_use(self) -> None:
+        """Missing settings only fail once a connection string is needed."""
+        environ = {k: v for k, v in os.environ.items() if not k.startswith("POSTGRES_")}
+        with patch.dict(os.environ, environ, clear=True):
+            partial = Settings(
+                _env_file=None, postgres_host="db", postgres_user="u", postgres_db="d"
+            )  # type: ignore
+        with pytest.raises(MissingPostgresSettingsError, match="POSTGRES_PASSWORD"):
+            _ = partial.database_url
+
+
+class TestInstrumentedPool:
+    @pytest.mark.asyncio
+    async def test_pool_stats_track_checkouts(self) -> None:
+        pool = InstrumentedPool(
+            creator=MagicMock, pool_size=1, max_overflow=0, timeout=0.01
+        )
+        conn = await greenlet_spawn(pool.connect)
+        with pytest.raises(exc.TimeoutError):
+            await greenlet_spawn(pool.connect)
+
+        stats = pool.stats()
+
+        assert stats["checked_out"] == 1
+        assert stats["checkouts"] == 2
+        assert stats["timeouts"] == 1
+        assert stats["waiting"] == 0
+        assert stats["max_checkout_ms"] >= 10
+        conn.close()
+        assert pool.stats()["idle"] == 1
+
+
+class TestReadEngines:
+    def test_read_engine_defaults_to_primary(self) -> None:
+        with patch("database.database.get_replica_engines", return_value=[]):
+            assert get_read_engine() is get_primary_engine()
+
+    def test_read_engine_round_robins_replicas(self) -> None:
+        replicas = [MagicMock(), MagicMock()]
+        with patch("database.database.get_replica_engines", return_value=replicas):
+            engines = [get_read_engine() for _ in range(4)]
+
+        assert engines.count(replicas[0]) == 2
+        assert engines.count(replicas[1]) == 2
+        assert engines[0] is not engines[1]
@@ -0,0 +1,135 @@
+from array import array
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, AsyncSession
+
+from config.config import settings
+from main import app
+from services.cache import slug_cache
+from services.hot import HotSlugTracker, save_hot_slugs, warm_slug_cache
+
+long_url = "https://example.com/a/deep/page/and-some-more-information-here.html"
+
+
+class TestHotSlugTracker:
+    """Test suite for the HotSlugTracker class."""
+
+    def test_estimates_never_undercount(self) -> None:
+        """Estimates are at least the true number of requests."""
+        tracker = HotSlugTracker(width=64, depth=4, top_k=5)
+        for index in range(200):
+            for _ in range(index % 7):
+                tracker.record(f"slug{index}")
+        assert all(
+            tracker.estimate(f"slug{index}") >= index % 7 for index in range(200)
+        )
+
+    def test_top_keeps_hottest_slugs(self) -> None:
+        """Frequent slugs displace rare ones from the top, hottest first."""
+        tracker = HotSlugTracker(width=1024, depth=4, top_k=3)
+        for index in range(50):
+            tracker.record(f"rare{index}")
+        for count, slug in ((30, "hot"), (20, "warm"), (10, "mild")):
+            for _ in range(count):
+                tracker.record(slug)
+
+        assert [slug for slug, _ in tracker.top()] == ["hot", "warm", "mild"]
+        assert tracker.top(1) == [("hot", 30)]
+        assert tracker.stats()["tracked"] == 3
+
+    def test_decay_halves_counts(self) -> None:
+        """Counts halve every 10 * width requests, so old heat fades."""
+        tracker = HotSlugTracker(width=8, depth=2, top_k=2)
+        for _ in range(78):
+            tracker.record("old")
+        tracker.record("new")
+        assert tracker.stats()["decays"] == 0
+        tracker.record("new")
+        assert tracker.stats()["decays"] == 1
+        assert tracker.estimate("old") >= 39
+        assert tracker.estimate("old") < 78
+
+    def test_decay_halves_every_counter_exactly(self) -> None:
+        """Halving whole rows at once never carries bits between counters."""
+        tracker = HotSlugTracker(width=4, depth=2, top_k=2)
+        counts = [[0, 1, 0xFFFFFFFF, 0x80000001], [3, 2**31, 7, 0]]
+        for row, values in zip(tracker._rows, counts, strict=True):
+            row[:] = array("I", values)
+
+        tracker._decay()
+
+        assert [list(row) for row in tracker._rows] == [
+            [0, 0, 0x7FFFFFFF, 0x40000000],
+            [1, 2**30, 3, 0],
+        ]
+
+    def test_disabled(self) -> None:
+        """A top_k of 0 records nothing."""
+        tracker = HotSlugTracker(width=8, depth=2, top_k=0)
+        tracker.record("A1b2C3d")
+        assert tracker.top() == []
+        assert tracker.stats()["requests"] == 0
+
+
+class TestHotSlugStorage:
+    """Test suite for saving hot slugs and warming the cache from them."""
+
+    @pytest.mark.asyncio
+    async def test_save_hot_slugs(self) -> None:
+        """Hot slugs are upserted in slug order, then stale rows are dropped."""
+        mock_db = AsyncMock(AsyncSession)
+        await save_hot_slugs(mock_db, [("b", 2), ("a", 5)])
+
+        upsert = (
+            mock_db.execute.await_args_list[0]
+            .args[0]
+            .compile(dialect=postgresql.dialect())
+        )
+        assert "ON CONFLICT (slug) DO UPDATE" in str(upsert)
+        assert list(upsert.params.values())[:4] == ["a", 5, "b", 2]
+        assert mock_db.execute.await_count == 2
+        mock_db.commit.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_save_no_hot_slugs(self) -> None:
+        """With nothing to save, stale rows are still dropped."""
+        mock_db = AsyncMock(AsyncSession)
+        await save_hot_slugs(mock_db, [])
+        assert mock_db.execute.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_warm_slug_cache(self) -> None:
+        expires_at = datetime.now(timezone.utc) + timedelta(days=1)
+        mock_conn = AsyncMock(AsyncConnection)
+        mock_conn.execute.return_value = MagicMock(
+            all=MagicMock(return_value=[("A1b2C3d", long_url, expires_at)])
+        )
+        mock_engine = MagicMock(AsyncEngine)
+        mock_engine.connect.return_value.__aenter__.return_value = mock_conn
+
+        assert await warm_slug_cache(mock_engine, limit=10) == 1
+        assert slug_cache.get_link("A1b2C3d") == (True, (long_url, expires_at))
+
+
+class TestHotSlugRoutes:
+    @pytest.mark.asyncio
+    @patch("services.url.UrlService.get_link", new_callable=AsyncMock)
+    async def test_redirects_are_counted(self, mock_get_link: MagicMock) -> None:
+        mock_get_link.return_value = (
+            long_url,
+            datetime.now(timezone.utc) + timedelta(days=1),
+        )
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url=str(settings.base_url)
+        ) as ac:
+            await ac.get("/A1b2C3d")
+            await ac.get("/A1b2C3d")
+            await ac.head("/A1b2C3d")
+            response = await ac.get("/admin/hot")
+
+        assert response.status_code == 200
+        assert response.json()["slugs"] == [{"slug": "A1b2C3d", "hits": 2}]
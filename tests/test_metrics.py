@@ -0,0 +1,80 @@
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from config.config import settings
+from main import app
+from metrics.metrics import (
+    Histogram,
+    RequestStats,
+    _after_cursor_execute,
+    _before_cursor_execute,
+    render_metrics,
+    request_latency,
+    request_stats,
+)
+
+
+class TestMetrics:
+    """Test suite for the metrics module."""
+
+    def test_histogram_render(self) -> None:
+        """Histograms render cumulative buckets, sum and count."""
+        histogram = Histogram("test_seconds", "Test", ("route",), (0.1, 1.0))
+        histogram.observe(0.05, ("/a",))
+        histogram.observe(0.5, ("/a",))
+
+        lines = histogram.render()
+
+        assert 'test_seconds_bucket{route="/a",le="0.1"} 1' in lines
+        assert 'test_seconds_bucket{route="/a",le="1.0"} 2' in lines
+        assert 'test_seconds_bucket{route="/a",le="+Inf"} 2' in lines
+        assert 'test_seconds_count{route="/a"} 2' in lines
+
+    def test_statement_hooks_count_request_statements(self) -> None:
+        """Statements run during a request are added to its stats."""
+        conn = MagicMock(info={})
+        stats = RequestStats()
+        token = request_stats.set(stats)
+        try:
+            _before_cursor_execute(conn)
+            _after_cursor_execute(conn)
+        finally:
+            request_stats.reset(token)
+
+        assert stats.statements == 1
+        assert stats.db_time >= 0
+        assert conn.info["statement_start"] == []
+
+    @pytest.mark.asyncio
+    @patch("services.url.UrlService.get_link", new_callable=AsyncMock)
+    async def test_middleware_records_route_template(
+        self, mock_get_link: MagicMock
+    ) -> None:
+        """Requests are labelled with the route template, not the raw path."""
+        mock_get_link.return_value = (
+            "https://www.example.com/page",
+            datetime.now(timezone.utc) + timedelta(days=1),
+        )
+        request_latency.clear()
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url=str(settings.base_url)
+        ) as ac:
+            await ac.get(url="/A1b2C3d")
+            response = await ac.get(url="/metrics")
+
+        assert response.status_code == 200
+        assert (
+            'http_request_duration_seconds_count{method="GET",route="/{slug}",status="307"} 1'
+            in response.text
+        )
+
+    def test_render_includes_gauges(self) -> None:
+        """Cache, pool and click gauges are included in the output."""
+        output = render_metrics()
+
+        assert "cache_hits " in output
+        assert "db_pool_checked_out " in output
+        assert "clicks_dropped " in output
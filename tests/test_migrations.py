@@ -0,0 +1,206 @@
+from datetime import timedelta
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import ProgrammingError
+from sqlalchemy.ext.asyncio import AsyncConnection, create_async_engine
+
+from config.config import settings
+from database.migrations import (
+    MIGRATIONS,
+    SCHEMA_VERSION,
+    add_expires_at,
+    add_url_hash,
+    check_schema_version,
+    migrate,
+)
+from exceptions.exceptions import SchemaOutdatedError
+from models.models import Base
+from services.hashing import hash_url
+from storage.postgres import PostgresLinkStore
+
+
+def executed(mock_conn: AsyncMock) -> list[str]:
+    """Returns the SQL of every statement run through execute."""
+    return [str(call.args[0]) for call in mock_conn.execute.await_args_list]
+
+
+def engine_with(mock_conn: AsyncMock) -> MagicMock:
+    mock_engine = MagicMock()
+    mock_engine.connect.return_value.__aenter__.return_value = mock_conn
+    return mock_engine
+
+
+class TestMigrations:
+    """Test suite for the schema migrations."""
+
+    @pytest.mark.asyncio
+    async def test_migrate_new_database(self) -> None:
+        """Every migration runs, and the new version is recorded."""
+        mock_conn = AsyncMock(AsyncConnection)
+        mock_conn.scalar.return_value = None
+        migration = AsyncMock()
+
+        with patch("database.migrations.MIGRATIONS", [migration]):
+            assert await migrate(mock_conn) == (0, SCHEMA_VERSION)
+
+        migration.assert_awaited_once_with(mock_conn)
+        statements = executed(mock_conn)
+        assert "pg_advisory_xact_lock" in statements[0]
+        assert statements[-1].startswith("INSERT INTO schema_version")
+
+    @pytest.mark.asyncio
+    async def test_migrate_up_to_date_database(self) -> None:
+        mock_conn = AsyncMock(AsyncConnection)
+        mock_conn.scalar.return_value = SCHEMA_VERSION
+        migration = AsyncMock()
+
+        with patch("database.migrations.MIGRATIONS", [migration] * SCHEMA_VERSION):
+            assert await migrate(mock_conn) == (SCHEMA_VERSION, SCHEMA_VERSION)
+
+        migration.assert_not_awaited()
+        assert not any("INSERT" in statement for statement in executed(mock_conn))
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("partitioned", [True, False])
+    async def test_migrations_are_idempotent(self, partitioned: bool) -> None:
+        """Objects that create_all may have made already are kept as they are."""
+        mock_conn = AsyncMock(AsyncConnection)
+        mock_conn.execute.return_value = MagicMock(**{"all.return_value": []})
+        with patch("database.migrations.settings") as mock_settings:
+            mock_settings.links_partitioned = partitioned
+            mock_settings.max_url_length = 2048
+            mock_settings.max_url_age = 30
+            for migration in MIGRATIONS:
+                await migration(mock_conn)
+
+        for statement in executed(mock_conn):
+            if statement.startswith(("CREATE", "ALTER TABLE links ADD")):
+                assert "IF NOT EXISTS" in statement
+        assert ("PARTITION BY" in executed(mock_conn)[0]) == partitioned
+
+    @pytest.mark.asyncio
+    async def test_migrations_cover_models(self) -> None:
+        """Every table and column of the models is created by some migration."""
+        mock_conn = AsyncMock(AsyncConnection)
+        mock_conn.execute.return_value = MagicMock(**{"all.return_value": []})
+        for migration in MIGRATIONS:
+            await migration(mock_conn)
+        ddl = " ".join(executed(mock_conn))
+
+        for table in Base.metadata.tables.values():
+            assert f"TABLE IF NOT EXISTS {table.name} " in ddl
+            for column in table.columns:
+                assert f"{column.name} " in ddl, f"{table.name}.{column.name}"
+            for index in table.indexes:
+                assert f"{index.name} ON {table.name} " in ddl
+
+    @pytest.mark.asyncio
+    async def test_expires_at_backfill(self) -> None:
+        """Existing links get an expiry before the column becomes NOT NULL."""
+        mock_conn = AsyncMock(AsyncConnection)
+        await add_expires_at(mock_conn)
+        statements = executed(mock_conn)
+        assert "SET DEFAULT" in statements[1]
+        assert statements[2].startswith("UPDATE links SET expires_at")
+        assert statements[3].endswith("SET NOT NULL")
+
+    @pytest.mark.asyncio
+    async def test_previous_release_inserts_after_expires_at(self) -> None:
+        """Links inserted without expires_at, as before migration 6, still work."""
+        engine = create_async_engine(
+            settings.database_url, connect_args={"options": "-c search_path=mig_test"}
+        )
+        try:
+            async with engine.begin() as conn:
+                await conn.execute(text("DROP SCHEMA IF EXISTS mig_test CASCADE"))
+                await conn.execute(text("CREATE SCHEMA mig_test"))
+                with patch(
+                    "database.migrations.settings",
+                    settings.model_copy(update={"links_partitioned": False}),
+                ):
+                    for migration in MIGRATIONS[:6]:
+                        await migration(conn)
+                await conn.execute(
+                    text("INSERT INTO links (slug, long_url) VALUES ('old', 'u')")
+                )
+                expires_in = await conn.scalar(
+                    text("SELECT expires_at - now() FROM links WHERE slug = 'old'")
+                )
+                await conn.execute(text("DROP SCHEMA mig_test CASCADE"))
+        finally:
+            await engine.dispose()
+
+        # now() is fixed for the transaction, so the default is exact
+        assert expires_in == timedelta(days=settings.max_url_age)
+
+    @pytest.mark.asyncio
+    async def test_url_hash_backfill(self) -> None:
+        """Existing links are hashed like new ones, then indexed."""
+        batches = [[(1, "https://Example.com/a"), (7, "https://example.com/b")], []]
+
+        def execute(statement: object, *_: object) -> MagicMock:
+            result = MagicMock()
+            if str(statement).startswith("SELECT"):
+                result.all.return_value = batches.pop(0)
+            return result
+
+        mock_conn = AsyncMock(AsyncConnection)
+        mock_conn.execute.side_effect = execute
+
+        await add_url_hash(mock_conn)
+
+        calls = mock_conn.execute.await_args_list
+        assert calls[1].args[1]["after"] == 0
+        assert calls[2].args[1] == [
+            {"link_id": 1, "url_hash": hash_url("https://example.com/a")},
+            {"link_id": 7, "url_hash": hash_url("https://example.com/b")},
+        ]
+        assert calls[3].args[1]["after"] == 7
+        assert str(calls[-1].args[0]).startswith("CREATE INDEX IF NOT EXISTS")
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("found", [SCHEMA_VERSION, SCHEMA_VERSION + 1])
+    async def test_check_current_schema(self, found: int) -> None:
+        """The current and newer schema versions are accepted."""
+        mock_conn = AsyncMock(AsyncConnection)
+        mock_conn.scalar.return_value = found
+        assert await check_schema_version(engine_with(mock_conn)) == found
+
+    @pytest.mark.asyncio
+    async def test_check_outdated_schema(self) -> None:
+        mock_conn = AsyncMock(AsyncConnection)
+        mock_conn.scalar.return_value = SCHEMA_VERSION - 1
+        with pytest.raises(SchemaOutdatedError):
+            await check_schema_version(engine_with(mock_conn))
+
+    @pytest.mark.asyncio
+    async def test_check_unversioned_schema(self) -> None:
+        """A database that was never migrated has no schema_version table."""
+        mock_conn = AsyncMock(AsyncConnection)
+        mock_conn.scalar.side_effect = ProgrammingError("SELECT", {}, Exception())
+        with pytest.raises(SchemaOutdatedError, match="version 0"):
+            await check_schema_version(engine_with(mock_conn))
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("migrate_on_startup", [True, False])
+    @patch("storage.postgres.settings")
+    @patch("storage.postgres.check_schema_version", new_callable=AsyncMock)
+    @patch("storage.postgres.migrate_database", new_callable=AsyncMock)
+    async def test_store_setup(
+        self,
+        mock_migrate: MagicMock,
+        mock_check: MagicMock,
+        mock_settings: MagicMock,
+        migrate_on_startup: bool,
+    ) -> None:
+        """Processes only check the schema, unless told to migrate it."""
+        mock_settings.migrate_on_startup = migrate_on_startup
+        mock_settings.db_pool_warm_up = False
+        mock_settings.links_partitioned = False
+
+        await PostgresLinkStore().setup()
+
+        assert mock_migrate.await_count == migrate_on_startup
+        assert mock_check.await_count == (not migrate_on_startup)
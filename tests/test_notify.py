@@ -0,0 +1,251 @@
+import asyncio
+from collections.abc import AsyncIterator
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import psycopg
+import pytest
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, AsyncSession
+
+from services.cache import slug_cache
+from services.notify import (
+    MAX_PAYLOAD,
+    CreatedSlugPublisher,
+    SlugChangeListener,
+    encode_events,
+    publish_slug_changes,
+)
+
+long_url = "https://example.com/a/deep/page/and-some-more-information-here.html"
+expires_at = datetime.now(timezone.utc) + timedelta(days=1)
+
+
+async def notifications(
+    payloads: list[str], error: BaseException
+) -> AsyncIterator[MagicMock]:
+    """Stands in for AsyncConnection.notifies(): yields payloads, then fails."""
+    for payload in payloads:
+        yield MagicMock(payload=payload)
+    raise error
+
+
+def publishing_engine() -> tuple[MagicMock, AsyncMock]:
+    mock_conn = AsyncMock(AsyncConnection)
+    mock_engine = MagicMock(AsyncEngine)
+    mock_engine.begin.return_value.__aenter__.return_value = mock_conn
+    return mock_engine, mock_conn
+
+
+class TestSlugChanges:
+    """Test suite for slug change events."""
+
+    def test_encode_events_fits_payload_limit(self) -> None:
+        """Many slugs are split over payloads Postgres accepts."""
+        slugs = [f"{index:07}" for index in range(3000)]
+
+        payloads = list(encode_events("created", slugs))
+
+        assert len(payloads) > 1
+        assert all(len(payload) <= MAX_PAYLOAD for payload in payloads)
+        decoded = [
+            slug
+            for payload in payloads
+            for slug in payload.removeprefix("created:").split(",")
+        ]
+        assert decoded == slugs
+
+    @pytest.mark.asyncio
+    @patch("services.notify.settings")
+    async def test_publish_disabled(self, mock_settings: MagicMock) -> None:
+        """Nothing is sent unless cache_notify is set."""
+        mock_settings.cache_notify = False
+        mock_db = AsyncMock(AsyncSession)
+        await publish_slug_changes(mock_db, "created", ["A1b2C3d"])
+        mock_db.execute.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    @patch("services.notify.settings")
+    async def test_publish_in_transaction(self, mock_settings: MagicMock) -> None:
+        """Events are sent with pg_notify on the writer's own session."""
+        mock_settings.cache_notify = True
+        mock_settings.cache_notify_channel = "slug_changes"
+        mock_db = AsyncMock(AsyncSession)
+
+        await publish_slug_changes(mock_db, "deleted", ["A1b2C3d", "B2c3D4e"])
+
+        statement = mock_db.execute.await_args.args[0]
+        assert "pg_notify" in str(statement)
+        assert list(statement.compile().params.values()) == [
+            "slug_changes",
+            "deleted:A1b2C3d,B2c3D4e",
+        ]
+
+    @patch("services.notify.slug_filter.add")
+    def test_handle_created(self, mock_add: MagicMock) -> None:
+        """Created slugs drop negative cache entries and join the Bloom filter."""
+        slug_cache.put_missing("A1b2C3d")
+
+        SlugChangeListener("slug_changes", 0).handle("created:A1b2C3d")
+
+        assert slug_cache.get_link("A1b2C3d") == (False, None)
+        mock_add.assert_called_once_with("A1b2C3d")
+
+    @patch("services.notify.slug_filter.add")
+    def test_handle_deleted(self, mock_add: MagicMock) -> None:
+        """Deleted slugs are evicted from the cache."""
+        slug_cache.put("A1b2C3d", long_url, expires_at)
+        slug_cache.put("B2c3D4e", long_url, expires_at)
+
+        SlugChangeListener("slug_changes", 0).handle("deleted:A1b2C3d,B2c3D4e")
+
+        assert slug_cache.stats()["size"] == 0
+        mock_add.assert_not_called()
+
+    @pytest.mark.asyncio
+    @patch("services.notify.asyncio.sleep", new_callable=AsyncMock)
+    @patch("services.notify.psycopg.AsyncConnection.connect", new_callable=AsyncMock)
+    async def test_reconnect_clears_cache(
+        self, mock_connect: MagicMock, mock_sleep: MagicMock
+    ) -> None:
+        """Events missed while disconnected cannot linger in the cache."""
+        mock_conn = mock_connect.return_value.__aenter__.return_value
+        mock_conn.notifies = MagicMock(
+            side_effect=[
+                notifications([], psycopg.OperationalError()),
+                notifications(["deleted:B2c3D4e"], asyncio.CancelledError()),
+            ]
+        )
+        slug_cache.put("A1b2C3d", long_url, expires_at)
+        listener = SlugChangeListener("slug_changes", 0)
+
+        with pytest.raises(asyncio.CancelledError):
+            await listener.run("postgresql://", MagicMock(AsyncEngine))
+
+        assert slug_cache.get_link("A1b2C3d") == (False, None)
+        assert listener.stats() == {"received": 1, "reconnects": 1}
+        mock_sleep.assert_awaited_once()
+
+
+class TestCreatedSlugPublisher:
+    """Test suite for the CreatedSlugPublisher class."""
+
+    @patch("services.notify.settings")
+    def test_nothing_queued_when_disabled(self, mock_settings: MagicMock) -> None:
+        mock_settings.cache_notify = False
+        publisher = CreatedSlugPublisher(
+            channel="slug_changes", flush_interval=1, capacity=10
+        )
+        publisher.add(["A1b2C3d"])
+        assert publisher.stats()["queued"] == 0
+
+    @pytest.mark.asyncio
+    @patch("services.notify.settings")
+    async def test_flush_publishes_in_one_notify(
+        self, mock_settings: MagicMock
+    ) -> None:
+        """Slugs from many inserts share one transaction and one payload."""
+        mock_settings.cache_notify = True
+        publisher = CreatedSlugPublisher(
+            channel="slug_changes", flush_interval=1, capacity=10
+        )
+        mock_engine, mock_conn = publishing_engine()
+        publisher.add(["A1b2C3d"])
+        publisher.add(["B2c3D4e", "C3d4E5f"])
+
+        await publisher.flush(mock_engine)
+        await publisher.flush(mock_engine)
+
+        mock_engine.begin.assert_called_once()
+        statement = mock_conn.execute.await_args.args[0]
+        assert list(statement.compile().params.values()) == [
+            "slug_changes",
+            "created:A1b2C3d,B2c3D4e,C3d4E5f",
+        ]
+        assert publisher.stats() == {
+            "queued": 0,
+            "published": 3,
+            "dropped": 0,
+            "failures": 0,
+            "flushes": 1,
+        }
+
+    @pytest.mark.asyncio
+    @patch("services.notify.settings")
+    async def test_failed_flush_is_retried(self, mock_settings: MagicMock) -> None:
+        """Slugs whose publish fails go out with the next flush."""
+        mock_settings.cache_notify = True
+        publisher = CreatedSlugPublisher(
+            channel="slug_changes", flush_interval=1, capacity=10
+        )
+        mock_engine, mock_conn = publishing_engine()
+        mock_conn.execute.side_effect = OperationalError("NOTIFY", {}, Exception())
+        publisher.add(["A1b2C3d"])
+
+        await publisher.flush(mock_engine)
+        publisher.add(["B2c3D4e"])
+        mock_conn.execute.side_effect = None
+        await publisher.flush(mock_engine)
+
+        statement = mock_conn.execute.await_args.args[0]
+        assert list(statement.compile().params.values()) == [
+            "slug_changes",
+            "created:A1b2C3d,B2c3D4e",
+        ]
+        assert publisher.stats()["failures"] == 1
+        assert publisher.stats()["published"] == 2
+        assert publisher.stats()["dropped"] == 0
+
+    @pytest.mark.asyncio
+    @patch("services.notify.settings")
+    async def test_failed_flush_keeps_newest_slugs(
+        self, mock_settings: MagicMock
+    ) -> None:
+        """Requeued slugs past capacity are dropped, oldest first."""
+        mock_settings.cache_notify = True
+        publisher = CreatedSlugPublisher(
+            channel="slug_changes", flush_interval=1, capacity=2
+        )
+        mock_engine, mock_conn = publishing_engine()
+        mock_conn.execute.side_effect = OperationalError("NOTIFY", {}, Exception())
+        publisher.add(["A1b2C3d", "B2c3D4e"])
+        await publisher.flush(mock_engine)
+        publisher.add(["C3d4E5f"])
+
+        await publisher.flush(mock_engine)
+
+        assert publisher.stats()["queued"] == 2
+        assert publisher.stats()["dropped"] == 1
+
+    @pytest.mark.asyncio
+    @patch("services.notify.settings")
+    async def test_stop_publishes_what_is_left(self, mock_settings: MagicMock) -> None:
+        mock_settings.cache_notify = True
+        publisher = CreatedSlugPublisher(
+            channel="slug_changes", flush_interval=60, capacity=10
+        )
+        mock_engine, _ = publishing_engine()
+        task = asyncio.create_task(publisher.run(mock_engine))
+        await asyncio.sleep(0)
+        publisher.add(["A1b2C3d"])
+
+        publisher.stop()
+        await task
+
+        assert publisher.published == 1
+
+    @pytest.mark.asyncio
+    @patch("services.notify.settings")
+    async def test_stop_before_worker_starts(self, mock_settings: MagicMock) -> None:
+        mock_settings.cache_notify = True
+        publisher = CreatedSlugPublisher(
+            channel="slug_changes", flush_interval=60, capacity=10
+        )
+        mock_engine, _ = publishing_engine()
+        task = asyncio.create_task(publisher.run(mock_engine))
+        publisher.add(["A1b2C3d"])
+
+        publisher.stop()
+        await asyncio.wait_for(task, timeout=1)
+
+        assert publisher.published == 1
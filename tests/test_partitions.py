@@ -0,0 +1,177 @@
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from datetime import date, datetime, timedelta, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import (
+    AsyncConnection,
+    AsyncEngine,
+    AsyncSession,
+    create_async_engine,
+)
+
+from config.config import settings
+from database.migrations import migrate
+from database.partitions import (
+    create_link_partitions,
+    day_start,
+    drop_expired_link_partitions,
+    link_partitions,
+    partition_day,
+    partition_name,
+)
+from services.url import UrlService
+
+today: date = datetime.now(timezone.utc).date()
+long_url = "https://example.com/a/deep/page/and-some-more-information-here.html"
+SCHEMA: str = "partition_test"
+
+
+@asynccontextmanager
+async def partitioned_links() -> AsyncIterator[AsyncEngine]:
+    """Yields an engine on a scratch schema holding a partitioned links table."""
+    engine = create_async_engine(
+        settings.database_url, connect_args={"options": f"-c search_path={SCHEMA}"}
+    )
+    async with engine.begin() as conn:
+        await conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        await conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+        with patch(
+            "database.migrations.settings",
+            settings.model_copy(update={"links_partitioned": True}),
+        ):
+            await migrate(conn)
+    try:
+        yield engine
+    finally:
+        async with engine.begin() as conn:
+            await conn.execute(text(f"DROP SCHEMA {SCHEMA} CASCADE"))
+        await engine.dispose()
+
+
+def executed(mock_conn: AsyncMock) -> list[str]:
+    """Returns the SQL of every statement run through execute."""
+    return [str(call.args[0]) for call in mock_conn.execute.await_args_list]
+
+
+class TestPartitions:
+    """Test suite for the links table partition maintenance."""
+
+    def test_partition_names(self) -> None:
+        """Partition names round-trip to the day they hold."""
+        assert partition_name(date(2026, 1, 2)) == "links_p20260102"
+        assert partition_day("links_p20260102") == date(2026, 1, 2)
+        assert partition_day("links_default") is None
+
+    @pytest.mark.asyncio
+    @patch("database.partitions.link_partitions", new_callable=AsyncMock)
+    async def test_create_missing_partitions(
+        self, mock_link_partitions: MagicMock
+    ) -> None:
+        """Only partitions that do not exist yet are created."""
+        mock_link_partitions.return_value = [partition_name(today)]
+        mock_conn = AsyncMock(AsyncConnection)
+
+        created = await create_link_partitions(mock_conn, days_ahead=2)
+
+        assert created == [
+            partition_name(today + timedelta(days=1)),
+            partition_name(today + timedelta(days=2)),
+        ]
+        statements = executed(mock_conn)
+        assert "pg_advisory_xact_lock" in statements[0]
+        assert statements[1].startswith(f"CREATE TABLE {created[0]} PARTITION OF links")
+
+
+class TestPartitionedLinks:
+    """Partition maintenance against a partitioned links table in Postgres."""
+
+    @pytest.mark.asyncio
+    async def test_drop_expired_partitions(self) -> None:
+        """Old partitions with no live links are detached and dropped, with
+        their clicks, as are partitions a previous run left detached."""
+        old_day = today - timedelta(days=settings.purge_after_days + 40)
+        old, left_over, old_live = (
+            partition_name(old_day + timedelta(days=offset)) for offset in range(3)
+        )
+        async with partitioned_links() as engine:
+            async with engine.begin() as conn:
+                for offset, name in enumerate((old, left_over, old_live)):
+                    day = old_day + timedelta(days=offset)
+                    await conn.execute(
+                        text(
+                            f"CREATE TABLE {name} PARTITION OF links FOR VALUES "
+                            f"FROM ('{day_start(day).isoformat()}') "
+                            f"TO ('{day_start(day + timedelta(days=1)).isoformat()}')"
+                        )
+                    )
+                    # The last partition still holds a link within the window
+                    expires_at = datetime.now(timezone.utc) - timedelta(
+                        days=0 if name == old_live else settings.purge_after_days + 30
+                    )
+                    await conn.execute(
+                        text(
+                            "INSERT INTO links (slug, long_url, created_ts, "
+                            "expires_at) VALUES (:slug, :long_url, :day, :expires)"
+                        ),
+                        {
+                            "slug": f"old{offset}",
+                            "long_url": long_url,
+                            "day": day_start(day),
+                            "expires": expires_at,
+                        },
+                    )
+                await conn.execute(
+                    text(
+                        "INSERT INTO link_clicks VALUES "
+                        "('old0', 1, now()), ('old2', 1, now())"
+                    )
+                )
+                await conn.execute(
+                    text(f"ALTER TABLE links DETACH PARTITION {left_over}")
+                )
+
+            dropped = await drop_expired_link_partitions(engine)
+
+            async with engine.connect() as conn:
+                partitions = await link_partitions(conn)
+                clicks = (
+                    await conn.scalars(text("SELECT slug FROM link_clicks"))
+                ).all()
+                tables = (
+                    await conn.scalars(
+                        text(
+                            "SELECT tablename FROM pg_tables "
+                            "WHERE schemaname = current_schema()"
+                        )
+                    )
+                ).all()
+        assert dropped == [old, left_over]
+        assert old_live in partitions
+        assert partition_name(today) in partitions
+        assert old not in tables
+        assert left_over not in tables
+        assert clicks == ["old2"]
+
+    @pytest.mark.asyncio
+    async def test_insert_creates_missing_partitions(self) -> None:
+        """Inserts made without a partition for today create the partitions."""
+        async with partitioned_links() as engine:
+            async with engine.begin() as conn:
+                for name in await link_partitions(conn):
+                    await conn.execute(text(f"DROP TABLE {name}"))
+
+            async with AsyncSession(engine, expire_on_commit=False) as db:
+                [slug] = await UrlService()._insert_links(db, [long_url])
+                await db.commit()
+
+            async with engine.connect() as conn:
+                partitions = await link_partitions(conn)
+                stored = await conn.scalar(
+                    text("SELECT long_url FROM links WHERE slug = :slug"),
+                    {"slug": slug},
+                )
+        assert partition_name(today) in partitions
+        assert stored == long_url
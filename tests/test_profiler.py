@@ -0,0 +1,169 @@
+import asyncio
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from config.config import settings
+from main import app
+from metrics.profiler import (
+    Profile,
+    ProfilerMiddleware,
+    RequestProfiler,
+    _after_cursor_execute,
+    _before_cursor_execute,
+    current_profile,
+)
+
+
+def busy_handler() -> None:
+    deadline: float = time.perf_counter() + 0.1
+    while time.perf_counter() < deadline:
+        pass
+
+
+def build_app() -> FastAPI:
+    profiled = FastAPI()
+    profiled.add_middleware(ProfilerMiddleware)
+
+    @profiled.get("/busy/{name}")
+    async def busy(name: str) -> dict:
+        busy_handler()
+        return {"name": name}
+
+    @profiled.get("/sleep")
+    async def sleep(seconds: float) -> dict:
+        await asyncio.sleep(seconds)
+        return {}
+
+    return profiled
+
+
+class TestRequestProfiler:
+    """Test suite for the RequestProfiler class."""
+
+    @pytest.mark.asyncio
+    async def test_samples_request_stacks(self) -> None:
+        """A sampled request's CPU time is counted against its own frames."""
+        profiler = RequestProfiler(
+            sample_rate=1.0, slow_threshold=0, interval=0.001, capacity=10
+        )
+        with patch("metrics.profiler.request_profiler", profiler):
+            async with AsyncClient(
+                transport=ASGITransport(app=build_app()), base_url="http://test"
+            ) as ac:
+                response = await ac.get("/busy/abc")
+
+        assert response.status_code == 200
+        [profile] = profiler.profiles
+        assert profile.path == "/busy/{name}"
+        assert profile.status == 200
+        assert profile.samples.total() > 0
+        collapsed = profiler.collapsed()
+        assert collapsed.startswith("GET /busy/{name};")
+        assert "busy_handler (" in collapsed
+        assert all(int(line.rsplit(" ", 1)[1]) > 0 for line in collapsed.splitlines())
+
+    @pytest.mark.asyncio
+    async def test_slow_threshold_keeps_only_slow_requests(self) -> None:
+        """With a threshold, fast requests are profiled but not kept."""
+        profiler = RequestProfiler(
+            sample_rate=0, slow_threshold=0.05, interval=0.001, capacity=10
+        )
+        with patch("metrics.profiler.request_profiler", profiler):
+            async with AsyncClient(
+                transport=ASGITransport(app=build_app()), base_url="http://test"
+            ) as ac:
+                await ac.get("/sleep", params={"seconds": 0})
+                await ac.get("/sleep", params={"seconds": 0.06})
+
+        assert profiler.stats() == {
+            "active": 0,
+            "sampled": 2,
+            "kept": 1,
+            "buffered": 1,
+        }
+        assert profiler.profiles[0].duration >= 0.05
+
+    @pytest.mark.asyncio
+    async def test_unsampled_requests_are_not_profiled(self) -> None:
+        profiler = RequestProfiler(
+            sample_rate=0, slow_threshold=0, interval=0.001, capacity=10
+        )
+        with patch("metrics.profiler.request_profiler", profiler):
+            async with AsyncClient(
+                transport=ASGITransport(app=build_app()), base_url="http://test"
+            ) as ac:
+                await ac.get("/sleep", params={"seconds": 0})
+
+        assert profiler.sampled == 0
+        assert profiler._sampler is None
+
+    def test_ring_buffer_keeps_latest_profiles(self) -> None:
+        profiler = RequestProfiler(
+            sample_rate=1.0, slow_threshold=0, interval=0.001, capacity=2
+        )
+        for _ in range(3):
+            frame = MagicMock()
+            profile = profiler.start(frame, "GET", "/")
+            profiler.finish(frame, profile)
+
+        assert [profile.profile_id for profile in profiler.profiles] == [2, 3]
+        assert profiler.collapsed(profile_id=1) == ""
+
+    def test_statements_are_recorded_and_weighted(self) -> None:
+        """Statements run by a profiled request become [sql] frames."""
+        profiler = RequestProfiler(
+            sample_rate=1.0, slow_threshold=0, interval=0.001, capacity=2
+        )
+        frame = MagicMock()
+        profile = profiler.start(frame, "POST", "/shorten")
+        conn = MagicMock(info={})
+        token = current_profile.set(profile)
+        try:
+            _before_cursor_execute(conn)
+            _after_cursor_execute(conn, statement="SELECT 1;\n  SELECT 2")
+        finally:
+            current_profile.reset(token)
+        profiler.finish(frame, profile)
+        profile.statements[0] = (profile.statements[0][0], 0.004)
+
+        assert conn.info["profile_start"] == []
+        assert profiler.collapsed() == "POST /shorten;[sql] SELECT 1, SELECT 2 4\n"
+        assert profile.summary()["statements"] == [
+            {"sql": "SELECT 1;\n  SELECT 2", "duration_ms": 4.0}
+        ]
+
+    def test_statements_outside_profiles_are_ignored(self) -> None:
+        conn = MagicMock(info={})
+        _before_cursor_execute(conn)
+        _after_cursor_execute(conn, statement="SELECT 1")
+        assert "profile_start" not in conn.info
+
+
+class TestProfileRoutes:
+    """Test suite for the profile admin routes."""
+
+    @pytest.mark.asyncio
+    async def test_read_profiles(self) -> None:
+        profiler = RequestProfiler(
+            sample_rate=1.0, slow_threshold=0, interval=0.001, capacity=2
+        )
+        profile = Profile(7, "GET", "/{slug}", thread=0)
+        profile.samples["handler (routes/routes.py:1)"] = 3
+        profiler.profiles.append(profile)
+
+        with patch("routes.admin.request_profiler", profiler):
+            async with AsyncClient(
+                transport=ASGITransport(app=app), base_url=str(settings.base_url)
+            ) as ac:
+                listing = await ac.get("/admin/profiles")
+                collapsed = await ac.get(
+                    "/admin/profiles/collapsed", params={"profile_id": 7}
+                )
+
+        assert [item["id"] for item in listing.json()["profiles"]] == [7]
+        assert collapsed.headers["content-type"].startswith("text/plain")
+        assert collapsed.text == "GET /{slug};handler (routes/routes.py:1) 3\n"
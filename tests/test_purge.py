@@ -0,0 +1,53 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from config.config import settings
+from tasks.purge import purge_expired_links
+
+
+class TestPurge:
+    """Test suite for the expired link purge task."""
+
+    @pytest.mark.asyncio
+    @patch("tasks.purge.asyncio.sleep", new_callable=AsyncMock)
+    @patch("tasks.purge.link_store.purge_expired_links", new_callable=AsyncMock)
+    async def test_purge_runs_batches_until_done(
+        self,
+        mock_purge_expired_links: MagicMock,
+        mock_sleep: MagicMock,
+    ) -> None:
+        """Full batches are followed by another batch, then the task waits."""
+        mock_purge_expired_links.side_effect = [settings.purge_batch_size, 3]
+        mock_sleep.side_effect = [None, asyncio.CancelledError]
+
+        with pytest.raises(asyncio.CancelledError):
+            await purge_expired_links()
+
+        assert mock_purge_expired_links.await_count == 2
+        mock_purge_expired_links.assert_awaited_with(settings.purge_batch_size)
+        assert mock_sleep.await_args_list[0].args == (settings.purge_batch_delay,)
+        assert mock_sleep.await_args_list[1].args == (settings.purge_interval,)
+
+    @pytest.mark.asyncio
+    @patch("tasks.purge.maintain_link_partitions", new_callable=AsyncMock)
+    @patch("tasks.purge.asyncio.sleep", new_callable=AsyncMock)
+    @patch("services.url.UrlService.purge_expired_links", new_callable=AsyncMock)
+    @patch("tasks.purge.settings")
+    async def test_partitioned_links_drop_partitions(
+        self,
+        mock_settings: MagicMock,
+        mock_purge_expired_links: MagicMock,
+        mock_sleep: MagicMock,
+        mock_maintain_link_partitions: MagicMock,
+    ) -> None:
+        """Partitioned links are purged by partition, never row by row."""
+        mock_settings.links_partitioned = True
+        mock_sleep.side_effect = asyncio.CancelledError
+
+        with pytest.raises(asyncio.CancelledError):
+            await purge_expired_links()
+
+        mock_maintain_link_partitions.assert_awaited_once()
+        mock_purge_expired_links.assert_not_awaited()
@@ -1,5 +1,6 @@
 """FastAPI Routes"""
 
+from datetime import datetime, timedelta, timezone
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
@@ -10,6 +11,7 @@ from exceptions.exceptions import LinkExpiredError, NoMatchingSlugError
 from main import app
 
 slug = "A1b2C3d"
+expires_at = datetime.now(timezone.utc) + timedelta(days=1)
 
 
 class TestRoutes:
@@ -84,11 +86,11 @@ class TestRoutes:
         assert "Internal error" in response.text
 
     @pytest.mark.asyncio
-    @patch("services.url.UrlService.get_long_url", new_callable=AsyncMock)
+    @patch("services.url.UrlService.get_link", new_callable=AsyncMock)
     async def test_return_long_url_for_valid_slug(
-        self, mock_get_long_url: MagicMock
+        self, mock_get_link: MagicMock
     ) -> None:
-        mock_get_long_url.return_value = "https://www.example.com/page"
+        mock_get_link.return_value = ("https://www.example.com/page", expires_at)
         async with AsyncClient(
             transport=ASGITransport(app=app), base_url=str(settings.base_url)
         ) as ac:
@@ -98,11 +100,11 @@ class TestRoutes:
         assert response.is_redirect
 
     @pytest.mark.asyncio
-    @patch("services.url.UrlService.get_long_url", new_callable=AsyncMock)
+    @patch("services.url.UrlService.get_link", new_callable=AsyncMock)
     async def test_return_error_for_invalid_slug(
-        self, mock_get_long_url: MagicMock
+        self, mock_get_link: MagicMock
     ) -> None:
-        mock_get_long_url.side_effect = NoMatchingSlugError("No matching slug found")
+        mock_get_link.side_effect = NoMatchingSlugError("No matching slug found")
         async with AsyncClient(
             transport=ASGITransport(app=app), base_url=str(settings.base_url)
         ) as ac:
@@ -111,13 +113,11 @@ class TestRoutes:
         assert response.status_code == 404
 
     @pytest.mark.asyncio
-    @patch("services.url.UrlService.get_long_url", new_callable=AsyncMock)
+    @patch("services.url.UrlService.get_link", new_callable=AsyncMock)
     async def test_return_error_for_expired_link(
-        self, mock_get_long_url: MagicMock
+        self, mock_get_link: MagicMock
     ) -> None:
-        mock_get_long_url.side_effect = LinkExpiredError(
-            "ABCD123", settings.max_url_age
-        )
+        mock_get_link.side_effect = LinkExpiredError("ABCD123", settings.max_url_age)
         async with AsyncClient(
             transport=ASGITransport(app=app), base_url=str(settings.base_url)
         ) as ac:
@@ -126,3 +126,230 @@ class TestRoutes:
         assert response.json() == {
             "detail": "ABCD123 has expired: older than 30 days old."
         }
+
+    @pytest.mark.asyncio
+    async def test_read_cache_stats(self) -> None:
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url=str(settings.base_url)
+        ) as ac:
+            response = await ac.get(url="/admin/cache")
+
+        assert response.status_code == 200
+        assert {"hits", "misses", "evictions"} <= response.json().keys()
+
+    @pytest.mark.asyncio
+    async def test_read_bloom_stats(self) -> None:
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url=str(settings.base_url)
+        ) as ac:
+            response = await ac.get(url="/admin/bloom")
+
+        assert response.status_code == 200
+        assert {"built", "slugs", "rejections"} <= response.json().keys()
+
+    @pytest.mark.asyncio
+    @patch("services.url.UrlService.create_short_urls", new_callable=AsyncMock)
+    async def test_return_short_urls_batch(
+        self, mock_create_short_urls: MagicMock
+    ) -> None:
+        mock_create_short_urls.return_value = [f"{settings.base_url}{slug}", None]
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url=str(settings.base_url)
+        ) as ac:
+            payload = {
+                "long_urls": [
+                    "https://www.example.com/page",
+                    "an-invalid-url",
+                    "https://www.example.com/other",
+                ]
+            }
+            response = await ac.post(url="/shorten/batch", json=payload)
+
+        results = response.json()["results"]
+        assert response.status_code == 200
+        assert results[0]["short_url"] == f"{settings.base_url}{slug}"
+        assert results[0]["error"] is None
+        assert results[1]["short_url"] is None
+        assert "URL" in results[1]["error"]
+        assert results[2]["error"] == "Internal error"
+        mock_create_short_urls.assert_awaited_once()
+        assert mock_create_short_urls.call_args.kwargs["long_urls"] == [
+            "https://www.example.com/page",
+            "https://www.example.com/other",
+        ]
+
+    @pytest.mark.asyncio
+    @patch("routes.routes.settings")
+    @patch("services.url.UrlService.create_short_urls", new_callable=AsyncMock)
+    @patch("services.url.UrlService.create_short_url", new_callable=AsyncMock)
+    async def test_fast_serialization_matches_models(
+        self,
+        mock_create_short_url: MagicMock,
+        mock_create_short_urls: MagicMock,
+        mock_settings: MagicMock,
+    ) -> None:
+        """Fast mode sends the same bodies as the response models do."""
+        mock_create_short_url.return_value = f"{settings.base_url}{slug}"
+        mock_create_short_urls.return_value = [f"{settings.base_url}{slug}", None]
+        batch = {"long_urls": ["https://www.example.com/ü", "bad", "https://x.com/y"]}
+        bodies: list[tuple[bytes, bytes]] = []
+        for fast in (True, False):
+            mock_settings.fast_serialization = fast
+            async with AsyncClient(
+                transport=ASGITransport(app=app), base_url=str(settings.base_url)
+            ) as ac:
+                single = await ac.post(
+                    url="/shorten", json={"long_url": "https://www.example.com/page"}
+                )
+                many = await ac.post(url="/shorten/batch", json=batch)
+            bodies.append((single.content, many.content))
+
+        assert bodies[0] == bodies[1]
+
+    @pytest.mark.asyncio
+    async def test_can_not_return_short_urls_empty_batch(self) -> None:
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url=str(settings.base_url)
+        ) as ac:
+            response = await ac.post(url="/shorten/batch", json={"long_urls": []})
+
+        assert response.status_code == 422
+
+    @pytest.mark.asyncio
+    @patch("routes.routes.click_recorder.record")
+    @patch("services.url.UrlService.get_link", new_callable=AsyncMock)
+    async def test_return_long_url_records_click(
+        self, mock_get_link: MagicMock, mock_record: MagicMock
+    ) -> None:
+        mock_get_link.return_value = ("https://www.example.com/page", expires_at)
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url=str(settings.base_url)
+        ) as ac:
+            await ac.get(url=f"/{slug}")
+
+        mock_record.assert_called_once_with(slug)
+
+    @pytest.mark.asyncio
+    @patch("routes.routes.click_recorder.record")
+    @patch("services.url.UrlService.get_link", new_callable=AsyncMock)
+    async def test_head_long_url_not_a_click(
+        self, mock_get_link: MagicMock, mock_record: MagicMock
+    ) -> None:
+        mock_get_link.return_value = ("https://www.example.com/page", expires_at)
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url=str(settings.base_url)
+        ) as ac:
+            response = await ac.head(url=f"/{slug}")
+
+        assert response.status_code == 307
+        assert response.headers["location"] == "https://www.example.com/page"
+        mock_record.assert_not_called()
+
+    @pytest.mark.asyncio
+    @patch("routes.redirects.settings")
+    @patch("routes.routes.settings")
+    @patch("services.url.UrlService.get_link", new_callable=AsyncMock)
+    async def test_return_long_url_cache_headers(
+        self,
+        mock_get_link: MagicMock,
+        mock_settings: MagicMock,
+        mock_redirect_settings: MagicMock,
+    ) -> None:
+        mock_settings.redirect_status = 301
+        mock_redirect_settings.redirect_cache_max_age = 86400 * 7
+        mock_settings.click_tracking = False
+        mock_get_link.return_value = (
+            "https://www.example.com/page",
+            datetime.now(timezone.utc) + timedelta(hours=1),
+        )
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url=str(settings.base_url)
+        ) as ac:
+            response = await ac.get(url=f"/{slug}")
+
+        assert response.status_code == 301
+        cache_control = response.headers["cache-control"]
+        assert cache_control.startswith("public, max-age=")
+        # Capped by the link's remaining hour, not the configured week
+        assert 3590 <= int(cache_control.rpartition("=")[2]) <= 3600
+
+    @pytest.mark.asyncio
+    @patch("routes.redirects.settings")
+    @patch("routes.routes.settings")
+    @patch("services.url.UrlService.get_link", new_callable=AsyncMock)
+    async def test_return_long_url_expiring_not_cached(
+        self,
+        mock_get_link: MagicMock,
+        mock_settings: MagicMock,
+        mock_redirect_settings: MagicMock,
+    ) -> None:
+        mock_settings.redirect_status = 307
+        mock_redirect_settings.redirect_cache_max_age = 3600
+        mock_settings.click_tracking = False
+        mock_get_link.return_value = (
+            "https://www.example.com/page",
+            datetime.now(timezone.utc) + timedelta(milliseconds=500),
+        )
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url=str(settings.base_url)
+        ) as ac:
+            response = await ac.get(url=f"/{slug}")
+
+        assert response.headers["cache-control"] == "no-store"
+
+    @pytest.mark.asyncio
+    @patch("routes.redirects.settings")
+    @patch("routes.routes.settings")
+    @patch("services.url.UrlService.get_link", new_callable=AsyncMock)
+    async def test_return_permanent_redirect_not_cached_by_default(
+        self,
+        mock_get_link: MagicMock,
+        mock_settings: MagicMock,
+        mock_redirect_settings: MagicMock,
+    ) -> None:
+        mock_settings.redirect_status = 308
+        mock_redirect_settings.redirect_cache_max_age = 0
+        mock_settings.click_tracking = False
+        mock_get_link.return_value = ("https://www.example.com/page", expires_at)
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url=str(settings.base_url)
+        ) as ac:
+            response = await ac.get(url=f"/{slug}")
+
+        assert response.status_code == 308
+        assert response.headers["cache-control"] == "no-store"
+
+    @pytest.mark.asyncio
+    @patch("services.analytics.AnalyticsService.get_link_stats", new_callable=AsyncMock)
+    async def test_return_link_stats(self, mock_get_link_stats: MagicMock) -> None:
+        mock_get_link_stats.return_value = (5, None)
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url=str(settings.base_url)
+        ) as ac:
+            response = await ac.get(url=f"/{slug}/stats")
+
+        assert response.status_code == 200
+        assert response.json() == {"slug": slug, "clicks": 5, "last_access_ts": None}
+
+    @pytest.mark.asyncio
+    @patch("services.analytics.AnalyticsService.get_link_stats", new_callable=AsyncMock)
+    async def test_return_link_stats_invalid_slug(
+        self, mock_get_link_stats: MagicMock
+    ) -> None:
+        mock_get_link_stats.side_effect = NoMatchingSlugError(slug)
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url=str(settings.base_url)
+        ) as ac:
+            response = await ac.get(url=f"/{slug}/stats")
+
+        assert response.status_code == 404
+
+    @pytest.mark.asyncio
+    async def test_read_pool_stats(self) -> None:
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url=str(settings.base_url)
+        ) as ac:
+            response = await ac.get(url="/admin/pool")
+
+        assert response.status_code == 200
+        assert {"checked_out", "idle", "overflow", "waiting"} <= response.json().keys()
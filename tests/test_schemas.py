@@ -28,7 +28,7 @@ class TestPydantic:
         invalid_data: dict[str, str] = {"long_url": invalid_url}
 
         with pytest.raises(ValidationError) as e:
-            schema: LongUrlAccept = LongUrlAccept(**invalid_data)
+            LongUrlAccept(**invalid_data)
 
         assert "long_url" in str(e.value)
 
@@ -37,7 +37,7 @@ class TestPydantic:
         invalid_data: dict[str, str] = {"long_url": self_reference_url}
 
         with pytest.raises(ValidationError) as e:
-            schema: LongUrlAccept = LongUrlAccept(**invalid_data)
+            LongUrlAccept(**invalid_data)
 
         assert "long_url" in str(e.value)
 
@@ -0,0 +1,94 @@
+import re
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config.config import Settings
+from exceptions.exceptions import SlugSpaceExhaustedError
+from models.models import link_slug_seq
+from services.slug import SequenceSlugAllocator, SlugPermutation
+
+
+class TestSlugPermutation:
+    """Test suite for the SlugPermutation class."""
+
+    def test_encode_valid_slug(self) -> None:
+        """Encoded values are fixed-length base62 slugs."""
+        permutation = SlugPermutation(length=7, key=b"")
+        assert re.match(r"^[A-Za-z0-9]{7}$", permutation.encode(1))
+
+    def test_encode_decode_round_trip(self) -> None:
+        """Slugs decode back to the value they were derived from."""
+        permutation = SlugPermutation(length=7, key=b"secret")
+        for value in range(1, 1000):
+            assert permutation.decode(permutation.encode(value)) == value
+
+    def test_encode_is_a_permutation(self) -> None:
+        """Every value in a small slug space maps to a distinct slug."""
+        permutation = SlugPermutation(length=2, key=b"")
+        slugs = {permutation.encode(value) for value in range(62**2)}
+        assert len(slugs) == 62**2
+
+    def test_consecutive_values_do_not_look_sequential(self) -> None:
+        """Consecutive values share no common prefix."""
+        permutation = SlugPermutation(length=7, key=b"")
+        first, second = permutation.encode(1), permutation.encode(2)
+        assert first[:3] != second[:3]
+
+    def test_key_changes_slugs(self) -> None:
+        """Different keys give different permutations."""
+        first = SlugPermutation(length=7, key=b"one")
+        second = SlugPermutation(length=7, key=b"two")
+        assert first.encode(1) != second.encode(1)
+
+    def test_encode_out_of_range(self) -> None:
+        """Values outside the slug space are rejected."""
+        permutation = SlugPermutation(length=2, key=b"")
+        with pytest.raises(SlugSpaceExhaustedError):
+            permutation.encode(62**2)
+
+
+class TestSequenceSlugAllocator:
+    """Test suite for the SequenceSlugAllocator class."""
+
+    @pytest.mark.asyncio
+    async def test_allocate_reserves_a_block(self) -> None:
+        """Slugs are served from one reserved block of sequence values."""
+        permutation = SlugPermutation(length=7, key=b"")
+        allocator = SequenceSlugAllocator(link_slug_seq, permutation, block_size=3)
+        mock_db = AsyncMock(AsyncSession)
+        mock_db.scalars.return_value = MagicMock(all=MagicMock(return_value=[1, 2, 3]))
+
+        slugs = await allocator.allocate(mock_db, 2)
+        slugs += await allocator.allocate(mock_db, 1)
+
+        assert slugs == [permutation.encode(value) for value in (1, 2, 3)]
+        assert mock_db.scalars.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_allocate_more_than_a_block(self) -> None:
+        """Requests larger than a block reserve enough values in one query."""
+        permutation = SlugPermutation(length=7, key=b"")
+        allocator = SequenceSlugAllocator(link_slug_seq, permutation, block_size=2)
+        mock_db = AsyncMock(AsyncSession)
+        mock_db.scalars.return_value = MagicMock(
+            all=MagicMock(return_value=[1, 2, 3, 4, 5])
+        )
+
+        slugs = await allocator.allocate(mock_db, 5)
+
+        assert len(set(slugs)) == 5
+        assert mock_db.scalars.await_count == 1
+
+
+class TestSlugSettings:
+    """Test suite for the slug strategy settings."""
+
+    def test_sequence_strategy_requires_key(self) -> None:
+        """Without a key the permutation is public and slugs can be enumerated."""
+        with pytest.raises(ValidationError, match="SLUG_KEY"):
+            Settings(slug_strategy="sequence", slug_key="")  # type: ignore
+        keyed = Settings(slug_strategy="sequence", slug_key="secret")  # type: ignore
+        assert keyed.slug_strategy == "sequence"
@@ -0,0 +1,158 @@
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from config.config import settings
+from edge import app
+from exceptions.exceptions import InvalidSnapshotError
+from services.snapshot import SlugSnapshot, SnapshotStore, write_snapshot
+
+long_url = "https://example.com/a/deep/page/and-some-more-information-here.html"
+tomorrow = int(time.time()) + 86400
+
+rows = [
+    ("A1b2C3d", long_url, tomorrow),
+    ("B", "https://example.com/ü", tomorrow),
+    ("a1b2C3d", "https://example.com/", 0),
+]
+
+
+class TestSnapshot:
+    """Test suite for slug snapshots."""
+
+    def test_round_trip(self, tmp_path: Path) -> None:
+        """Every written link is found, other slugs are not."""
+        path = str(tmp_path / "links.snapshot")
+        assert write_snapshot(path, rows, count=3, width=7) == 3
+        snapshot = SlugSnapshot(path)
+        for slug, url, expires_at in rows:
+            assert snapshot.lookup(slug) == (url, expires_at)
+        assert snapshot.lookup("A1b2C3") is None
+        assert snapshot.lookup("zzzzzzz") is None
+        assert snapshot.lookup("A1b2C3dd") is None
+        snapshot.close()
+        assert not os.path.exists(f"{path}.partial")
+
+    def test_empty_snapshot(self, tmp_path: Path) -> None:
+        """A snapshot without links finds nothing."""
+        path = str(tmp_path / "links.snapshot")
+        write_snapshot(path, [], count=0, width=0)
+        assert SlugSnapshot(path).lookup("A1b2C3d") is None
+
+    @pytest.mark.parametrize(
+        ("written", "count", "width"),
+        [(list(reversed(rows)), 3, 7), (rows, 4, 7), (rows, 3, 6)],
+    )
+    def test_write_rejects_bad_rows(
+        self, tmp_path: Path, written: list, count: int, width: int
+    ) -> None:
+        """Unsorted, miscounted or overlong rows leave any old snapshot in place."""
+        path = tmp_path / "links.snapshot"
+        path.write_bytes(b"old")
+        with pytest.raises(InvalidSnapshotError):
+            write_snapshot(str(path), written, count=count, width=width)
+        assert path.read_bytes() == b"old"
+
+    @pytest.mark.parametrize("content", [b"", b"SLUGSNP1", b"x" * 64])
+    def test_open_rejects_invalid_file(self, tmp_path: Path, content: bytes) -> None:
+        """Files that are not whole snapshots are refused."""
+        path = tmp_path / "links.snapshot"
+        path.write_bytes(content)
+        with pytest.raises(InvalidSnapshotError):
+            SlugSnapshot(str(path))
+
+    def test_truncated_snapshot(self, tmp_path: Path) -> None:
+        """A snapshot cut short is refused."""
+        path = tmp_path / "links.snapshot"
+        write_snapshot(str(path), rows, count=3, width=7)
+        path.write_bytes(path.read_bytes()[:-1])
+        with pytest.raises(InvalidSnapshotError):
+            SlugSnapshot(str(path))
+
+    def test_store_reloads_replaced_file(self, tmp_path: Path) -> None:
+        """A replaced file is swapped in, an unchanged one is not reopened."""
+        path = str(tmp_path / "links.snapshot")
+        store = SnapshotStore(path)
+        assert store.lookup("B") is None
+        write_snapshot(path, rows[:1], count=1, width=7)
+        assert store.reload()
+        assert not store.reload()
+        assert store.lookup("B") is None
+        write_snapshot(path, rows, count=3, width=7)
+        assert store.reload()
+        assert store.lookup("B") == ("https://example.com/ü", tomorrow)
+        assert store.stats()["links"] == 3
+        assert store.stats()["reloads"] == 2
+
+    def test_store_keeps_snapshot_on_invalid_file(self, tmp_path: Path) -> None:
+        """A broken replacement leaves the current snapshot in service."""
+        path = tmp_path / "links.snapshot"
+        store = SnapshotStore(str(path))
+        write_snapshot(str(path), rows, count=3, width=7)
+        store.reload()
+        path.unlink()
+        path.write_bytes(b"broken")
+        with pytest.raises(InvalidSnapshotError):
+            store.reload()
+        assert store.lookup("A1b2C3d") == (long_url, tomorrow)
+
+
+class TestEdgeRoutes:
+    """Test suite for the edge node routes."""
+
+    @pytest.fixture
+    def snapshot(self, tmp_path: Path) -> SnapshotStore:
+        path = str(tmp_path / "links.snapshot")
+        write_snapshot(path, rows, count=3, width=7)
+        store = SnapshotStore(path)
+        store.reload()
+        return store
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(
+        ("slug", "method", "status"),
+        [
+            ("A1b2C3d", "GET", settings.redirect_status),
+            ("A1b2C3d", "HEAD", settings.redirect_status),
+            ("a1b2C3d", "GET", 410),
+            ("zzzzzzz", "GET", 404),
+        ],
+    )
+    async def test_return_long_url(
+        self, snapshot: SnapshotStore, slug: str, method: str, status: int
+    ) -> None:
+        with patch("routes.edge.slug_snapshot", snapshot):
+            async with AsyncClient(
+                transport=ASGITransport(app=app), base_url=str(settings.base_url)
+            ) as ac:
+                response = await ac.request(method, f"/{slug}")
+
+        assert response.status_code == status
+        if status == settings.redirect_status:
+            assert response.headers["location"] == long_url
+
+    def test_edge_app_needs_no_database(self, tmp_path: Path) -> None:
+        """Edge nodes start without Postgres settings, storage or a driver."""
+        env = {k: v for k, v in os.environ.items() if not k.startswith("POSTGRES_")}
+        # Run elsewhere, so no .env file provides them either
+        env["PYTHONPATH"] = os.getcwd()
+        loaded = subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                "import sys, edge; print(sorted(m for m in sys.modules "
+                "if m.partition('.')[0] in ('database', 'psycopg', 'storage')))",
+            ],
+            cwd=tmp_path,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        assert loaded.strip() == "[]"
@@ -0,0 +1,29 @@
+import pytest
+
+from metrics.startup import StartupTimer, process_age
+
+
+class TestStartupTimer:
+    """Test suite for the StartupTimer class."""
+
+    def test_steps(self) -> None:
+        timer = StartupTimer()
+        timer.mark("imports")
+        timer.mark("storage")
+        timer.ready()
+
+        stats = timer.stats()
+        assert list(stats) == [
+            "imports_seconds",
+            "storage_seconds",
+            "total_seconds",
+            "process_age_seconds",
+        ]
+        assert stats["total_seconds"] == pytest.approx(
+            stats["imports_seconds"] + stats["storage_seconds"]
+        )
+
+    def test_process_age(self) -> None:
+        """The process started before this test, and not long before."""
+        age = process_age()
+        assert age is None or 0 < age < 24 * 3600
@@ -0,0 +1,171 @@
+import os
+import subprocess
+import sys
+import time
+from collections.abc import Iterator
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from config.config import settings
+from database.database import get_primary_engine
+from exceptions.exceptions import LinkExpiredError, NoMatchingSlugError
+from main import app
+from storage.memory import MemoryLinkStore
+from storage.postgres import PostgresLinkStore
+from storage.storage import get_link_store
+
+long_url = "https://example.com/a/deep/page/and-some-more-information-here.html"
+
+
+class TestMemoryLinkStore:
+    """Test suite for the MemoryLinkStore class."""
+
+    @pytest.mark.asyncio
+    async def test_create_and_get_link(self) -> None:
+        store = MemoryLinkStore()
+        short_url = await store.create_short_url(long_url)
+        slug = short_url.removeprefix(str(settings.base_url))
+
+        assert len(slug) == settings.slug_length
+        found_url, expires_at = await store.get_link(slug)
+        assert found_url == long_url
+        assert expires_at > datetime.now(timezone.utc) + timedelta(
+            days=settings.max_url_age - 1
+        )
+
+    @pytest.mark.asyncio
+    async def test_create_many(self) -> None:
+        store = MemoryLinkStore()
+        short_urls = await store.create_short_urls([long_url, long_url])
+        assert len(set(short_urls)) == 2
+
+    @pytest.mark.asyncio
+    async def test_missing_and_expired_links(self) -> None:
+        store = MemoryLinkStore()
+        store.add_link(
+            long_url,
+            slug="A1b2C3d",
+            expires_at=datetime.now(timezone.utc) - timedelta(seconds=1),
+        )
+        with pytest.raises(NoMatchingSlugError):
+            await store.get_link("zzzzzzz")
+        with pytest.raises(LinkExpiredError):
+            await store.get_link("A1b2C3d")
+
+    @pytest.mark.asyncio
+    @patch("storage.memory.settings")
+    async def test_dedupe(self, mock_settings: MagicMock) -> None:
+        """Equivalent URLs share a live link."""
+        mock_settings.dedupe_urls = True
+        mock_settings.max_url_age = settings.max_url_age
+        mock_settings.slug_strategy = "random"
+        mock_settings.slug_length = settings.slug_length
+        mock_settings.short_url_prefix = settings.short_url_prefix
+        store = MemoryLinkStore()
+        first = await store.create_short_url("https://Example.com:443/page")
+        assert await store.create_short_url("https://example.com/page") == first
+
+    @pytest.mark.asyncio
+    async def test_clicks(self) -> None:
+        store = MemoryLinkStore()
+        slug = store.add_link(long_url)
+        now = time.time()
+        await store.record_clicks({slug: (2, now - 10), "zzzzzzz": (1, now)})
+        await store.record_clicks({slug: (1, now)})
+
+        clicks, last_access_ts = await store.get_link_stats(slug)
+        assert clicks == 3
+        assert last_access_ts == datetime.fromtimestamp(now, timezone.utc)
+        with pytest.raises(NoMatchingSlugError):
+            await store.get_link_stats("zzzzzzz")
+
+    @pytest.mark.asyncio
+    async def test_purge_expired_links(self) -> None:
+        """Only links expired over purge_after_days ago go, in batches."""
+        store = MemoryLinkStore()
+        purgeable = datetime.now(timezone.utc) - timedelta(
+            days=settings.purge_after_days + 1
+        )
+        for slug in ("a", "b", "c"):
+            store.add_link(long_url, slug=slug, expires_at=purgeable)
+        store.add_link(long_url, slug="recent", expires_at=datetime.now(timezone.utc))
+
+        assert await store.purge_expired_links(batch_size=2) == 2
+        assert await store.purge_expired_links(batch_size=2) == 1
+        assert await store.purge_expired_links(batch_size=2) == 0
+        with pytest.raises(NoMatchingSlugError):
+            await store.get_link("a")
+        with pytest.raises(LinkExpiredError):
+            await store.get_link("recent")
+
+
+class TestMemoryRoutes:
+    """The routes work end to end on the memory store."""
+
+    @pytest.fixture(autouse=True)
+    def memory_store(self) -> Iterator[MemoryLinkStore]:
+        store = MemoryLinkStore()
+        app.dependency_overrides[get_link_store] = lambda: store
+        yield store
+        app.dependency_overrides.clear()
+
+    @pytest.mark.asyncio
+    @patch("routes.routes.click_recorder.record")
+    async def test_shorten_and_redirect(self, mock_record: MagicMock) -> None:
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url=str(settings.base_url)
+        ) as ac:
+            response = await ac.post("/shorten", json={"long_url": long_url})
+            short_url = response.json()["short_url"]
+            slug = short_url.removeprefix(str(settings.base_url))
+            redirect = await ac.get(f"/{slug}")
+            stats = await ac.get(f"/{slug}/stats")
+
+        assert redirect.status_code == settings.redirect_status
+        assert redirect.headers["location"] == long_url
+        mock_record.assert_called_once_with(slug)
+        assert stats.json()["clicks"] == 0
+
+    def test_memory_backend_needs_no_database(self, tmp_path: Path) -> None:
+        """The app starts and shortens without Postgres settings or an engine."""
+        env = {k: v for k, v in os.environ.items() if not k.startswith("POSTGRES_")}
+        env.update(STORAGE_BACKEND="memory", PYTHONPATH=os.getcwd())
+        script = (
+            "import asyncio, main\n"
+            "from database.database import get_engine\n"
+            "async def run():\n"
+            "    async with main.lifespan(main.app):\n"
+            "        await main.link_store.create_short_url('https://example.com')\n"
+            "asyncio.run(run())\n"
+            "print(get_engine.cache_info().currsize)\n"
+        )
+        # Run elsewhere, so no .env file provides them either
+        built = subprocess.run(
+            [sys.executable, "-c", script],
+            cwd=tmp_path,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+
+        assert built.strip() == "0"
+
+
+class TestPostgresLinkStore:
+    """Test suite for the PostgresLinkStore class."""
+
+    @pytest.mark.asyncio
+    @patch("storage.postgres.UrlService.get_link", new_callable=AsyncMock)
+    async def test_get_link_falls_back_to_primary(
+        self, mock_get_link: AsyncMock
+    ) -> None:
+        """Lookups pass the primary, to retry slugs replicas have not seen."""
+        mock_get_link.return_value = (long_url, datetime.now(timezone.utc))
+
+        assert (await PostgresLinkStore().get_link("abc"))[0] == long_url
+        assert mock_get_link.await_args.kwargs["primary"] is get_primary_engine()
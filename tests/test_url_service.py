@@ -1,14 +1,36 @@
+import asyncio
 import re
 from datetime import datetime, timedelta, timezone
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import delete, event
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, AsyncSession
 
 from config.config import settings
+from database.database import async_session, get_engine
+from database.migrations import migrate_database
 from exceptions.exceptions import LinkExpiredError, NoMatchingSlugError
 from models.models import Link
-from services.url import UrlService
+from services.cache import slug_cache
+from services.hashing import hash_url, normalize_url
+from services.slug import generate_slug
+from services.url import ShortenCoalescer, UrlService
+
+
+def lookup_result(long_url: str, expires_at: datetime, expired: bool) -> MagicMock:
+    """Builds a mock result of the slug lookup query."""
+    return MagicMock(first=MagicMock(return_value=(long_url, expires_at, expired)))
+
+
+def mock_read_engine() -> tuple[MagicMock, AsyncMock]:
+    """Builds a mock engine, and the mock connection it hands out."""
+    mock_conn = AsyncMock(AsyncConnection)
+    mock_engine = MagicMock(AsyncEngine)
+    mock_engine.connect.return_value.__aenter__.return_value = mock_conn
+    return mock_engine, mock_conn
 
 
 class TestUrlService:
@@ -16,83 +38,487 @@ class TestUrlService:
 
     def test_generate_valid_slug(self) -> None:
         """Ensure that generated slugs are valid."""
-        slug = UrlService._generate_slug(7)
+        slug = generate_slug(7)
         assert re.match(r"^[A-Za-z0-9]{7}$", slug)
 
     @pytest.mark.asyncio
-    async def test_generate_unique_slug_no_collision(self) -> None:
-        """Test that a unique slug is generated without collisions."""
+    @patch("services.url.slug_allocator.allocate", new_callable=AsyncMock)
+    @patch("services.url.settings")
+    async def test_candidate_slugs_sequence_strategy(
+        self, mock_settings: MagicMock, mock_allocate: MagicMock
+    ) -> None:
+        """Test that sequence slugs come from the slug allocator."""
+        mock_settings.slug_strategy = "sequence"
+        mock_allocate.return_value = ["A1b2C3d"]
         mock_db = AsyncMock(AsyncSession)
-        mock_db.scalar.return_value = None
-        slug = await UrlService()._generate_unique_slug(mock_db)
-        assert isinstance(slug, str)
-        assert len(slug) == 7
-        assert mock_db.scalar.await_count == 1
+        slugs = await UrlService()._candidate_slugs(mock_db, 1)
+        assert slugs == ["A1b2C3d"]
 
     @pytest.mark.asyncio
-    async def test_generate_unique_slug_one_collision(self) -> None:
-        """Test that a unique slug is generated after one collision."""
+    async def test_candidate_slugs_random_strategy(self) -> None:
+        """Test that random slugs are distinct and never probe the database."""
         mock_db = AsyncMock(AsyncSession)
-        mock_db.scalar.side_effect = ["ABCDEFG", None]
-        slug = await UrlService()._generate_unique_slug(mock_db)
-        assert isinstance(slug, str)
-        assert len(slug) == 7
-        assert mock_db.scalar.await_count == 2
+        slugs = await UrlService()._candidate_slugs(mock_db, 50)
+        assert len(set(slugs)) == 50
+        assert all(re.match(r"^[A-Za-z0-9]{7}$", slug) for slug in slugs)
+        assert mock_db.scalar.await_count == 0
 
     @pytest.mark.asyncio
-    @patch("services.url.UrlService._generate_unique_slug", new_callable=AsyncMock)
-    async def test_create_short_url(self, mock_generate_unique_slug: MagicMock) -> None:
-        """Test that a short URL is created successfully."""
+    @patch("services.url.generate_slug")
+    async def test_create_short_url(self, mock_generate_slug: MagicMock) -> None:
+        """Test that a short URL is created with one insert and one commit.
+
+        Only calls on the session are counted here; TestShortenStatements counts
+        the SQL actually run."""
+        mock_generate_slug.return_value = "A1b2C3d"
         mock_db = AsyncMock(AsyncSession)
-        mock_generate_unique_slug.return_value = "A1b2C3d"
+        mock_db.scalars.return_value = MagicMock(
+            all=MagicMock(return_value=["A1b2C3d"])
+        )
         long_url = "https://example.com/a/deep/page/and-some-more-information-here.html"
         short_url = await UrlService().create_short_url(mock_db, long_url)
         assert isinstance(short_url, str)
         assert short_url == f"{settings.base_url}A1b2C3d"
+        assert mock_db.scalars.await_count == 1
+        assert mock_db.scalar.await_count == 0
+        assert mock_db.execute.await_count == 0
+        assert mock_db.refresh.await_count == 0
+        assert mock_db.commit.await_count == 1
+
+    @pytest.mark.asyncio
+    @patch("services.url.generate_slug")
+    async def test_create_short_url_slug_conflict(
+        self, mock_generate_slug: MagicMock
+    ) -> None:
+        """Test that the insert is retried only when the slug was taken."""
+        mock_generate_slug.side_effect = ["ABCDEFG", "A1b2C3d"]
+        mock_db = AsyncMock(AsyncSession)
+        mock_db.scalars.side_effect = [
+            MagicMock(all=MagicMock(return_value=[])),
+            MagicMock(all=MagicMock(return_value=["A1b2C3d"])),
+        ]
+        long_url = "https://example.com/a/deep/page/and-some-more-information-here.html"
+        short_url = await UrlService().create_short_url(mock_db, long_url)
+        assert short_url == f"{settings.base_url}A1b2C3d"
+        assert mock_db.scalars.await_count == 2
+        assert mock_db.commit.await_count == 1
 
     @pytest.mark.asyncio
-    async def test_get_long_url_by_slug_success(self) -> None:
+    async def test_get_link_by_slug_success(self) -> None:
         """Test that a long URL can be retrieved by its slug."""
         slug = "A1b2C3d"
         long_url = "https://example.com/a/deep/page/and-some-more-information-here.html"
-        test_link = Link(
-            link_id=1,
-            slug=slug,
-            long_url=long_url,
-            created_ts=datetime.now(timezone.utc) - timedelta(days=1),
+        mock_engine, mock_db = mock_read_engine()
+        mock_db.execute.return_value = lookup_result(
+            long_url, datetime.now(timezone.utc) + timedelta(days=1), expired=False
         )
-        mock_db = AsyncMock(AsyncSession)
-        mock_db.scalar.return_value = test_link
 
-        result = await UrlService().get_long_url(mock_db, slug)
+        result, _ = await UrlService().get_link(mock_engine, slug)
 
         assert result == long_url
-        assert mock_db.scalar.await_count == 1
+        assert mock_db.execute.await_count == 1
 
     @pytest.mark.asyncio
-    async def test_get_long_url_by_slug_failure(self) -> None:
+    async def test_get_link_by_slug_failure(self) -> None:
         """Test that an error is raised when a slug is not found."""
         slug = "an-invalid-slug"
-        mock_db = AsyncMock(AsyncSession)
-        mock_db.scalar.return_value = None
+        mock_engine, mock_db = mock_read_engine()
+        mock_db.execute.return_value = MagicMock(first=MagicMock(return_value=None))
         with pytest.raises(NoMatchingSlugError) as e:
-            await UrlService().get_long_url(mock_db, slug)
+            await UrlService().get_link(mock_engine, slug)
         assert "slug" in str(e.value)
 
     @pytest.mark.asyncio
-    async def test_get_long_url_link_expired(self) -> None:
-        """Test that a long URL can be retrieved by its slug."""
+    async def test_get_link_link_expired(self) -> None:
+        """Test that an error is raised when the link has expired."""
         slug = "A1b2C3d"
         long_url = "https://example.com/a/deep/page/and-some-more-information-here.html"
-        test_link = Link(
-            link_id=1,
-            slug=slug,
-            long_url=long_url,
-            created_ts=datetime.now(timezone.utc)
-            - timedelta(days=settings.max_url_age + 10),
+        mock_engine, mock_db = mock_read_engine()
+        mock_db.execute.return_value = lookup_result(
+            long_url, datetime.now(timezone.utc) - timedelta(days=1), expired=True
         )
-        mock_db = AsyncMock(AsyncSession)
-        mock_db.scalar.return_value = test_link
         with pytest.raises(LinkExpiredError) as e:
-            await UrlService().get_long_url(mock_db, slug)
+            await UrlService().get_link(mock_engine, slug)
         assert "expired" in str(e.value)
+
+    @pytest.mark.asyncio
+    async def test_get_link_served_from_cache(self) -> None:
+        """Test that repeat lookups of a slug do not query the database."""
+        slug = "A1b2C3d"
+        long_url = "https://example.com/a/deep/page/and-some-more-information-here.html"
+        mock_engine, mock_db = mock_read_engine()
+        mock_db.execute.return_value = lookup_result(
+            long_url, datetime.now(timezone.utc) + timedelta(days=1), expired=False
+        )
+
+        await UrlService().get_link(mock_engine, slug)
+        result, _ = await UrlService().get_link(mock_engine, slug)
+
+        assert result == long_url
+        assert mock_db.execute.await_count == 1
+        assert mock_engine.connect.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_get_link_returns_expiry_from_cache(self) -> None:
+        """Test that cached lookups still know when the link expires."""
+        long_url = "https://example.com/a/deep/page/and-some-more-information-here.html"
+        expires_at = datetime.now(timezone.utc) + timedelta(days=1)
+        mock_engine, mock_db = mock_read_engine()
+        mock_db.execute.return_value = lookup_result(
+            long_url, expires_at, expired=False
+        )
+
+        await UrlService().get_link(mock_engine, "A1b2C3d")
+        link = await UrlService().get_link(mock_engine, "A1b2C3d")
+
+        assert link == (long_url, expires_at)
+        assert mock_db.execute.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_get_link_missing_slug_cached(self) -> None:
+        """Test that unknown slugs are negatively cached."""
+        slug = "an-invalid-slug"
+        mock_engine, mock_db = mock_read_engine()
+        mock_db.execute.return_value = MagicMock(first=MagicMock(return_value=None))
+        for _ in range(2):
+            with pytest.raises(NoMatchingSlugError):
+                await UrlService().get_link(mock_engine, slug)
+        assert mock_db.execute.await_count == 1
+
+    @pytest.mark.asyncio
+    @patch("services.url.slug_filter.might_contain", return_value=False)
+    async def test_get_link_rejected_by_filter(
+        self, mock_might_contain: MagicMock
+    ) -> None:
+        """Test that slugs the Bloom filter rules out never reach the database."""
+        mock_engine, _ = mock_read_engine()
+        with pytest.raises(NoMatchingSlugError):
+            await UrlService().get_link(mock_engine, "zzzzzzz")
+        mock_might_contain.assert_called_once_with("zzzzzzz")
+        mock_engine.connect.assert_not_called()
+
+    @pytest.mark.asyncio
+    @patch("services.url.slug_filter.add")
+    @patch("services.url.generate_slug")
+    async def test_create_short_url_adds_to_filter(
+        self, mock_generate_slug: MagicMock, mock_add: MagicMock
+    ) -> None:
+        """Test that new slugs are added to the Bloom filter."""
+        mock_generate_slug.return_value = "A1b2C3d"
+        mock_db = AsyncMock(AsyncSession)
+        mock_db.scalars.return_value = MagicMock(
+            all=MagicMock(return_value=["A1b2C3d"])
+        )
+        await UrlService().create_short_url(mock_db, "https://example.com/page")
+        mock_add.assert_called_once_with("A1b2C3d")
+
+    @pytest.mark.asyncio
+    @patch("services.url.generate_slug")
+    async def test_create_short_urls(self, mock_generate_slug: MagicMock) -> None:
+        """Test that a batch of short URLs is saved with one insert and commit."""
+        mock_generate_slug.side_effect = ["aaaaaaa", "bbbbbbb"]
+        mock_db = AsyncMock(AsyncSession)
+        mock_db.scalars.return_value = MagicMock(
+            all=MagicMock(return_value=["aaaaaaa", "bbbbbbb"])
+        )
+        long_urls = ["https://example.com/first-page", "https://example.com/second"]
+
+        short_urls = await UrlService().create_short_urls(mock_db, long_urls)
+
+        assert short_urls == [
+            f"{settings.base_url}aaaaaaa",
+            f"{settings.base_url}bbbbbbb",
+        ]
+        assert mock_db.scalars.await_count == 1
+        assert mock_db.commit.await_count == 1
+
+    @pytest.mark.asyncio
+    @patch("services.url.generate_slug")
+    async def test_create_short_urls_retries_conflicts(
+        self, mock_generate_slug: MagicMock
+    ) -> None:
+        """Test that only rows whose slug was taken are inserted again."""
+        mock_generate_slug.side_effect = ["aaaaaaa", "bbbbbbb", "ccccccc"]
+        mock_db = AsyncMock(AsyncSession)
+        mock_db.scalars.side_effect = [
+            MagicMock(all=MagicMock(return_value=["aaaaaaa"])),
+            MagicMock(all=MagicMock(return_value=["ccccccc"])),
+        ]
+        long_urls = ["https://example.com/first-page", "https://example.com/second"]
+
+        short_urls = await UrlService().create_short_urls(mock_db, long_urls)
+
+        assert short_urls == [
+            f"{settings.base_url}aaaaaaa",
+            f"{settings.base_url}ccccccc",
+        ]
+        assert mock_db.scalars.await_count == 2
+
+    @pytest.mark.asyncio
+    @patch("services.url.settings")
+    async def test_create_short_urls_failed_chunk(
+        self, mock_settings: MagicMock
+    ) -> None:
+        """Test that a failing chunk does not fail the rest of the batch."""
+        mock_settings.batch_chunk_size = 1
+        mock_settings.slug_length = 7
+        mock_settings.max_url_age = settings.max_url_age
+        mock_settings.short_url_prefix = settings.short_url_prefix
+        mock_db = AsyncMock(AsyncSession)
+        mock_db.scalars.side_effect = [
+            SQLAlchemyError("boom"),
+            MagicMock(all=MagicMock(return_value=["bbbbbbb"])),
+        ]
+        long_urls = ["https://example.com/first-page", "https://example.com/second"]
+
+        with patch("services.url.generate_slug", side_effect=["aaaaaaa", "bbbbbbb"]):
+            short_urls = await UrlService().create_short_urls(mock_db, long_urls)
+
+        assert short_urls == [None, f"{settings.base_url}bbbbbbb"]
+        assert mock_db.rollback.await_count == 1
+        assert mock_db.commit.await_count == 1
+
+    def test_normalize_url(self) -> None:
+        """Test that equivalent spellings of a URL normalize to the same string."""
+        assert (
+            normalize_url("HTTPS://Example.COM:443?q=1#top")
+            == "https://example.com/?q=1#top"
+        )
+        assert (
+            normalize_url("http://user@[::1]:8080/Path")
+            == "http://user@[::1]:8080/Path"
+        )
+
+    def test_hash_url_fixed_width(self) -> None:
+        """Test that URL hashes are fixed width and ignore trivial differences."""
+        first = hash_url("https://example.com/page")
+        second = hash_url("HTTPS://EXAMPLE.com:443/page")
+        assert len(first) == 16
+        assert first == second
+
+    @pytest.mark.asyncio
+    @patch("services.url.settings")
+    async def test_create_short_url_dedupe_existing(
+        self, mock_settings: MagicMock
+    ) -> None:
+        """Test that dedupe mode returns the existing slug for a known URL."""
+        mock_settings.dedupe_urls = True
+        mock_settings.short_url_prefix = settings.short_url_prefix
+        mock_settings.max_url_age = settings.max_url_age
+        mock_db = AsyncMock(AsyncSession)
+        mock_db.execute.return_value = [
+            ("A1b2C3d", "https://EXAMPLE.com/a/deep/page/and-some-more.html")
+        ]
+        long_url = "https://example.com/a/deep/page/and-some-more.html"
+        short_url = await UrlService().create_short_url(mock_db, long_url)
+        assert short_url == f"{settings.base_url}A1b2C3d"
+        assert mock_db.scalars.await_count == 0
+        assert mock_db.commit.await_count == 0
+
+    @pytest.mark.asyncio
+    @patch("services.url.generate_slug")
+    @patch("services.url.settings")
+    async def test_create_short_url_dedupe_hash_collision(
+        self, mock_settings: MagicMock, mock_generate_slug: MagicMock
+    ) -> None:
+        """Test that a hash match for a different URL still creates a new link."""
+        mock_settings.dedupe_urls = True
+        mock_settings.short_url_prefix = settings.short_url_prefix
+        mock_settings.max_url_age = settings.max_url_age
+        mock_settings.slug_strategy = "random"
+        mock_settings.slug_length = settings.slug_length
+        mock_settings.coalesce_writes = False
+        mock_generate_slug.return_value = "NewSlug"
+        mock_db = AsyncMock(AsyncSession)
+        mock_db.execute.return_value = [("A1b2C3d", "https://example.com/other")]
+        mock_db.scalars.return_value = MagicMock(
+            all=MagicMock(return_value=["NewSlug"])
+        )
+        long_url = "https://example.com/a/deep/page/and-some-more.html"
+        short_url = await UrlService().create_short_url(mock_db, long_url)
+        assert short_url == f"{settings.base_url}NewSlug"
+        assert mock_db.commit.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_purge_expired_links(self) -> None:
+        """Test that a batch of expired links is deleted and evicted from the cache."""
+        slug_cache.put_missing("A1b2C3d")
+        mock_db = AsyncMock(AsyncSession)
+        mock_db.scalars.return_value = MagicMock(
+            all=MagicMock(return_value=["A1b2C3d", "ABCDEFG"])
+        )
+        deleted = await UrlService().purge_expired_links(mock_db, batch_size=10)
+        assert deleted == 2
+        assert mock_db.commit.await_count == 1
+        assert slug_cache.get_link("A1b2C3d") == (False, None)
+
+    @pytest.mark.asyncio
+    async def test_get_link_falls_back_to_primary(self) -> None:
+        """Test that slugs missing from a replica are looked up on the primary."""
+        slug = "A1b2C3d"
+        long_url = "https://example.com/a/deep/page/and-some-more-information-here.html"
+        mock_replica, mock_replica_db = mock_read_engine()
+        mock_replica_db.execute.return_value = MagicMock(
+            first=MagicMock(return_value=None)
+        )
+        mock_primary, mock_primary_db = mock_read_engine()
+        mock_primary_db.execute.return_value = lookup_result(
+            long_url, datetime.now(timezone.utc) + timedelta(days=1), expired=False
+        )
+
+        result, _ = await UrlService().get_link(mock_replica, slug, mock_primary)
+
+        assert result == long_url
+        assert mock_replica_db.execute.await_count == 1
+        assert mock_primary_db.execute.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_get_link_missing_on_replica_and_primary(self) -> None:
+        """Test that a slug is only reported missing once the primary agrees."""
+        slug = "an-invalid-slug"
+        mock_replica, mock_replica_db = mock_read_engine()
+        mock_replica_db.execute.return_value = MagicMock(
+            first=MagicMock(return_value=None)
+        )
+        mock_primary, mock_primary_db = mock_read_engine()
+        mock_primary_db.execute.return_value = MagicMock(
+            first=MagicMock(return_value=None)
+        )
+
+        with pytest.raises(NoMatchingSlugError):
+            await UrlService().get_link(mock_replica, slug, mock_primary)
+
+        assert mock_primary_db.execute.await_count == 1
+
+
+def mock_session_factory(mock_db: AsyncMock) -> MagicMock:
+    """Builds a mock async_session handing out the given session."""
+    factory = MagicMock()
+    factory.return_value.__aenter__.return_value = mock_db
+    return factory
+
+
+class TestShortenCoalescer:
+    """Test suite for the ShortenCoalescer class."""
+
+    @pytest.mark.asyncio
+    @patch("services.url.UrlService._insert_links", new_callable=AsyncMock)
+    async def test_concurrent_calls_share_one_commit(
+        self, mock_insert_links: MagicMock
+    ) -> None:
+        """Calls within the window are saved with one insert and one commit."""
+        mock_insert_links.side_effect = lambda _, urls: [url[-7:] for url in urls]
+        mock_db = AsyncMock(AsyncSession)
+        coalescer = ShortenCoalescer(window=0.01, max_batch=100)
+        urls = [f"https://example.com/{index:07}" for index in range(5)]
+
+        with patch("services.url.async_session", mock_session_factory(mock_db)):
+            slugs = await asyncio.gather(*(coalescer.submit(url) for url in urls))
+
+        assert slugs == [f"{index:07}" for index in range(5)]
+        mock_insert_links.assert_awaited_once()
+        assert mock_db.commit.await_count == 1
+        assert coalescer.stats()["largest_batch"] == 5
+
+    @pytest.mark.asyncio
+    @patch("services.url.UrlService._insert_links", new_callable=AsyncMock)
+    async def test_full_batch_flushes_early(self, mock_insert_links: MagicMock) -> None:
+        """A full batch is saved without waiting for the window to close."""
+        mock_insert_links.side_effect = lambda _, urls: ["A1b2C3d"] * len(urls)
+        coalescer = ShortenCoalescer(window=60, max_batch=2)
+
+        with patch("services.url.async_session", mock_session_factory(AsyncMock())):
+            async with asyncio.timeout(1):
+                await asyncio.gather(
+                    coalescer.submit("https://example.com/1"),
+                    coalescer.submit("https://example.com/2"),
+                )
+
+        assert coalescer.stats()["batches"] == 1
+
+    @pytest.mark.asyncio
+    @patch("services.url.UrlService._insert_links", new_callable=AsyncMock)
+    async def test_failed_batch_retried_per_link(
+        self, mock_insert_links: MagicMock
+    ) -> None:
+        """A failing batch is retried link by link, so errors stay with their caller."""
+
+        async def insert_links(_: AsyncSession, urls: list[str]) -> list[str]:
+            if "https://example.com/bad" in urls:
+                raise SQLAlchemyError
+            return ["A1b2C3d"] * len(urls)
+
+        mock_insert_links.side_effect = insert_links
+        coalescer = ShortenCoalescer(window=0.01, max_batch=100)
+
+        with patch("services.url.async_session", mock_session_factory(AsyncMock())):
+            good, bad = await asyncio.gather(
+                coalescer.submit("https://example.com/good"),
+                coalescer.submit("https://example.com/bad"),
+                return_exceptions=True,
+            )
+
+        assert good == "A1b2C3d"
+        assert isinstance(bad, SQLAlchemyError)
+        assert coalescer.fallbacks == 1
+        assert coalescer.stats()["batches"] == 1
+
+    @pytest.mark.asyncio
+    @patch("services.url.shorten_coalescer.submit", new_callable=AsyncMock)
+    @patch("services.url.settings")
+    async def test_create_short_url_coalesced(
+        self, mock_settings: MagicMock, mock_submit: MagicMock
+    ) -> None:
+        """With coalescing on, create_short_url leaves the commit to the coalescer."""
+        mock_settings.dedupe_urls = False
+        mock_settings.coalesce_writes = True
+        mock_settings.short_url_prefix = settings.short_url_prefix
+        mock_submit.return_value = "A1b2C3d"
+        mock_db = AsyncMock(AsyncSession)
+
+        short_url = await UrlService().create_short_url(
+            mock_db, "https://example.com/page"
+        )
+
+        assert short_url == f"{settings.base_url}A1b2C3d"
+        assert mock_db.commit.await_count == 0
+
+
+class TestShortenStatements:
+    """Counts the statements creating links really runs, against Postgres."""
+
+    @pytest.mark.asyncio
+    async def test_shorten_runs_one_statement(self) -> None:
+        """One INSERT ... RETURNING per call, however many URLs it holds."""
+        await migrate_database(get_engine())
+        statements: list[str] = []
+
+        def record(_: Connection, __: object, statement: str, *___: object) -> None:
+            statements.append(statement)
+
+        long_url = "https://example.com/a/deep/page/and-some-more-information-here.html"
+        event.listen(get_engine().sync_engine, "before_cursor_execute", record)
+        try:
+            async with async_session() as db:
+                single = await UrlService().create_short_url(db, long_url)
+                single_statements = list(statements)
+                statements.clear()
+                batch = await UrlService().create_short_urls(db, [long_url] * 3)
+        finally:
+            event.remove(get_engine().sync_engine, "before_cursor_execute", record)
+
+        try:
+            assert len(single_statements) == 1
+            assert single_statements[0].startswith("INSERT INTO links")
+            assert len(statements) == 1
+            assert statements[0].startswith("INSERT INTO links")
+        finally:
+            slugs = [
+                url.removeprefix(settings.short_url_prefix)
+                for url in [single, *batch]
+                if url
+            ]
+            async with async_session() as db:
+                await db.execute(delete(Link).where(Link.slug.in_(slugs)))
+                await db.commit()
+            await get_engine().dispose()